@@ -3,12 +3,23 @@
 
 import os
 import re
+import sys
 import time
 import tempfile
 import paramiko
 import scp
 import csv
 from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn
+from contextlib import closing
+
+# shared helpers live next to the robot library
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'robot', 'shenick'))
+import ShenickChannel
+import ShenickPool
+import ShenickMetrics
+import ShenickCache
+import ShenickSampler
 
 class ShenickCli():
     """
@@ -16,11 +27,12 @@ class ShenickCli():
 
     *Parameters* :
      | *Parameter* | *Type* | *Description* |
-     |*tvmcIp* | <string> | IpAddress of TVM-C |
+     |*tvmcIp* | <string> | IpAddress of TVM-C, optionally with ssh port as <ip>:<port> |
      |*tgName* | <string> | Shenick test group path and name in the format //Folder/testName |
      | tvmUser | <string> | User name, default value <adtran> |
      | partition | <integer> | Partition number, default value <1> |
      | chassisType | <string>  | Chassis type, default value <5500> |
+     | commandTimeout | <integer> | Seconds a single CLI command may take, default value <600> |
 
     *Returns* : None
 
@@ -33,25 +45,28 @@ class ShenickCli():
 
     ROBOT_LIBRARY_VERSION = '0.1'
     ROBOT_LIBRARY_SCOPE   = 'GLOBAL'
+    ROBOT_LISTENER_API_VERSION = 2
 
-    def __init__(self, tvmcIp, tgName, tvmUser= 'adtran', partition=1, chassisType='5500'):
+    def __init__(self, tvmcIp, tgName, tvmUser= 'adtran', partition=1, chassisType='5500', commandTimeout=600):
+        self.ROBOT_LIBRARY_LISTENER = self
         self._tvmcIp    = tvmcIp
         self._tvmcUser  = tvmUser
         self._partition = partition
         self._sshUser   = 'cli'
         self._sshPwd    = 'diversifEye'
         self._tmpFile   = None
-        self._sshClient = None
-        self._sshChannel = None
+        self._commandTimeout = int(commandTimeout)
         self._tgName    = tgName
         self._chassisType = chassisType
+        self._sampler   = None
         """
         The last option was added for backwards compatibility with the DiversifEye 8400 and 5500
         Chassis type can also be used to detect TVM 2, 3 and 5 (Cores/port)
         """
 
-        self._execSshCommand('cli configure cliDefaultDiversifEyeUser=%s' % self._tvmcUser)
-        self._execSshCommand('cli configure cliDefaultPartition=%s' % self._partition)
+        # open (or reuse) a pooled ssh session, new sessions get the default user and partition
+        with self._sshSession():
+            pass
 
     def __del__(self):
         if self._tmpFile is not None:
@@ -76,53 +91,52 @@ class ShenickCli():
 
     def _createSshClient(self):
         """
-        Creates a ssh client, invokes a shell and returns a channel to this shell.
+        Creates a ssh client, invokes a shell and returns a channel to this shell. Used by the connection pool to open new sessions.
 
         *Parameters* : All values provided from __init__
 
-        *Returns* : None
+        *Returns* : client, channel
         """
         try:
-            client = paramiko.SSHClient()
-            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            client.connect(self._tvmcIp, port=22, username=self._sshUser, password=self._sshPwd, allow_agent=False )
-            channel = client.invoke_shell(width=256)
-            self._sshClient = client
-            self._sshChannel = channel
+            with ShenickMetrics.getMetrics().measure('connect'):
+                host, port = ShenickPool.splitAddress(self._tvmcIp)
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                client.connect(host, port=port, username=self._sshUser, password=self._sshPwd, allow_agent=False )
+                channel = client.invoke_shell(width=256)
         except:
             raise AssertionError('Could not open SSH connection.')
         return client, channel
 
-    def _reconnectSshClient(self):
+    def _initSshSession(self, session):
         """
-        Checks if a ssh client is already open and, if so, checks if it is still active.
-        Otherwise a new client is started. Returns the current ssh client.
+        If a session hasn't been opened or dropped during testing, the pool will call create SSH Client [session],
+        then this procedure to enable default options and lastly, set the default user & partition.
 
-        *Parameters* : All values provided from __init__
+        The last call will associate all subsequent CLI commands to the defined
+        user and partition.  The -u and -p values need not, then be passed.
+
+        Partition is defaulted to 1 but may be 1-6 on a DiversifEye chassis.
+
+        *Parameters*  :
+        - *session*   : <ShenickPool.PooledSession> ; The new session
 
         *Returns* : None
+        """
+        self._enableDefaultCliOptions(session)
+        self._setCliDefaultUserPartition(session)
 
+    def _sshSession(self):
         """
-        try:
-            #  check for active SSH session
-            if self._sshClient.get_transport().is_active() is True:
-                pass
-        except:
-            """
-            If a session hasn't been opened or dropped during testing, this
-            sequence will call create SSH Client [session],
-            then enable default options and lastly, set the default user & partition.
-
-            The last call will associate all subsequent CLI commands to the defined
-            user and partition.  The -u and -p values need not, then be passed.
-
-            Partition is defaulted to 1 but may be 1-6 on a DiversifEye chassis.
-            """
-            self._sshClient, self._sshChannel = self._createSshClient()
-            self._enableDefaultCliOptions()
-            self._setCliDefaultUserPartition()
-        finally:
-            return self._sshClient, self._sshChannel
+        Leases a live ssh session from the process-wide connection pool. Sessions are shared by all instances
+        with the same controller, user and partition, so the handshake is paid once per run.
+
+        *Parameters* : All values provided from __init__
+
+        *Returns* : context manager yielding a ShenickPool.PooledSession
+        """
+        key = (self._tvmcIp, self._sshUser, self._tvmcUser, self._partition)
+        return ShenickPool.getPool().lease(key, self._createSshClient, self._initSshSession)
 
     def _scpPutFile(self, local, remote):
         """
@@ -134,10 +148,11 @@ class ShenickCli():
 
         *Returns* : None
         """
-        client, channel = self._reconnectSshClient()
         try:
-            scpClient = scp.SCPClient(client.get_transport())
-            scpClient.put(local, remote)
+            with ShenickMetrics.getMetrics().measure('scpPut') as counters, self._sshSession() as session:
+                counters['bytesSent'] = ShenickMetrics.localFileSize(local)
+                scpClient = scp.SCPClient(session.client.get_transport())
+                scpClient.put(local, remote)
         except:
             raise AssertionError('scp put failed.')
 
@@ -151,72 +166,183 @@ class ShenickCli():
 
         *Returns* : None
         """
-        client, channel = self._reconnectSshClient()
         try:
-            scpClient = scp.SCPClient(client.get_transport())
-            scpClient.get(remote, local)
+            with ShenickMetrics.getMetrics().measure('scpGet') as counters, self._sshSession() as session:
+                scpClient = scp.SCPClient(session.client.get_transport())
+                scpClient.get(remote, local)
+                counters['bytesReceived'] = ShenickMetrics.localFileSize(local, remote)
         except:
             raise AssertionError('scp get failed.')
 
-    def _execSshCommand(self, command):
+    def _execSshCommand(self, command, session=None):
         """
         Execute the CLI command on shenick.
 
         *Parameters*    :
         - *command*     : <string>  ; Command to be executed
+        - *session*     : <ShenickPool.PooledSession>  ; Session to use, default: lease one from the pool
 
         *Returns* : None
         """
-        client, channel = self._reconnectSshClient()
-        output = ''
         try:
-            # clear leftovers
-            while channel.recv_ready():
-                channel.recv(1)
-            # send the command
-            channel.send(command + '\n')
-            # wait until channel has data
-            while not channel.recv_ready():
-                time.sleep(0.1)
-            # read until end of prompt
-            while not output.endswith('$ '):
-                while channel.recv_ready():
-                    output += channel.recv(1)
-            # check for errors
-            if 'cli>ERROR:' in output:
-                assert False, output
+            with ShenickMetrics.getMetrics().measure('command', ShenickMetrics.commandVerb(command)) as counters:
+                counters['bytesSent'] = len(command) + 1
+                if session is None:
+                    with self._sshSession() as session:
+                        output = session.reader.execute(command, self._commandTimeout)
+                else:
+                    output = session.reader.execute(command, self._commandTimeout)
+                counters['bytesReceived'] = len(output)
+                # check for errors
+                if 'cli>ERROR:' in output:
+                    assert False, output
 
         except AssertionError as e:
             raise AssertionError('ssh command "%s" failed with error "%s"' % (command, e))
 
+        stats = session.reader.lastStats
+        logger.debug('"%s": %d bytes in %.3fs (%.0f bytes/s)' % (command, stats.bytes, stats.seconds, stats.bytesPerSecond))
+
         # return output without command and prompt
         return '\n'.join(output.splitlines()[1:-1])
 
-    def _enableDefaultCliOptions(self):
+    def _iterSshCommand(self, command):
+        """
+        Execute the CLI command on shenick and yield the output lines as they arrive, large outputs are never held in memory.
+        Errors are raised after the whole output was read.
+
+        *Parameters*    :
+        - *command*     : <string>  ; Command to be executed
+
+        *Returns* : generator of output lines without command and prompt
+        """
+        error = []
+        try:
+            with ShenickMetrics.getMetrics().measure('command', ShenickMetrics.commandVerb(command)) as counters:
+                counters['bytesSent'] = len(command) + 1
+                with self._sshSession() as session:
+                    with closing(session.reader.iterLines(command, self._commandTimeout)) as lines:
+                        for line in lines:
+                            # check for errors, the error and everything after it is not yielded
+                            if error or 'cli>ERROR:' in line:
+                                error.append(line)
+                            else:
+                                yield line
+                    counters['bytesReceived'] = session.reader.lastStats.bytes
+                if error:
+                    assert False, '\n'.join(error)
+
+        except AssertionError as e:
+            raise AssertionError('ssh command "%s" failed with error "%s"' % (command, e))
+
+        stats = session.reader.lastStats
+        logger.debug('"%s": %d bytes in %.3fs (%.0f bytes/s)' % (command, stats.bytes, stats.seconds, stats.bytesPerSecond))
+
+    def _execSshBatch(self, commands):
+        """
+        Execute several CLI commands on shenick with a single round-trip.
+
+        *Parameters*    :
+        - *commands*    : <list>  ; Commands to be executed in the given order
+
+        *Returns* : list of ShenickChannel.BatchResult (command, output, error), error is None on success
+        """
+        try:
+            with ShenickMetrics.getMetrics().measure('batch', 'batch') as counters, self._sshSession() as session:
+                counters['bytesSent'] = sum([len(command) + 1 for command in commands])
+                results = session.reader.executeBatch(commands, self._commandTimeout)
+                counters['bytesReceived'] = session.reader.lastStats.bytes
+        except AssertionError as e:
+            raise AssertionError('ssh batch of %d commands failed with error "%s"' % (len(commands), e))
+
+        stats = session.reader.lastStats
+        logger.debug('%s: %d bytes in %.3fs (%.0f bytes/s)' % (stats.command, stats.bytes, stats.seconds, stats.bytesPerSecond))
+
+        return results
+
+    def _enableDefaultCliOptions(self, session):
         """
         Enables persistent background mode if it is not enabled yet. Suggested by shenick documentation.
         Also, disable notifications, might conflict with output of other commands.
 
-        *Parameters*  : None
+        *Parameters*  :
+        - *session*   : <ShenickPool.PooledSession> ; Session to configure
 
         *Returns* : None
 
         """
-        if not 'true' in self._execSshCommand('cli available'):
-            self._execSshCommand('cli start')
+        if not 'true' in self._execSshCommand('cli available', session):
+            self._execSshCommand('cli start', session)
 
-    def _setCliDefaultUserPartition(self):
+    def _setCliDefaultUserPartition(self, session):
         """
         This procedure will set the default user and partition.  This is a DiversifEye command where there can
         be multiple used accessing the same shelf.  This defined all commands on the CLI session are identified
         to a a specific user and partition .All variables needed from this command are inherited from the __init__ function.
 
-        *Parameters*  : None
+        *Parameters*  :
+        - *session*   : <ShenickPool.PooledSession> ; Session to configure
 
         *Returns*: None
         """
-        self._execSshCommand('cli configure cliDefaultDiversifEyeUser=%s' % self._tvmcUser)
-        self._execSshCommand('cli configure cliDefaultPartition=%s' % self._partition)
+        self._execSshCommand('cli configure cliDefaultDiversifEyeUser=%s' % self._tvmcUser, session)
+        self._execSshCommand('cli configure cliDefaultPartition=%s' % self._partition, session)
+
+    def _end_suite(self, name, attributes):
+        """
+        Listener method, writes the I/O metrics to shenickIoMetrics.json in the output directory at the end of every suite.
+        """
+        outputDir = BuiltIn().get_variable_value('${OUTPUT DIR}')
+        if outputDir:
+            ShenickMetrics.getMetrics().dump(os.path.join(outputDir, 'shenickIoMetrics.json'))
+
+    def getIoMetrics(self, reset=False):
+        """
+        Returns the controller I/O metrics of this test run, shared by all ShenickCli and Shenick instances.
+
+        *Parameters*        :
+        - *reset*           : <boolean> ; Clear the metrics after reading them. Default value = False
+
+        *Returns*           : dictionary with the keys operations (connect, command, batch, scpPut, scpGet) and verbs (e.g. getStat, saveStats),
+                              each entry holds count, errors, totalSeconds, meanSeconds, minSeconds, maxSeconds, bytesSent, bytesReceived
+                              and a latency histogram (upper bucket bound: count)
+        """
+        metrics  = ShenickMetrics.getMetrics()
+        snapshot = metrics.snapshot()
+        if reset and str(reset).lower() != 'false':
+            metrics.reset()
+        return snapshot
+
+    def dumpIoMetrics(self, fileName):
+        """
+        Writes the controller I/O metrics (see getIoMetrics) as JSON file. They are also written to
+        ${OUTPUT DIR}/shenickIoMetrics.json at the end of every suite.
+
+        *Parameters*        :
+        - *fileName*        : <string> ; Path of the JSON file
+
+        *Returns*           : fileName
+        """
+        return ShenickMetrics.getMetrics().dump(fileName)
+
+    def executeBatch(self, commands, failOnError=True):
+        """
+        Executes a list of CLI commands, all commands are written to the shell at once and the combined
+        output is split up again per command. Commands are executed in order, a failing command does not stop the following ones.
+
+        *Parameters*        :
+        - *commands*        : <list> ; CLI commands, e.g. ['cli getStat VQA-1 "QmVideo MOS" Normal Application', 'cli listTestGroups']
+        - *failOnError*     : <boolean> ; Raise an error after the batch if any command reported "cli>ERROR:". Default value = True
+
+        *Returns*           : list of dictionaries with the keys command, output and error (None if the command succeeded), one per command
+        """
+        results = self._execSshBatch(list(commands))
+
+        errors = [result for result in results if result.error is not None]
+        if errors and failOnError and str(failOnError).lower() != 'false':
+            raise AssertionError('\n'.join(['ssh command "%s" failed with error "%s"' % (result.command, result.error) for result in errors]))
+
+        return [result._asdict() for result in results]
 
     def getListApplications(self):
         """
@@ -226,17 +352,22 @@ class ShenickCli():
 
         *Returns*       : This procedure returns the list of applications as a string
         """
-        output =  self._execSshCommand('cli listApplications %s' % self._tgName)
+        lines = self._iterSshCommand('cli listApplications %s' % self._tgName)
+
+        return [name for name, state in ShenickChannel.parseApplications(lines)]
+
+    def getApplicationIds(self, pattern='%'):
+        """
+        This procedure will get the application ids (e.g. //Folder/testName/IP/VQA-1) of the test group.
 
-        tempList = []
-        for line in output.splitlines():
-            line = line.strip()
+        *Parameters*    :
+        - *pattern*     : <string> ; Application name pattern, % matches any string. Default value = %
 
-            if re.match('^IP', line):
-                line = line.split(' ')[0]
-                tempList.append(line.split('/')[1])
+        *Returns*       : This procedure returns the list of application ids
+        """
+        lines = self._iterSshCommand('cli getAppIds %s "%s"' % (self._tgName, pattern))
 
-        return tempList
+        return list(ShenickChannel.parseAppIds(lines))
 
     def getHeadEndMosStatistic(self, channelPool=[213, 219, 207, 215, 211, 214, 204, 202, 218, 18, 216, 20, 16, 210, 212, 200], headEndIp='10.13.254.32', headEndPort=22, headEndUser='cli', headEndPwd='diversifEye', tg=''):
         """
@@ -264,21 +395,22 @@ class ShenickCli():
 
         #create a new instance of the class to make use of the ssh methods
         try:
-            headEndInstance = ShenickCli(headEndIp, tg)
+            #the pooled head end session is created (and its user and partition set) only on the first call
+            headEndInstance = ShenickCli(headEndIp, tg, user, partition)
 
-            #connect SSH session to head end
-            headEndInstance._createSshClient()
-
-            #set the partition - ideally use the class method but hardcoded for now
-            headEndInstance._execSshCommand('cli configure cliDefaultDiversifEyeUser=%s' % user)
-            headEndInstance._execSshCommand('cli configure cliDefaultPartition=%s' % partition)
-
-            #loop over channel pool and get latest MOS
+            #get latest MOS for the whole channel pool with one round-trip
+            commands = []
             for channel in channelPool:
                 appName = str(channel) + "-Headend"
-                mos = headEndInstance._execSshCommand('cli getStat "{0}" "QmVideo MOS" Normal Application'.format(appName))
-                headEndMosList.append(mos)
-            
+                commands.append('cli getStat "{0}" "QmVideo MOS" Normal Application'.format(appName))
+
+            results = headEndInstance._execSshBatch(commands)
+            for result in results:
+                if result.error is not None:
+                    raise AssertionError(result.error)
+
+            headEndMosList = [result.output for result in results]
+
             #print out MOS list for sanity
             #print headEndMosList
 
@@ -329,9 +461,6 @@ class ShenickCli():
         - *applications*         :  'All' or a list of applications to enable/disable
         - *status*               : <string> In Service|Out of Service
         """
-        #get list of applications
-        applicationList = self.getListApplications()
-
         if type(applications) is not list:
             #enable/disable all
             self._execSshCommand("cli setServiceStateOfApplicationsInTestGroup {0} '{1}'".format(self._tgName, status))
@@ -352,15 +481,180 @@ class ShenickCli():
         - *statType*        : <string> Type of appName (Application or Host).
         - *normal*          : <string> Statistical collection method.  Default value = Normal, alternately = Fine.
 
+        Values of a test group started with startTestGroup are cached until the controller's next sampling interval, see setStatisticsCacheInterval.
+
         *Returns*           : stats
         """
+        cache = ShenickCache.getCache()
+        key = (self._tvmcIp, (self._tvmcUser, self._partition), normal.lower(), statType.lower(), appName, stat)
+        output = cache.get(key)
+
         #get the stat
-        cmd = 'cli getStat {0} "{1}" {2} {3}'.format(appName, stat, normal, statType)
-        output = self._execSshCommand(cmd)
+        if output is None:
+            cmd = 'cli getStat {0} "{1}" {2} {3}'.format(appName, stat, normal, statType)
+            output = self._execSshCommand(cmd)
+            cache.put(key, output)
 
         #return the output
         return output
 
+    def statisticsGetMany(self, statType, appNames, stats, normal='Normal', failOnError=True):
+        """
+        This procedure will get several statistics of several applications or hosts with a single round-trip,
+        all getStat commands are pipelined in one batch.
+
+        *Parameters*        :
+        - *statType*        : <string> Type of appNames (Application or Host).
+        - *appNames*        : <list> Names of applications or hosts to get statistics for. Only names are needed not the whole path
+        - *stats*           : <list> Names of the statistics (corresponding to the columns in the appName table)
+        - *normal*          : <string> Statistical collection method.  Default value = Normal, alternately = Fine.
+        - *failOnError*     : <boolean> ; Raise an error if a getStat failed, else its value is None. Default value = True
+
+        *Returns*           : dictionary {appName: {stat: value}}, values are converted to int/float where possible
+        """
+        if isinstance(appNames, basestring):
+            appNames = [appName.strip() for appName in appNames.split(',')]
+        if isinstance(stats, basestring):
+            stats = [stat.strip() for stat in stats.split(',')]
+
+        commands = []
+        for appName in appNames:
+            for stat in stats:
+                commands.append('cli getStat {0} "{1}" {2} {3}'.format(appName, stat, normal, statType))
+
+        results = self.executeBatch(commands, failOnError)
+
+        table = {}
+        values = iter(results)
+        for appName in appNames:
+            table[appName] = {}
+            for stat in stats:
+                result = values.next()
+                if result['error'] is not None:
+                    table[appName][stat] = None
+                    continue
+                value = result['output'].strip()
+                #try to convert to integer/float
+                if re.match('^-?\d+$', value):
+                    value = int(value)
+                elif re.match('^-?\d+\.\d+$', value):
+                    value = float(value)
+                table[appName][stat] = value
+
+        return table
+
+    def setStatisticsCacheInterval(self, interval, normal='Normal'):
+        """
+        Sets the sampling interval of the controller used for caching getShenickCliStatistic values.
+        A value is reused until the next interval boundary, counted from startTestGroup.
+
+        *Parameters*        :
+        - *interval*        : <string> 30sec|1min|5min or seconds (the values of shenickXmlSamplingIntervalChange), 0 disables the cache.
+                              Default: 30sec for Normal, 0 for Fine statistics
+        - *normal*          : <string> Statistical collection method.  Default value = Normal, alternately = Fine.
+
+        *Returns*           : None
+        """
+        ShenickCache.getCache().setInterval(self._tvmcIp, ShenickCache.intervalSeconds(interval), normal)
+
+    def getStatisticsCacheCounters(self):
+        """
+        Returns the counters of the statistics cache, shared by all ShenickCli and Shenick instances.
+
+        *Parameters*        : None
+
+        *Returns*           : dictionary with the keys hits, misses, hitRate and entries
+        """
+        return ShenickCache.getCache().counters()
+
+    def startStatsSampler(self, thresholds, appNames='.*', stats=None, interval=30, bufferSize=1000, breachCount=2):
+        """
+        Starts a background thread which samples statistics of the running test group into a ring buffer and
+        stops the test group as soon as a threshold is breached, so a failed run does not last its full duration.
+        All statistics of one sample are fetched with a single round-trip (see statisticsGetMany).
+
+        *Parameters*        :
+        - *thresholds*      : <dictionary> {stat: condition}, conditions the statistics have to fulfill, e.g. QmVideo MOS=>=4  Dropped Packets=<=20
+        - *appNames*        : <list|string> Applications to sample or a regular expression matched against getListApplications. Default value = .* (all)
+        - *stats*           : <list> Statistics to sample. Default value = the statistics of _thresholds_
+        - *interval*        : <integer> Seconds between two samples. Default value = 30
+        - *bufferSize*      : <integer> Number of samples kept. Default value = 1000
+        - *breachCount*     : <integer> Number of consecutive samples a condition has to fail before the test group is stopped. Default value = 2
+
+        *Returns*           : None
+        """
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        if not isinstance(appNames, list):
+            appNames = [appName for appName in self.getListApplications() if re.match(appNames, appName)]
+        if not appNames:
+            raise AssertionError('no applications to sample')
+
+        if not stats:
+            stats = thresholds.keys()
+
+        def abort(breaches):
+            self.stopTestGroup()
+
+        # a failing getStat (e.g. an application which is out of service for a moment) only loses its own value
+        self._sampler = ShenickSampler.StatsSampler(lambda apps, stats: self.statisticsGetMany('Application', apps, stats, failOnError=False), appNames, stats,
+                                                    thresholds, abort, interval, bufferSize, breachCount).start()
+        logger.info('Sampling %d statistics of %d applications every %ss' % (len(stats), len(appNames), interval))
+
+    def stopStatsSampler(self):
+        """
+        Stops the statistics sampler. A sampler which gave up after too many failed samples is reported with a warning,
+        its test group was not watched since.
+
+        *Parameters*        : None
+
+        *Returns*           : status dictionary, see getStatsSamplerStatus
+        """
+        if self._sampler is None:
+            raise AssertionError('no stats sampler started, please use startStatsSampler first')
+
+        self._sampler.stop()
+        status = self._sampler.status()
+        for breach in status['breaches']:
+            logger.warn('threshold breached: <{app}> {stat} {value} (required {condition})'.format(**breach))
+        if status['stoppedOnErrors']:
+            logger.warn('stats sampler stopped after %d failed samples, last error: %s' % (status['errors'], status['lastError']))
+        if status['missing']:
+            logger.info('%d statistics could not be read while sampling' % status['missing'])
+
+        return status
+
+    def getStatsSamplerStatus(self):
+        """
+        Returns the status of the statistics sampler.
+
+        *Parameters*        : None
+
+        *Returns*           : dictionary with the keys running, aborted (test group was stopped), breaches (list of dictionaries
+                              with time, app, stat, value and condition), samples (number of buffered samples), errors (failed samples),
+                              lastError, stoppedOnErrors (the sampler gave up after too many failed samples in a row) and missing
+                              (values which could not be read, e.g. of applications out of service, they are None in the samples)
+        """
+        if self._sampler is None:
+            raise AssertionError('no stats sampler started, please use startStatsSampler first')
+
+        return self._sampler.status()
+
+    def getStatsSamples(self, last=0):
+        """
+        Returns the samples buffered by the statistics sampler.
+
+        *Parameters*        :
+        - *last*            : <integer> Only return the last samples. Default value = 0 (all)
+
+        *Returns*           : list of dictionaries with the keys time (seconds since the epoch) and values ({app: {stat: value}})
+        """
+        if self._sampler is None:
+            raise AssertionError('no stats sampler started, please use startStatsSampler first')
+
+        return [{'time': timestamp, 'values': values} for timestamp, values in self._sampler.getSamples(last)]
+
     def startTestGroup(self):
         """
         This procedure will execute the cli command to start the testGroup.
@@ -370,6 +664,8 @@ class ShenickCli():
         *Returns*       : None
         """
         self._execSshCommand('cli startTestGroup "%s"' % self._tgName)
+        #cached statistics are outdated with a new run, the controller samples from now on
+        ShenickCache.getCache().started(self._tvmcIp)
 
 
     def stopTestGroup(self):
@@ -386,6 +682,8 @@ class ShenickCli():
         except:
             logger.info('No test group running...')
 
+        ShenickCache.getCache().stopped(self._tvmcIp)
+
         return 'pass'
 
     def testGroupImport(self, sourceFile):
@@ -10,10 +10,94 @@ from ftplib import FTP
 import csv
 import os.path
 import ShenickCli
+import ShenickWarehouse
+import ShenickRules
+import ShenickTables
+import ShenickSummary
+import ShenickTransfer
+import numpy
 import sys
+import glob
+import json
+import shutil
+import tempfile
+import multiprocessing
 import WindowProvUtils
 from robot.api import logger
 
+# rows of applications which are out of service or got no address by DHCP
+NO_ADDRESS = r'IP Address ~ ^0\.0\.0\.0(/|$)'
+
+# verdict logging, see verdictLoggingSet
+VERDICT_LOGGING = {
+    'mode':            'full',
+    'detailDirectory': '',
+    'worst':           10,
+    'chunkRows':       50000,
+}
+
+def igmpRules(paramDict):
+    """
+    Returns the rules of evaluateIgmpApplications, the limits not in _paramDict_ are set to their defaults.
+    """
+    manDateParams = ['mosAppType', 'zapAppType']
+    for param in manDateParams:
+        if param not in paramDict.keys():
+            raise AssertionError('evaluateIgmpApplications: %s is not provided in argument list which is manadatory arguement' % param)
+
+    if not paramDict.has_key('qmVideoMOSLimit') or paramDict['qmVideoMOSLimit'] == '':
+        paramDict['qmVideoMOSLimit'] = 4
+
+    if not paramDict.has_key('imparedFramesLimit') or paramDict['imparedFramesLimit'] == '':
+        paramDict['imparedFramesLimit'] = 3
+
+    if not paramDict.has_key('droppedPacketsLimit') or paramDict['droppedPacketsLimit'] == '':
+        paramDict['droppedPacketsLimit'] = 20
+
+    if not paramDict.has_key('joinTimeAvgLimit') or paramDict['joinTimeAvgLimit'] == '':
+        paramDict['joinTimeAvgLimit'] = 125
+
+    if not paramDict.has_key('joinPercLimit') or paramDict['joinPercLimit'] == '':
+        paramDict['joinPercLimit'] = 0.95
+
+    if not paramDict.has_key('leavePerLimit') or paramDict['leavePerLimit'] == '':
+        paramDict['leavePerLimit'] = 0.95
+
+    if not paramDict.has_key('zapPerLimit') or paramDict['zapPerLimit'] == '':
+        paramDict['zapPerLimit'] = 0.95
+
+    mosApps = 'where Entity Name ~ %s' % paramDict['mosAppType']
+    zapApps = 'where Entity Name ~ %s' % paramDict['zapAppType']
+    rules = [
+        ShenickRules.Rule('Mean QmVideo MOS >= %s %s' % (paramDict['qmVideoMOSLimit'], mosApps), 'MOS'),
+        ShenickRules.Rule('Dropped Packets <= %s %s' % (paramDict['droppedPacketsLimit'], mosApps), 'Total packet loss'),
+        ShenickRules.Rule('QmVideo Impaired B-Frames + QmVideo Impaired I-Frames + QmVideo Impaired P-Frames <= %s %s' % (paramDict['imparedFramesLimit'], mosApps), 'Impared frame count'),
+        ShenickRules.Rule('Mean Join Time ms <= %s %s' % (paramDict['joinTimeAvgLimit'], zapApps), 'JoinTimeAvg'),
+        ShenickRules.Rule('Dropped Packets <= %s %s' % (paramDict['droppedPacketsLimit'], zapApps), 'Zap total packet loss'),
+        ShenickRules.Rule('Joins Completed / Joins Initiated >= %s %s' % (paramDict['joinPercLimit'], zapApps), 'Ratio Joins completed'),
+        ShenickRules.Rule('Leaves Completed / Leaves Initiated >= %s %s' % (paramDict['leavePerLimit'], zapApps), 'Ratio Leaves completed'),
+        ShenickRules.Rule('Leaves Completed / Joins Completed >= %s %s' % (paramDict['zapPerLimit'], zapApps), 'Ratio Leaves completed against joins'),
+    ]
+    return rules
+
+def httpRules(paramDict):
+    """
+    Returns the rule of evaluateHttpApplications, minGoodput is set to its default if it is not in _paramDict_.
+    """
+    manDateParams = ['appType', 'goodput']
+    for param in manDateParams:
+        if param not in paramDict.keys():
+            raise AssertionError('evaluateHttpApplications: %s is not provided in argument list which is manadatory arguement' % param)
+
+    if not paramDict.has_key('minGoodput') or paramDict['minGoodput'] == '':
+        paramDict['minGoodput'] = 0.85
+
+    minGoodput = float(float(paramDict['goodput']) * float(paramDict['minGoodput']))
+
+    rules = [ShenickRules.Rule('Mean In KiloBits/s >= %r where Entity Name ~ %s' % (minGoodput, paramDict['appType']), 'Goodput value')]
+    return rules
+
+
 class TrafficAnalysis:
     """
     Library for analysing the traffic
@@ -24,6 +108,7 @@ class TrafficAnalysis:
     """
     def __init__(self):
         self.cmnObj = WindowProvUtils.WindowProvUtils()
+        self._verdictLogging = dict(VERDICT_LOGGING)
 
 
 #  Program defaults, for now hard-code the Shenick P/F parameters and script information
@@ -51,17 +136,48 @@ class TrafficAnalysis:
         """
         self.cmnObj.copyFileFromServer(paramDict)
 
-    def runAnalysisBatchFile(self, resultsFilePath, outputPath):
+    def runAnalysisBatchFile(self, resultsFilePath, outputPath, engine='python', plot='false'):
         """
-        This method runs Analyse.bat on give results (*.zip) and saves the summary csv files in given output path.
+        This method creates the summary csv files of given results (*.zip) in given output path, by default with createSummaryFiles.
 
         *Parameters* :
         - *resultsFilePath*  : <string> ; Path to results zip file, ex: C:\\diversifEyeClient\\analysis\\bin\\IPTV.Zip
         - *outputPath*      : <string> ; Path to save the output summary results files. ex: C:\\diversifEyeClient
+        - engine            : <string> ; python (createSummaryFiles, any OS) or r (Analyse.bat with ADTRAN.R and png output, Windows only). Default value is python
+        - plot              : <string> ; true renders histograms of the Mean columns with the python engine. Default value is false
 
         *Returns* : None
         """
-        self.cmnObj.runAnalysisBatchFile(resultsFilePath, outputPath)
+        if engine.lower() == 'r':
+            self.cmnObj.runAnalysisBatchFile(resultsFilePath, outputPath)
+        else:
+            self.createSummaryFiles(resultsFilePath, outputPath, plot=plot)
+
+    def createSummaryFiles(self, resultsFilePath, outputPath, tables='', cumulative='true', plot='false'):
+        """
+        This method reads a results (saveStats) zip file and writes the summary csv files evaluated by evaluateIgmpApplications and evaluateHttpApplications,
+        as Analyse.bat does: one row per application with Entity Name, IP Address, Mean/Min/Max of levels (Mean QmVideo MOS, Mean Join Time ms,
+        Mean In KiloBits/s, ...) and totals of counters (Dropped Packets, Joins Initiated, ...). Every csv file of the zip is read once, no R is needed.
+
+        *Parameters* :
+        - *resultsFilePath*  : <string> ; Path to results zip file, ex: C:\\diversifEyeClient\\analysis\\bin\\IPTV.Zip
+        - *outputPath*      : <string> ; Output path, the files are written to <outputPath>/<zip file name>/output/Miscellaneous. ex: C:\\diversifEyeClient
+        - tables            : <string> ; Comma-separated application tables to summarise, ex: IGMP Client,HTTP Client. Default value is all
+        - cumulative        : <string> ; true if the statistics were saved cumulative (default of statisticsSave), the total of a counter is its last value instead of the sum of the intervals. Default value is true
+        - plot              : <string> ; true renders a histogram png of every Mean column next to the summary files, needs matplotlib. Default value is false
+
+        IGMP Client is summarised to Summary_Multicast_Client.csv, HTTP Client to Summary_HTTP_Client.csv, other tables to Summary_<table>.csv.
+
+        *Returns* : list of the files written
+        """
+        tables = [table.strip() for table in tables.split(',') if table.strip()] if isinstance(tables, basestring) else tables
+        paths = ShenickSummary.summariseZip(resultsFilePath, outputPath, tables, str(cumulative).lower() == 'true')
+        if str(plot).lower() == 'true':
+            for path in list(paths):
+                paths += ShenickSummary.plotSummary(path)
+        for path in paths:
+            logger.info('created %s' % path)
+        return paths
 
     def evaluateIgmpApplications(self, paramDict):
         """
@@ -80,8 +196,12 @@ class TrafficAnalysis:
         | joinPercLimit | <float> | Percentage of Joins Completed Vs Joins Initiated, Limit, default value is 0.95 |
         | leavePerLimit | <float> | Percentage of Leaves Completed Vs Leaves Initiated, Lim, default value is 0.95 |
         | zapPerLimit | <float> | Percentage of Leaves Completed Vs Joins Completed, Limi, default value is 0.95 |
+        | chunkRows | <integer> | Evaluate the file in chunks of this many rows and log a summary instead of every check, for very large files. Default is the whole file at once |
+        | detailFile | <string> | With chunkRows, csv file receiving the verdict of every application, gzip compressed if it ends with .gz |
 
-        *Returns* : None
+        The checks are a preset rule set of evaluateRules.
+
+        *Returns* : verdict table (summary with chunkRows or compact verdict logging), see evaluateRules
         """
 
 
@@ -91,105 +211,16 @@ class TrafficAnalysis:
         elif not paramDict:
             raise AssertionError('paramDict is empty')
 
-        manDateParams = ['csvFilePath', 'mosAppType', 'zapAppType']
-        for param in manDateParams:
-            if param not in paramDict.keys():
-                raise AssertionError('evaluateIgmpApplications: %s is not provided in argument list which is manadatory arguement' % param)
-
-        if not paramDict.has_key('qmVideoMOSLimit') or paramDict['qmVideoMOSLimit'] == '':
-            paramDict['qmVideoMOSLimit'] = 4
-
-        if not paramDict.has_key('imparedFramesLimit') or paramDict['imparedFramesLimit'] == '':
-            paramDict['imparedFramesLimit'] = 3
-
-        if not paramDict.has_key('droppedPacketsLimit') or paramDict['droppedPacketsLimit'] == '':
-            paramDict['droppedPacketsLimit'] = 20
-
-        if not paramDict.has_key('joinTimeAvgLimit') or paramDict['joinTimeAvgLimit'] == '':
-            paramDict['joinTimeAvgLimit'] = 125
-
-        if not paramDict.has_key('joinPercLimit') or paramDict['joinPercLimit'] == '':
-            paramDict['joinPercLimit'] = 0.95
-
-        if not paramDict.has_key('leavePerLimit') or paramDict['leavePerLimit'] == '':
-            paramDict['leavePerLimit'] = 0.95
-
-        if not paramDict.has_key('zapPerLimit') or paramDict['zapPerLimit'] == '':
-            paramDict['zapPerLimit'] = 0.95
-
-        resultStatus = "PASS"
-
-        print paramDict['qmVideoMOSLimit']
-        logger.warn(paramDict['qmVideoMOSLimit'])
-
-        with open(paramDict['csvFilePath']) as csvfile:
-            for row in csv.DictReader(csvfile):
-                ipAddress = str(row['IP Address']).split('/', 1)[0]
-                if ipAddress != '0.0.0.0':
-                    # Evaluate VQA Statistics #
-                    if re.match('.*' + paramDict['mosAppType'] + '.*', row['Entity Name'], re.IGNORECASE):
-                        # Evaluate VQA MOS #
-                        if float(row['Mean QmVideo MOS']) >= float(paramDict['qmVideoMOSLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'MOS ' + str(row['Mean QmVideo MOS']) + ' was greater than or equal to ' +  str(paramDict['qmVideoMOSLimit'])
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'MOS ' + str(row['Mean QmVideo MOS']) + ' was less than ' +  str(paramDict['qmVideoMOSLimit'])
-                            resultStatus = 'FAIL'
-                        # Evaluate VQA Dropped Packets #
-                        if int(row['Dropped Packets']) <= int(paramDict['droppedPacketsLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Total packet loss ' + str(row['Dropped Packets']) + ' was less than or equal to ' +  str(paramDict['droppedPacketsLimit'])
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Total packet loss ' + str(row['Dropped Packets']) + ' was greater than ' +  str(paramDict['droppedPacketsLimit'])
-                            resultStatus = 'FAIL'
-                        # Evaluate VQA Impared Frame Count #
-                        imparedFrameCount = int(row['QmVideo Impaired B-Frames']) + int(row['QmVideo Impaired I-Frames']) + int(row['QmVideo Impaired P-Frames'])
-                        if int(imparedFrameCount) <= int(paramDict['imparedFramesLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Impared frame count ' + str(imparedFrameCount) + ' was less than or equal to ' +  str(paramDict['imparedFramesLimit'])
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Impared frame count ' + str(imparedFrameCount) + ' was greater than ' +  str(paramDict['imparedFramesLimit'])
-                            resultStatus = 'FAIL'
-                    # Evaluate Zap Statistics #
-                    if re.match('.*' + paramDict['zapAppType'] + '.*', row['Entity Name'], re.IGNORECASE):
-                        # Evaluate Mean Join Time #
-                        if float(row['Mean Join Time ms']) <= float(paramDict['joinTimeAvgLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'JoinTimeAvg ' + str(row['Mean Join Time ms']) + ' was less than or equal to ' +  str(paramDict['joinTimeAvgLimit'])
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'JoinTimeAvg ' + str(row['Mean Join Time ms']) + ' was greater than ' +  str(paramDict['joinTimeAvgLimit'])
-                            resultStatus = 'FAIL'
-                        # Evaluate Zap Dropped Packets #
-                        if int(row['Dropped Packets']) <= int(paramDict['droppedPacketsLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Total packet loss ' + str(row['Dropped Packets']) + ' was less than or equal to ' +  str(paramDict['droppedPacketsLimit'])
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Total packet loss ' + str(row['Dropped Packets']) + ' was greater than ' +  str(paramDict['droppedPacketsLimit'])
-                            resultStatus = 'FAIL'
-                        # Evaluate Missed Joins #
-                        exptJoins = float(row['Joins Completed']) / float(row['Joins Initiated'])
-                        if float(exptJoins) >= float(paramDict['joinPercLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Joins completed ' + str(exptJoins * 100) + ' was greater than or equal to ' +  str(paramDict['joinPercLimit'] * 100)
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Joins completed ' + str(exptJoins * 100) + ' was less than ' +  str(paramDict['joinPercLimit'] * 100)
-                            resultStatus = 'FAIL'
-                        # Evaluate Missed Leaves #
-                        exptLeaves = float(row['Leaves Completed']) / float(row['Leaves Initiated'])
-                        if float(exptLeaves) >= float(paramDict['leavePerLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Leaves completed ' + str(exptLeaves * 100) + ' was greater than or equal to ' +  str(paramDict['leavePerLimit'] * 100)
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Leavs completed ' + str(exptLeaves * 100) + ' was less than ' +  str(paramDict['leavePerLimit'] * 100)
-                            resultStatus = 'FAIL'
-                        # Evaluate Joins vs Leaves #
-                        exptZap = float(row['Leaves Completed']) / float(row['Joins Completed'])
-                        if float(exptZap) >= float(paramDict['zapPerLimit']):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Leaves completed against joins ' + str(exptZap * 100) + ' was greater than or equal to ' +  str(paramDict['zapPerLimit'] * 100)
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Percentage Leaves completed against joins ' + str(exptZap * 100) + ' was less than ' +  str(paramDict['zapPerLimit'] * 100)
-                            resultStatus = 'FAIL'
-
-                else:
-                    print('%s :: Set to Out of Service or no DHCP attained, skip analysis' % row['Entity Name'])
-
-        if resultStatus == 'PASS':
+        if 'csvFilePath' not in paramDict:
+            raise AssertionError('evaluateIgmpApplications: csvFilePath is not provided in argument list which is manadatory arguement')
+        rules = igmpRules(paramDict)
+        passed, result = self._evaluatePreset(paramDict, rules)
+
+        if passed:
             print "**********All IGMP measures are within limits**********"
         else:
             print "##########All IGMP measures are not within limits########"
+        return result
 
     def evaluateHttpApplications(self, paramDict):
         """
@@ -202,8 +233,12 @@ class TrafficAnalysis:
         | *appType* | <string> | Type of application to evaluate, this procedure will evaluate only HTTP applications.. Ex: HTTP |
         | *goodput* | <float> | Shaped rate in kpbs |
         | minGoodput | <float> | MinGoodput. Default value is 0.85 |
+        | chunkRows | <integer> | Evaluate the file in chunks of this many rows and log a summary instead of every check, for very large files. Default is the whole file at once |
+        | detailFile | <string> | With chunkRows, csv file receiving the verdict of every application, gzip compressed if it ends with .gz |
 
-        *Returns* : None
+        The check is a preset rule of evaluateRules.
+
+        *Returns* : verdict table (summary with chunkRows or compact verdict logging), see evaluateRules
         """
 #------>if type(paramDict) is not dict:
         if not paramDict:
@@ -211,39 +246,350 @@ class TrafficAnalysis:
         elif not paramDict:
             raise AssertionError('paramDict is empty')
 
-        manDateParams = ['csvFilePath', 'appType', 'goodput']
-        for param in manDateParams:
-            if param not in paramDict.keys():
-                raise AssertionError('evaluateHttpApplications: %s is not provided in argument list which is manadatory arguement' % param)
-
-        if not paramDict.has_key('minGoodput') or paramDict['minGoodput'] == '':
-            paramDict['minGoodput'] = 0.85
-
-        resultStatus = "PASS"
-
-        minGoodput = float(float(paramDict['goodput']) * float(paramDict['minGoodput']))
-
-        with open(paramDict['csvFilePath']) as csvfile:
-            for row in csv.DictReader(csvfile):
-                ipAddress = str(row['IP Address']).split('/', 1)[0]
-                if ipAddress != '0.0.0.0':
-                    # Evaluate HTTP Statistics #
-                    if re.match('.*' + paramDict['appType'] + '.*', row['Entity Name'], re.IGNORECASE):
-                        # Evaluate Goodput #
-                        if float(row['Mean In KiloBits/s']) >= float(minGoodput):
-                            print 'PASS :: ' + '<' + row['Entity Name'] + '> ' + 'Goodput value ' + str(row['Mean In KiloBits/s']) + ' was greater than or equal to ' +  str(minGoodput)
-                        else:
-                            print 'FAIL :: ' + '<' + row['Entity Name'] + '> ' + 'Goodput value ' + str(row['Mean In KiloBits/s']) + ' was less than ' +  str(minGoodput)
-                            resultStatus = 'FAIL'
-                else:
-                    print('%s :: Set to Out of Service or no DHCP attained, skip analysis' % row['Entity Name'])
-
-        if resultStatus == 'PASS':
+        if 'csvFilePath' not in paramDict:
+            raise AssertionError('evaluateHttpApplications: csvFilePath is not provided in argument list which is manadatory arguement')
+        rules = httpRules(paramDict)
+        passed, result = self._evaluatePreset(paramDict, rules)
+
+        if passed:
             print "********** All HTTP measures are within limits **********"
         else:
             print "########## All HTTP measures are not within limits ########"
+        return result
+
+    def _evaluatePreset(self, paramDict, rules):
+        """
+        Evaluates the rules of evaluateIgmpApplications/evaluateHttpApplications, applications without an IP address are skipped.
+        With paramDict chunkRows or compact verdict logging only a summary is logged. Returns (all passed, verdict table or summary).
+        """
+        ruleSet = ShenickRules.RuleSet(rules, skip=NO_ADDRESS)
+        if int(paramDict.get('chunkRows') or 0) > 0 or self._verdictLogging['mode'] == 'compact':
+            summary = self._evaluateSummary(ruleSet, paramDict['csvFilePath'], paramDict.get('chunkRows'), None, paramDict.get('detailFile', ''))
+            return summary.allPassed(), summary.asDict()
+
+        verdicts = ruleSet.evaluateFile(paramDict['csvFilePath'])
+        for message in verdicts.messages():
+            print message
+        for index in numpy.nonzero(verdicts.skipped)[0]:
+            print('%s :: Set to Out of Service or no DHCP attained, skip analysis' % verdicts.names[index])
+        return verdicts.allPassed(), verdicts.rows()
+
+    def _outputDirectory(self):
+        try:
+            return BuiltIn().get_variable_value('${OUTPUT DIR}') or os.getcwd()
+        except Exception:
+            # not running in robot
+            return os.getcwd()
+
+    def _evaluateSummary(self, ruleSet, csvFilePath, chunkRows, worst, detailFile):
+        """
+        Evaluates _ruleSet_ on a csv file in chunks and logs the summary. With compact verdict logging the verdicts of all entities go to
+        a compressed detail file (unless _detailFile_ is given) which is linked from the log, and the time taken is logged.
+        """
+        settings = self._verdictLogging
+        compact  = settings['mode'] == 'compact'
+        if compact and not detailFile:
+            detailFile = os.path.join(settings['detailDirectory'] or self._outputDirectory(), '%s_verdicts_%s.csv.gz' % (
+                os.path.splitext(os.path.basename(csvFilePath))[0], datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')))
+
+        start   = time.time()
+        summary = ruleSet.evaluateStream(csvFilePath, int(chunkRows or 0) or settings['chunkRows'], settings['worst'] if worst in [None, ''] else int(worst),
+                                         detailPath=detailFile)
+        for line in summary.lines():
+            logger.info(line)
+
+        if compact:
+            logger.info('%d entities of %s evaluated in %.2f s' % (summary.rows, csvFilePath, time.time() - start))
+            try:
+                link = os.path.relpath(detailFile, self._outputDirectory()).replace(os.sep, '/')
+            except ValueError:
+                # another drive than the log
+                link = 'file:///' + os.path.abspath(detailFile).replace(os.sep, '/')
+            logger.info('verdicts of all entities: <a href="%s">%s</a>' % (link, os.path.basename(detailFile)), html=True)
+        return summary
+
+    def verdictLoggingSet(self, mode='compact', detailDirectory='', worst=10, chunkRows=50000):
+        """
+        This method sets how evaluateRules, evaluateIgmpApplications and evaluateHttpApplications log their verdicts. With thousands of
+        entities the log line per check makes output.xml and log.html huge and slows down rebot.
+
+        *Parameters* :
+        - mode              : <string> ; _full_ logs every check and returns the verdict table (the default of the library), _compact_ logs only
+                              the verdict counts, the failures and worst offenders per rule and the time taken, and returns the summary (see
+                              evaluateRules chunkRows). The verdicts of all entities are written to a gzip compressed csv file linked from the log
+        - detailDirectory   : <string> ; Directory of the detail files. Default value is the output directory of the test run
+        - worst             : <integer> ; Number of worst offenders logged per rule. Default value is 10
+        - chunkRows         : <integer> ; Rows evaluated at a time in compact mode. Default value is 50000
+
+        | Verdict Logging Set | compact |
+        | Verdict Logging Set | full |
+
+        *Returns* : None
+        """
+        if mode.lower() not in ['full', 'compact']:
+            raise AssertionError('unknown verdict logging mode "%s", use full or compact' % mode)
+        if detailDirectory and not os.path.isdir(detailDirectory):
+            os.makedirs(detailDirectory)
+        self._verdictLogging = {'mode': mode.lower(), 'detailDirectory': detailDirectory, 'worst': int(worst), 'chunkRows': int(chunkRows)}
+
+    def evaluateRules(self, csvFilePath, rules, skip=NO_ADDRESS, mustPass='false', chunkRows=0, detailFile='', worst=None):
+        """
+        This method evaluates threshold rules on every row (entity) of a summary csv file, e.g. Summary_Multicast_Client.csv. The rules are
+        compiled once and evaluated as column operations over the whole file.
+
+        A rule is _<expression> <operator> <expression>_ optionally followed by _where <condition>_ and more conditions joined by _and_:
+        - expressions are column labels and numbers joined by + - * / , operators need blanks around them. Column labels containing ' + ' etc. are put in brackets, ex: [A + B]
+        - operators are <, <=, ==, !=, >= and >
+        - conditions are _<column> ~ <regex>_ (case insensitive search), _<column> !~ <regex>_ or comparisons of expressions
+        Empty cells and divisions by zero never pass.
+
+        *Parameters* :
+        - *csvFilePath*     : <string> ; Path to the summary csv file
+        - *rules*           : <list> or <dictionary> ; Rules, or rule names mapped to rules. Ex: Mean QmVideo MOS >= 4 where Entity Name ~ VQA
+        - skip              : <string> ; Condition of rows which are not evaluated. Default value skips entities with IP address 0.0.0.0 (out of service or no DHCP)
+        - mustPass          : <string> ; true raises an AssertionError if a rule failed. Default value is false
+        - chunkRows         : <integer> ; Streaming mode for very large files: the file is evaluated in chunks of this many rows with bounded memory and only a
+                              summary is logged (counts, failures and worst offenders per rule). Default value is 0, the whole file at once with a log line per check
+        - detailFile        : <string> ; Streaming mode: csv file receiving the verdict, per rule result and value of every entity, gzip compressed if
+                              it ends with .gz
+        - worst             : <integer> ; Streaming mode: number of worst offenders kept per rule. Default value is 10, see verdictLoggingSet
+
+        With compact verdict logging (see verdictLoggingSet) the file is always evaluated in streaming mode.
+
+        | ${rules} | Create List | Mean QmVideo MOS >= 4 where Entity Name ~ VQA | Joins Completed / Joins Initiated >= 0.95 where Entity Name ~ Zap |
+        | ${table} | Evaluate Rules | ${OUTPUT DIR}/Summary_Multicast_Client.csv | ${rules} | mustPass=true |
+
+        *Returns* : verdict table, list of dictionaries with the keys Entity Name, verdict (PASS, FAIL, SKIP or NONE if no rule applies) and PASS/FAIL/empty per rule.
+        In streaming mode a summary dictionary with the keys rows, counts (per verdict), rules (name, checked, failed, worst) and failingNames (the first 1000)
+        """
+        if isinstance(rules, basestring):
+            rules = [rules]
+        ruleSet = ShenickRules.RuleSet(rules, skip=skip)
+
+        if int(chunkRows or 0) > 0 or self._verdictLogging['mode'] == 'compact':
+            summary = self._evaluateSummary(ruleSet, csvFilePath, chunkRows, worst, detailFile)
+            if str(mustPass).lower() == 'true' and not summary.allPassed():
+                raise AssertionError('%d entities failed: %s' % (summary.counts['FAIL'], ', '.join(summary.failingNames[:10])))
+            return summary.asDict()
+
+        verdicts = ruleSet.evaluateFile(csvFilePath)
+        for message in verdicts.messages():
+            logger.info(message)
+
+        counts = verdicts.counts()
+        logger.info('%(PASS)d entities passed, %(FAIL)d failed, %(SKIP)d skipped, %(NONE)d without rules' % counts)
+        if str(mustPass).lower() == 'true' and not verdicts.allPassed():
+            raise AssertionError('%d rule checks failed: %s' % (len(verdicts.failures()), ', '.join('<%(entity)s> %(rule)s: %(value)g' % failure
+                                                                                                     for failure in verdicts.failures()[:10])))
+        return verdicts.rows()
+
+    def ingestResults(self, database, runName, resultsFilePath='', summaryPath='', testGroup=''):
+        """
+        This method loads the results of a run into a local SQLite results warehouse, so trends over many runs can be queried
+        with getStatisticsTrend without keeping and parsing the results zip files. Ingesting a run again replaces its values.
+
+        *Parameters* :
+        - *database*        : <string> ; Path to the SQLite database file, created if it does not exist. Ex: C:\\diversifEyeClient\\results.db
+        - *runName*         : <string> ; Unique name of the run. Ex: nightly-2016-08-01
+        - resultsFilePath   : <string> ; Path to results zip file. Ex: C:\\diversifEyeClient\\analysis\\bin\\IPTV.Zip
+        - summaryPath       : <string> ; Summary csv file or directory searched for Summary_*.csv files, stored as entity type summary. Ex: C:\\diversifEyeClient\\IPTV\\output
+        - testGroup         : <string> ; Test group of the run. Ex: //GPON/GPON_Triple_Play_LoadTest
+
+        *Returns* : number of values stored
+        """
+        warehouse = ShenickWarehouse.getWarehouse(database)
+        count = 0
+
+        if resultsFilePath:
+            count += warehouse.ingestZip(resultsFilePath, runName, testGroup)
+
+        summaryFiles = []
+        if os.path.isdir(summaryPath):
+            for root, dirs, files in os.walk(summaryPath):
+                summaryFiles += [os.path.join(root, f) for f in sorted(files) if f.startswith('Summary_') and f.lower().endswith('.csv')]
+        elif summaryPath:
+            summaryFiles.append(summaryPath)
+
+        for summaryFile in summaryFiles:
+            count += warehouse.ingestSummary(summaryFile, runName, testGroup)
+
+        logger.info('%d values of run %s stored in %s' % (count, runName, database))
+        return count
+
+    def getStatisticsTrend(self, database, column, entityName='%', aggregate='avg', lastRuns=50, entityType='', testGroup=''):
+        """
+        This method returns one value per run from the results warehouse filled with ingestResults, e.g. the minimum MOS of a channel over the last 50 runs.
+
+        *Parameters* :
+        - *database*        : <string> ; Path to the SQLite database file
+        - *column*          : <string> ; Column label. Ex: QmVideo MOS or Mean QmVideo MOS (summary)
+        - entityName        : <string> ; Entity name, SQL LIKE pattern (% matches anything). Default value is %
+        - aggregate         : <string> ; avg, min, max, sum or count over the entities and intervals of a run. Default value is avg
+        - lastRuns          : <integer> ; Number of latest runs, 0 for all. Default value is 50
+        - entityType        : <string> ; application, host, interface, aggregate, testgroup or summary. Default value is all
+        - testGroup         : <string> ; Only runs of this test group
+
+        *Returns* : list of (run name, value), oldest run first
+        """
+        return ShenickWarehouse.getWarehouse(database).trend(column, entityName, aggregate, entityType, testGroup, lastRuns)
+
+
+# presets of the re-analysis: name, rule function, table summarised, thresholds required
+REANALYSIS_PRESETS = [
+    ('IGMP', igmpRules, 'IGMP Client', ['mosAppType', 'zapAppType']),
+    ('HTTP', httpRules, 'HTTP Client', ['appType', 'goodput']),
+]
+
+def reanalysisPresets(thresholds):
+    """
+    Returns the presets (name, rules, table) of REANALYSIS_PRESETS whose required thresholds are given.
+    """
+    presets = []
+    for name, ruleFunction, table, required in REANALYSIS_PRESETS:
+        if all(key in thresholds for key in required):
+            presets.append((name, ruleFunction(dict(thresholds)), table))
+    return presets
+
+def findArchives(patterns):
+    """
+    Returns the zip files of directories (searched recursively) and glob patterns, sorted and without duplicates.
+    """
+    archives = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, directories, files in os.walk(pattern):
+                archives.update(os.path.join(root, name) for name in files if name.lower().endswith('.zip'))
+        else:
+            archives.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(os.path.abspath(path) for path in archives)
+
+def _reanalyseArchive(job):
+    """
+    Pool worker: summarises one results zip file and evaluates the presets, returns (archive, digest, rows, cached, error).
+    The rows of _cached_ are returned if the digest of the zip file did not change.
+    """
+    archivePath, thresholds, cumulative, cached = job
+    try:
+        digest = ShenickTransfer.fileDigest(archivePath)
+        if cached and cached['digest'] == digest:
+            return archivePath, digest, cached['rows'], True, None
+
+        presets   = reanalysisPresets(thresholds)
+        directory = tempfile.mkdtemp(prefix='reanalysis_')
+        try:
+            with ShenickTables.openStatsArchive(archivePath) as archive:
+                ShenickSummary.summariseArchive(archive, directory, [table for name, rules, table in presets], cumulative)
+            rows = []
+            for name, rules, table in presets:
+                summaryPath = os.path.join(directory, ShenickSummary.summaryFileName(table))
+                if not os.path.isfile(summaryPath):
+                    continue
+                for row in ShenickRules.RuleSet(rules, skip=NO_ADDRESS).evaluateFile(summaryPath).rows():
+                    row.update({'Archive': archivePath, 'Preset': name})
+                    rows.append(row)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return archivePath, digest, rows, False, None
+    except Exception as e:
+        return archivePath, None, [], False, '%s: %s' % (e.__class__.__name__, e)
+
+def reanalyse(patterns, thresholds, outputPath, cachePath='', workers=0, cumulative=True):
+    """
+    Evaluates the IGMP and HTTP presets (evaluateIgmpApplications, evaluateHttpApplications) with the limits of _thresholds_
+    on all results zip files of _patterns_ (directories or glob patterns), one zip file per process of a pool of _workers_
+    processes (0: one per cpu). The verdicts of all entities are written to the csv file _outputPath_ with the columns
+    Archive, Preset, Entity Name, verdict and PASS/FAIL per rule.
+
+    Results are kept in the json file _cachePath_ by the md5 digest of the zip file and the thresholds, unchanged zip files
+    are not evaluated again. Returns {archive: (verdict counts, cached, error)}.
+    """
+    presets = reanalysisPresets(thresholds)
+    if not presets:
+        raise AssertionError('no preset can be evaluated, give mosAppType and zapAppType (IGMP) or appType and goodput (HTTP)')
+    archives = findArchives(patterns)
+    if not archives:
+        raise AssertionError('no zip files found in %s' % ', '.join(patterns))
+
+    # cached results only apply to the same thresholds
+    settings = json.dumps({'thresholds': thresholds, 'cumulative': bool(cumulative)}, sort_keys=True)
+    cache    = {}
+    if cachePath and os.path.isfile(cachePath):
+        with open(cachePath, 'rb') as cacheFile:
+            cache = json.load(cacheFile)
+    jobs = [(archive, thresholds, cumulative, cache[archive] if archive in cache and cache[archive]['settings'] == settings else None)
+            for archive in archives]
+
+    workers = min(int(workers) or multiprocessing.cpu_count(), len(jobs))
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(_reanalyseArchive, jobs, 1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_reanalyseArchive(job) for job in jobs]
+
+    ruleNames = [rule.name for name, rules, table in presets for rule in rules]
+    outcome   = {}
+    with open(outputPath, 'wb') as outputFile:
+        writer = csv.DictWriter(outputFile, ['Archive', 'Preset', 'Entity Name', 'verdict'] + ruleNames, restval='', lineterminator='\n')
+        writer.writeheader()
+        for archive, digest, rows, cached, error in results:
+            writer.writerows(rows)
+            counts = dict.fromkeys(['PASS', 'FAIL', 'SKIP', 'NONE'], 0)
+            for row in rows:
+                counts[row['verdict']] += 1
+            outcome[archive] = (counts, cached, error)
+            if error is None:
+                cache[archive] = {'digest': digest, 'settings': settings, 'rows': rows}
+            else:
+                cache.pop(archive, None)
+
+    if cachePath:
+        with open(cachePath, 'wb') as cacheFile:
+            json.dump(cache, cacheFile)
+    return outcome
 
 
 if __name__ == '__main__':
-    instance = TrafficAnalysis()
-    instance.evaluateHttpApplications()
\ No newline at end of file
+    # re-evaluates archived results zip files (IPTV.zip, csvStatistics.zip, ...) with new limits, ex:
+    #   python TrafficAnalysis.py /results/2017-* -t mosAppType=VQA -t zapAppType=Zap -t qmVideoMOSLimit=3.8 -o verdicts.csv
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-evaluate results zip files with the IGMP/HTTP presets of TrafficAnalysis',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('archives', nargs='+', help='results zip files: directories (searched recursively) or glob patterns')
+    parser.add_argument('-t', '--threshold', action='append', default=[], metavar='KEY=VALUE',
+                        help='paramDict entry of evaluateIgmpApplications/evaluateHttpApplications, ex: qmVideoMOSLimit=3.8')
+    parser.add_argument('-f', '--thresholds-file', help='json file with the paramDict entries, -t overrides them')
+    parser.add_argument('-o', '--output', default='verdicts.csv', help='consolidated verdict table')
+    parser.add_argument('-c', '--cache', default='reanalysisCache.json', help='results by zip file digest, empty to disable')
+    parser.add_argument('-w', '--workers', type=int, default=0, help='processes, 0 for one per cpu')
+    parser.add_argument('--interval-totals', action='store_true', help='the statistics were not saved cumulative, counters are summed')
+    parsed = parser.parse_args()
+
+    thresholds = {}
+    if parsed.thresholds_file:
+        with open(parsed.thresholds_file, 'rb') as thresholdsFile:
+            thresholds.update(json.load(thresholdsFile))
+    for item in parsed.threshold:
+        if '=' not in item:
+            parser.error('threshold %s is not KEY=VALUE' % item)
+        key, value = item.split('=', 1)
+        thresholds[key.strip()] = value.strip()
+
+    try:
+        outcome = reanalyse(parsed.archives, thresholds, parsed.output, parsed.cache, parsed.workers, not parsed.interval_totals)
+    except AssertionError as e:
+        parser.error(str(e))
+
+    for archive in sorted(outcome):
+        counts, cached, error = outcome[archive]
+        if error:
+            print '%s: ERROR %s' % (archive, error)
+        else:
+            print '%s: %d PASS, %d FAIL, %d SKIP, %d without rules%s' % (archive, counts['PASS'], counts['FAIL'], counts['SKIP'], counts['NONE'],
+                                                                    ' (cached)' if cached else '')
+    print 'verdicts written to %s' % parsed.output
+    sys.exit(1 if any(error for counts, cached, error in outcome.values()) else 0)
@@ -1,9 +1,12 @@
 #THIS SCRIPT GETS SHENICK HOST STATUS INFORMATION.  THE USER PROVIDES THE TEST
 #GROUP AND APPLICATION NAME LIST AS AN INPUT
 #################################################################################
-import paramiko
+import os
 import time
 import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot', 'shenick'))
+import ShenickPool
+import ShenickChannel
 hoststat_list = []
 hostname_list = []
 input_hostname_list = []
@@ -19,9 +22,18 @@ input_hostname_list = ["httpclt2-8","httpclt2-21","httpclt1-18", "httpclt2-4"]
 ip = '10.13.225.38'
 username = 'cli'
 password = 'diversifEye'
-remote_conn_pre=paramiko.SSHClient()
-remote_conn_pre.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-remote_conn_pre.connect(ip,username=username,password=password)
+shenick_user = 'osp'
+
+#THE SESSION COMES FROM THE PROCESS-WIDE POOL, SO A CONNECTION OPENED BY ANOTHER
+#MODULE FOR THE SAME CHASSIS, USER AND PARTITION IS REUSED. NEW SESSIONS ARE
+#SET TO THE SHENICK USER WHEN THEY ARE CREATED.
+def connect():
+    return ShenickPool.connectShell(ip, username, password)
+
+def setup(session):
+    session.reader.execute("cli configure cliDefaultDiversifEyeUser=" + shenick_user)
+
+session = ShenickPool.getPool().acquire((ip, username, shenick_user, None), connect, setup)
 
 #########################################################################
 # THE TARGET TEST GROUP IS ANTICIPATED TO BE PROVIDED VIA ANOTHER
@@ -31,26 +43,14 @@ testgroup = "'//OSP_ERPS_Stateful-OSP-COT'"
 
 #########################################################################
 
-remote_conn=remote_conn_pre.invoke_shell()
-output=remote_conn.recv(2000)
 sys.stdout.flush()
-#########################################################################
-#SHENICK USER IS HARD CODED HERE.  THIS LINE MAY NOT BE NECESSARY
-remote_conn.send("cli configure cliDefaultDiversifEyeUser=osp\n")
-#########################################################################
 
 sys.stdout.flush()
-remote_conn.send("cli listHosts "+(testgroup)+"\n")
-time.sleep(3)
-var_hoststat = remote_conn.recv(10000)
-temp_hoststat_list = var_hoststat.split("\r\n")
-
-for lstdex, elem in enumerate(temp_hoststat_list):
-  if "IP/" in elem:
-    elem = elem.strip("IP/")
-    hostname = elem.split(" ")
-    hostname = hostname[0]
-    hoststat_list.append(elem)
+#THE OUTPUT IS READ LINE BY LINE UNTIL THE PROMPT RETURNS, ONLY THE REQUESTED
+#ENTRIES ARE KEPT SO EVEN LARGE TEST GROUPS ARE NEITHER TRUNCATED NOR HELD IN MEMORY
+for hostname, state in ShenickChannel.parseApplications(session.reader.iterLines("cli listHosts "+(testgroup))):
+  if hostname in input_hostname_list:
+    hoststat_list.append(hostname + " " + state)
     hostname_list.append(hostname)
 
 for dex, hstname in enumerate(input_hostname_list):
@@ -63,8 +63,4 @@ for dex, hstname in enumerate(input_hostname_list):
   
   
 
-
-
-
-
-
+ShenickPool.getPool().release(session)
@@ -2,9 +2,12 @@
 #THIS SCRIP SETS THE SERVICE STATE OF  ALL OR LISTS OF SHENICK APPLICATIONS
 #TO IN SERVICE OR OUT OF SERVICE
 ############################################################################
-import paramiko
+import os
 import time
 import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'robot', 'shenick'))
+import ShenickPool
+import ShenickChannel
 applist2 = []
 appidlist = []
 appidtemplist = []
@@ -31,9 +34,18 @@ inservicelist = ["httpclt4-01","httpclt3-45","httpclt3-08"]
 ip = '10.13.225.38'
 username = 'cli'
 password = 'diversifEye'
-remote_conn_pre=paramiko.SSHClient()
-remote_conn_pre.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-remote_conn_pre.connect(ip,username=username,password=password)
+shenick_user = 'osp'
+
+#THE SESSION COMES FROM THE PROCESS-WIDE POOL, SO A CONNECTION OPENED BY ANOTHER
+#MODULE FOR THE SAME CHASSIS, USER AND PARTITION IS REUSED. NEW SESSIONS ARE
+#SET TO THE SHENICK USER WHEN THEY ARE CREATED.
+def connect():
+    return ShenickPool.connectShell(ip, username, password)
+
+def setup(session):
+    session.reader.execute("cli configure cliDefaultDiversifEyeUser=" + shenick_user)
+
+session = ShenickPool.getPool().acquire((ip, username, shenick_user, None), connect, setup)
 
 #################################################################
 # THE TEST GROUP IS DEFINED HERE.  IT IS ANTICIPATED THAT THIS MIGHT BE INPUT
@@ -43,34 +55,19 @@ testgroup = "//OSP_ERPS_Stateful-OSP-COT"
 ##########################################################################
 def is_oos_all():
     for lstdex, elem in enumerate(appidlist):
-      remote_conn.send("cli setServiceStateOfApplications "+(elem)+" "+(srvstateall)+"\n")
+      session.reader.execute("cli setServiceStateOfApplications "+(elem)+" "+(srvstateall))
       print("cli setServiceStateOfApplications "+(elem)+" " +(srvstateall)+"\n")
 
 
 #################################################################################################################
 
 
-remote_conn=remote_conn_pre.invoke_shell()
-output=remote_conn.recv(2000)
-
-remote_conn.send("cli configure cliDefaultDiversifEyeUser=osp\n")
 ##########################################################################
 sys.stdout.flush()
-time.sleep(1)
-remote_conn.send("cli getAppIds //OSP_ERPS_Stateful-OSP-COT %\n")
-time.sleep(3)
 #########################################################################
-#The number of output bytes received is defined here.  This might need to 
-#be tunded depending on the number of applications that are to be listed.
-output = remote_conn.recv(20000)
-
-
-time.sleep(1)
-appidtemplist = output.split("\r\n")
-for lstdex, elem in enumerate(appidtemplist):
-    string_test_var = elem
-    if "//" in elem and string_test_var.startswith("//"):
-        appidlist.append(elem)
+#The output is read line by line until the prompt returns, so the list is
+#complete regardless of the number of applications in the test group.
+appidlist = list(ShenickChannel.parseAppIds(session.reader.iterLines("cli getAppIds //OSP_ERPS_Stateful-OSP-COT %")))
 
 time.sleep(.1)
 compositelist = []
@@ -92,9 +89,7 @@ if len(outservicelist) > 0:
     for lstdex, theappname in enumerate(outservicelist):
         for dex, theappid in enumerate(appidlist):
             if theappname in theappid:
-                remote_conn.send("cli setServiceStateOfApplications "+(theappid)+" 'Out of Service'\n")
-                output =remote_conn.recv(1000)
-                time.sleep(.2)
+                session.reader.execute("cli setServiceStateOfApplications "+(theappid)+" 'Out of Service'")
                 
 #THE FOLLOWING SETS THE APPLICATIONS LIST PROVIDED IN THE enablelist TO ENABLED.
 if len(inservicelist) > 0:
@@ -102,10 +97,9 @@ if len(inservicelist) > 0:
         for dex, theappid in enumerate(appidlist):
             if theappname in theappid:
                 print(theappid)
-                remote_conn.send("cli setServiceStateOfApplications "+(theappid)+" 'In Service'\n")
-                output =remote_conn.recv(1000)
-                time.sleep(.2)
+                session.reader.execute("cli setServiceStateOfApplications "+(theappid)+" 'In Service'")
 
 
 #################################################################################################################
 
+ShenickPool.getPool().release(session)
@@ -4,42 +4,55 @@
 import os
 import re
 import time
+import socket
 import tempfile
 import paramiko
 import scp
 import csv
-import glob
-import shutil
-import zipfile
+import ShenickChannel
+import ShenickPool
+import ShenickMetrics
+import ShenickTables
+import ShenickCache
+import ShenickColumnCache
+import ShenickWarehouse
+import ShenickTransfer
+import ShenickAggregate
 from robot.libraries.BuiltIn import BuiltIn
-from collections import defaultdict
+from contextlib import closing, contextmanager
 
 # for online help: python -m robot.libdoc Shenick.py::0.0.0.0 Shenick.html
 
 class Shenick():
   """
   Mandatory parameter:
-  - tvmcIp: ipAddress of TVM-C
+  - tvmcIp: ipAddress of TVM-C, optionally with the ssh port as <ip>:<port>
 
   Optional parameter:
   - tvmUser, default: robot
+  - commandTimeout: seconds a single cli command may take, default: 600
 
   Requirements:
   - paramiko (gentoo: "emerge paramiko", *buntu/debian: "apt-get install python-paramiko")
   - scp (gentoo/*buntu/debian: "pip install scp")
+  - numpy (gentoo: "emerge numpy", *buntu/debian: "apt-get install python-numpy")
   """
 
   ROBOT_LIBRARY_VERSION = '0.1'
   ROBOT_LIBRARY_SCOPE   = 'GLOBAL'
+  ROBOT_LISTENER_API_VERSION = 2
 
-  def __init__(self, tvmcIp, tvmUser='robot'):
+  def __init__(self, tvmcIp, tvmUser='robot', commandTimeout=600):
+    self.ROBOT_LIBRARY_LISTENER = self
     self._tvmcIp    = tvmcIp
     self._tvmcUser  = tvmUser
     self._sshUser   = 'cli'
     self._sshPwd    = 'diversifEye'
     self._tmpFile   = None
-    self._sshClient = None
     self._tgName    = None
+    self._commandTimeout = int(commandTimeout)
+    self._pollState = {}
+    self._transferOptions = dict(ShenickTransfer.DEFAULT_OPTIONS)
 
   def __del__(self):
     if self._tmpFile is not None:
@@ -143,83 +156,221 @@ class Shenick():
     # create a test group; define name here as we need the same name to delete old test groups
     self._write('my $Tg = diversifEye::TestGroup->new(name=>"%s", LowMemory=>%s);' % (tgName, lowMemory) )
 
-  def _createSshClient(self):
+  def _createSshClient(self, compress=False):
     """
-    Creates a ssh client, invokes a shell and returns a channel to this shell.
+    Creates a ssh client, invokes a shell and returns a channel to this shell. Used by the connection pool.
     """
     try:
-      client = paramiko.SSHClient()
-      client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-      client.connect(self._tvmcIp, username=self._sshUser, password=self._sshPwd )
-      channel = client.invoke_shell(width=256)
+      with ShenickMetrics.getMetrics().measure('connect'):
+        host, port = ShenickPool.splitAddress(self._tvmcIp)
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(host, port=port, username=self._sshUser, password=self._sshPwd, compress=compress )
+        channel = client.invoke_shell(width=256)
     except:
       raise AssertionError('could not open ssh connection.')
     return client, channel
 
-  def _reconnectSshClient(self):
+  def _sshSession(self):
     """
-    Checks if a ssh client is already open and, if so, checks if it is still active.
-    Otherwise a new client is started. Returns the current ssh client.
+    Leases a live ssh session from the process-wide connection pool, new sessions get the default cli options.
+    The tvm user is passed with '-u' on every command, so all users of a controller share the same sessions.
     """
+    key = (self._tvmcIp, self._sshUser, None, None)
+    return ShenickPool.getPool().lease(key, self._createSshClient, self._enableDefaultCliOptions)
+
+  def _transferSession(self):
+    """
+    Leases a session for file transfers, compressed transfers use separate compressed connections.
+    """
+    if not self._transferOptions['compress']:
+      return self._sshSession()
+    key = (self._tvmcIp, self._sshUser, None, 'compressed')
+    return ShenickPool.getPool().lease(key, lambda: self._createSshClient(compress=True), self._enableDefaultCliOptions)
+
+  def _sftpClient(self, session):
+    options = self._transferOptions
+    return paramiko.SFTPClient.from_transport(session.client.get_transport(), window_size=options['windowSize'])
+
+  def _remoteDigest(self, path, size=None):
+    if size is not None:
+      return self._execSshCommand('head -c %d "%s" | md5sum' % (size, path)).split()[0]
+    return self._execSshCommand('md5sum "%s"' % path).split()[0]
+
+  def _sftpTransfer(self, verb, counter, transfer):
+    """
+    Runs transfer(sftp client) on a leased session and stores the bytes it returns in the metrics counter _counter_.
+    A dropped connection is retried on a new session, which continues the .part file (with resume) within this call,
+    before the remote file can change (e.g. by the saveStats of a retried statisticsSave).
+    """
+    attempt = 0
+    while True:
+      try:
+        with ShenickMetrics.getMetrics().measure(verb) as counters, self._transferSession() as session:
+          sftp = self._sftpClient(session)
+          try:
+            counters[counter] = transfer(sftp)
+            return
+          finally:
+            sftp.close()
+      except (EOFError, socket.error, paramiko.SSHException) as e:
+        attempt += 1
+        if attempt > self._transferOptions['retries']:
+          raise
+        print '*WARN* sftp connection lost (%s), retrying %d of %d' % (e, attempt, self._transferOptions['retries'])
+
+  def _putFile(self, local, remote):
+    """
+    Uploads a file with the backend set with transferOptionsSet.
+    """
+    options = self._transferOptions
+    if options['backend'] == 'scp':
+      return self._scpPutFile(local, remote)
+
     try:
-      if self._sshClient.get_transport().is_active() is True:
-        pass
-    except:
-      self._sshClient, self._sshChannel = self._createSshClient()
-      self._enableDefaultCliOptions()
-    finally:
-      return self._sshClient, self._sshChannel
+      self._sftpTransfer('sftpPut', 'bytesSent', lambda sftp: ShenickTransfer.sftpPut(
+        sftp, local, remote, options['chunkSize'], options['resume'], self._remoteDigest if options['verify'] else None))
+    except Exception as e:
+      raise AssertionError('sftp put of %s failed: %s' % (local, e))
+
+  def _getFile(self, remote, local):
+    """
+    Downloads a file with the backend set with transferOptionsSet.
+    """
+    options = self._transferOptions
+    if options['backend'] == 'scp':
+      return self._scpGetFile(remote, local)
+
+    try:
+      self._sftpTransfer('sftpGet', 'bytesReceived', lambda sftp: ShenickTransfer.sftpGet(
+        sftp, remote, local, options['chunkSize'], options['maxRequests'], options['resume'], self._remoteDigest if options['verify'] else None))
+    except Exception as e:
+      raise AssertionError('sftp get of %s failed: %s' % (remote, e))
+
+  def transferOptionsSet(self, backend='sftp', windowMegabytes=8, chunkKilobytes=32, maxRequests=64, compress='false', resume='true', verify='true',
+                         retries=3):
+    """
+    Sets how files are transferred to and from the TVM-C (statisticsSave, testGroupUpload, debugFilesGet).
+    - backend: _*sftp*_ , _scp_
+    - windowMegabytes: ssh channel window of sftp transfers, default: 8
+    - chunkKilobytes: size of a single sftp read/write request, default: 32
+    - maxRequests: number of sftp read requests in flight, default: 64
+    - compress: _*false*_ , _true_ ; ssh compression, pays off for csv statistics on slow links
+    - resume: _false_ , _*true*_ ; interrupted transfers leave a <file>.part which is continued by the retries and the next transfer of the
+      file, if its md5 checksum shows it is the beginning of the file. Needs verify, without it transfers always start over
+    - verify: _false_ , _*true*_ ; compare the md5 checksum of both sides after the transfer
+    - retries: number of reconnects of a transfer after the connection was lost, default: 3
+
+    | transferOptionsSet | sftp | compress=true |
+    | transferOptionsSet | scp  |
+    """
+    if backend not in ['sftp', 'scp']:
+      raise AssertionError('unknown transfer backend "%s", use sftp or scp' % backend)
+
+    self._transferOptions = {
+      'backend':     backend,
+      'windowSize':  int(float(windowMegabytes) * (1 << 20)),
+      'chunkSize':   int(float(chunkKilobytes) * 1024),
+      'maxRequests': int(maxRequests),
+      'compress':    str(compress).lower() == 'true',
+      'resume':      str(resume).lower() == 'true',
+      'verify':      str(verify).lower() == 'true',
+      'retries':     int(retries),
+    }
 
   def _scpPutFile(self, local, remote):
-    client, channel = self._reconnectSshClient()
     try:
-      scpClient = scp.SCPClient(client.get_transport())
-      scpClient.put(local, remote)
+      with ShenickMetrics.getMetrics().measure('scpPut') as counters, self._sshSession() as session:
+        counters['bytesSent'] = ShenickMetrics.localFileSize(local)
+        scpClient = scp.SCPClient(session.client.get_transport())
+        scpClient.put(local, remote)
     except:
       raise AssertionError('scp put failed.')
 
   def _scpGetFile(self, remote, local):
-    client, channel = self._reconnectSshClient()
     try:
-      scpClient = scp.SCPClient(client.get_transport())
-      scpClient.get(remote, local)
+      with ShenickMetrics.getMetrics().measure('scpGet') as counters, self._sshSession() as session:
+        scpClient = scp.SCPClient(session.client.get_transport())
+        scpClient.get(remote, local)
+        counters['bytesReceived'] = ShenickMetrics.localFileSize(local, remote)
     except:
       raise AssertionError('scp get failed.')
 
-  def _execSshCommand(self, command):
-    client, channel = self._reconnectSshClient()
-    output = ''
-
+  def _execSshCommand(self, command, session=None):
     try:
-      # clear leftovers
-      while channel.recv_ready():
-        channel.recv(1)
-      # send the command
-      channel.send(command + '\n')
-      # wait until channel has data
-      while not channel.recv_ready():
-        time.sleep(0.1)
-      # read until end of prompt
-      while not output.endswith('$ '):
-        while channel.recv_ready():
-          output += channel.recv(1)
-      # check for errors
-      if 'cli>ERROR:' in output:
-        assert False, output
+      with ShenickMetrics.getMetrics().measure('command', ShenickMetrics.commandVerb(command)) as counters:
+        counters['bytesSent'] = len(command) + 1
+        if session is None:
+          with self._sshSession() as session:
+            output = session.reader.execute(command, self._commandTimeout)
+        else:
+          output = session.reader.execute(command, self._commandTimeout)
+        counters['bytesReceived'] = len(output)
+        # check for errors
+        if 'cli>ERROR:' in output:
+          assert False, output
 
     except AssertionError as e:
       raise AssertionError('ssh command "%s" failed with error "%s"' % (command, e))
 
+    stats = session.reader.lastStats
+    print '*DEBUG* "%s": %d bytes in %.3fs (%.0f bytes/s)' % (command, stats.bytes, stats.seconds, stats.bytesPerSecond)
+
     # return output without command and prompt
     return '\n'.join(output.splitlines()[1:-1])
 
-  def _enableDefaultCliOptions(self):
+  def _iterSshCommand(self, command):
+    """
+    Generator version of _execSshCommand, yields the output lines of _command_ as they arrive so
+    large outputs are never held in memory. Errors are raised after the whole output was read.
+    """
+    error = []
+    try:
+      with ShenickMetrics.getMetrics().measure('command', ShenickMetrics.commandVerb(command)) as counters:
+        counters['bytesSent'] = len(command) + 1
+        with self._sshSession() as session:
+          with closing(session.reader.iterLines(command, self._commandTimeout)) as lines:
+            for line in lines:
+              # check for errors, the error and everything after it is not yielded
+              if error or 'cli>ERROR:' in line:
+                error.append(line)
+              else:
+                yield line
+          counters['bytesReceived'] = session.reader.lastStats.bytes
+        if error:
+          assert False, '\n'.join(error)
+
+    except AssertionError as e:
+      raise AssertionError('ssh command "%s" failed with error "%s"' % (command, e))
+
+    stats = session.reader.lastStats
+    print '*DEBUG* "%s": %d bytes in %.3fs (%.0f bytes/s)' % (command, stats.bytes, stats.seconds, stats.bytesPerSecond)
+
+  def _execSshBatch(self, commands):
+    """
+    Executes all _commands_ with a single round-trip, returns a list of ShenickChannel.BatchResult
+    (command, output, error). Errors are not raised, error is None if the command succeeded.
+    """
+    try:
+      with ShenickMetrics.getMetrics().measure('batch', 'batch') as counters, self._sshSession() as session:
+        counters['bytesSent'] = sum([len(command) + 1 for command in commands])
+        results = session.reader.executeBatch(commands, self._commandTimeout)
+        counters['bytesReceived'] = session.reader.lastStats.bytes
+    except AssertionError as e:
+      raise AssertionError('ssh batch of %d commands failed with error "%s"' % (len(commands), e))
+
+    stats = session.reader.lastStats
+    print '*DEBUG* %s: %d bytes in %.3fs (%.0f bytes/s)' % (stats.command, stats.bytes, stats.seconds, stats.bytesPerSecond)
+
+    return results
+
+  def _enableDefaultCliOptions(self, session):
     """
     Enables persistent background mode if it is not enabled yet. Suggested by Shenick documentation.
     Also, disable notifications, might conflict with output of other commands.
     """
-    if not 'true' in self._execSshCommand('cli available'):
-      self._execSshCommand('cli start')
+    if not 'true' in self._execSshCommand('cli available', session):
+      self._execSshCommand('cli start', session)
 
     # found in CLI_User_Guide.pdf but cli does not know this...
     #self._execSshCommand('cli reportNotifications false')
@@ -1079,6 +1230,9 @@ class Shenick():
     - tgName: name of test group to be started
     """
     self._execSshCommand('cli -u %s startTestGroup "//%s"' % (self._tvmcUser, tgName))
+    # a new run, polling starts over and cached statistics are outdated
+    self._pollState = {}
+    ShenickCache.getCache().started(self._tvmcIp)
 
   def testGroupStop(self, tgName):
     """
@@ -1086,6 +1240,7 @@ class Shenick():
     - tgName: name of test group to be stopped
     """
     self._execSshCommand('cli -u %s stopTestGroup "//%s"' % (self._tvmcUser, tgName))
+    ShenickCache.getCache().stopped(self._tvmcIp)
 
   def testGroupDelete(self, tgName='all'):
     """
@@ -1093,39 +1248,76 @@ class Shenick():
     - tgName: name of test group to be delete, if 'all' all test groups will be deleted.
     """
     if tgName != 'all':
-      try:
-        self.testGroupStop(tgName)
-      except:
-        pass
-      self._execSshCommand('cli -u %s deleteTestGroup "//%s"' % (self._tvmcUser, tgName))
+      tgNames = [tgName]
     else:
-      for tgName in self.testGroupStatusGet().keys():
-        self.testGroupDelete(tgName)
+      tgNames = self.testGroupStatusGet().keys()
+
+    # stop (may fail if not running) and delete all test groups with one round-trip
+    commands = []
+    for tgName in tgNames:
+      commands.append('cli -u %s stopTestGroup "//%s"'   % (self._tvmcUser, tgName))
+      commands.append('cli -u %s deleteTestGroup "//%s"' % (self._tvmcUser, tgName))
+
+    for result in self._execSshBatch(commands)[1::2]:
+      if result.error is not None:
+        raise AssertionError('ssh command "%s" failed with error "%s"' % (result.command, result.error))
     return True
 
-  def testGroupStatusGet(self):
+  def _end_suite(self, name, attributes):
     """
-    Returns a dictionary containing the test groups as key and 'running' or 'stopped' as value.
+    Listener method, writes the I/O metrics to shenickIoMetrics.json in the output directory at the end of every suite.
     """
-    output = self._execSshCommand('cli -u %s listTestGroups' % self._tvmcUser)
+    outputDir = BuiltIn().get_variable_value('${OUTPUT DIR}')
+    if outputDir:
+      ShenickMetrics.getMetrics().dump(os.path.join(outputDir, 'shenickIoMetrics.json'))
 
-    tgDict = {}
+  def getIoMetrics(self, reset='false'):
+    """
+    Returns the controller I/O metrics of this test run (shared by all Shenick and ShenickCli instances) as dictionary:
+    - operations: per operation (connect, command, batch, scpPut, scpGet, sftpPut, sftpGet)
+    - verbs: per command verb (e.g. getStat, saveStats, importTestGroup, perl)
+    each with count, errors, totalSeconds, meanSeconds, minSeconds, maxSeconds, bytesSent, bytesReceived and
+    a latency histogram (upper bucket bound: count).
+    - reset: true|false, clear the metrics after reading them (default: false)
+    """
+    metrics  = ShenickMetrics.getMetrics()
+    snapshot = metrics.snapshot()
+    if str(reset).lower() == 'true':
+      metrics.reset()
+    return snapshot
 
-    for line in output.splitlines():
-      if not line.startswith('//'):
-        continue
+  def dumpIoMetrics(self, fileName):
+    """
+    Writes the controller I/O metrics (see getIoMetrics) as JSON to fileName, returns fileName.
+    They are also written to ${OUTPUT DIR}/shenickIoMetrics.json at the end of every suite.
+    """
+    return ShenickMetrics.getMetrics().dump(fileName)
 
-      tgName = line[2:].replace('<<<Running>>>', '').replace('<<<Last>>>', '').rstrip()
+  def executeBatch(self, commands, failOnError='true'):
+    """
+    Executes a list of commands on the controller. All commands are written to the shell at once and the
+    combined output is split up again per command, so the whole list costs a single round-trip.
+    A failing command does not stop the following ones.
+    - commands: list of commands, e.g. ['cli -u robot listTestGroups', 'cli -u robot getStat ...']
+    - failOnError: true|false, raise an error after the batch if any command failed (default: true)
 
-      if tgName.endswith('/') or tgName == '':
-        continue
+    Returns a list of dictionaries with the keys 'command', 'output' and 'error' (None if the command succeeded).
+    """
+    results = self._execSshBatch(list(commands))
 
-      if '<<<Running>>>' in line:
-        tgDict[tgName] = 'running'
-      else:
-        tgDict[tgName] = 'stopped'
+    errors = [result for result in results if result.error is not None]
+    if errors and str(failOnError).lower() == 'true':
+      raise AssertionError('\n'.join(['ssh command "%s" failed with error "%s"' % (result.command, result.error) for result in errors]))
+
+    return [result._asdict() for result in results]
+
+  def testGroupStatusGet(self):
+    """
+    Returns a dictionary containing the test groups as key and 'running' or 'stopped' as value.
+    """
+    lines = self._iterSshCommand('cli -u %s listTestGroups' % self._tvmcUser)
 
-    return tgDict
+    return dict(ShenickChannel.parseTestGroups(lines))
 
   def cardLevelConfigurationCreate(self, card, paramDict=None):
     """
@@ -1314,27 +1506,34 @@ class Shenick():
       if not os.path.isfile(xmlFile):
         raise AssertionError('no such file: %s' % xmlFile)
 
-      self._scpPutFile(xmlFile, '/tmp/robot.xml')
+      self._putFile(xmlFile, '/tmp/robot.xml')
       # TODO: get test group name from xml. try to stop/delete as below
+
+      # the statistics cache follows the sampling interval of the test group
+      sampleInterval = ShenickCache.sampleIntervalFromXml(xmlFile)
+      if sampleInterval is not None:
+        ShenickCache.getCache().setInterval(self._tvmcIp, sampleInterval)
     else:
       self._write('$Tg->End();')
       # copy perl to tvm-c
-      self._scpPutFile(self._tmpFile[1], '/tmp/robot.pl')
-      # execute remote perl
+      self._putFile(self._tmpFile[1], '/tmp/robot.pl')
+
+    # execute remote perl on its own, the controller is left untouched if it fails
+    if not xmlFile:
       self._execSshCommand('perl /tmp/robot.pl > /tmp/robot.xml')
-      # try to stop a still running test group
-      try:
-        self._execSshCommand('cli -u %s stopTestGroup "//%s"' % (self._tvmcUser, tgName))
-      except:
-        pass
-      # try to delete a already existing test group
-      try:
-        self._execSshCommand('cli -u %s deleteTestGroup "//%s"' % (self._tvmcUser, tgName))
-      except:
-        pass
 
-    # load test group
-    self._execSshCommand('cli -u %s importTestGroup "//" /tmp/robot.xml' % self._tvmcUser)
+    # stop a still running and delete an already existing test group and load the new one
+    # with a single round-trip. stop and delete are allowed to fail.
+    commands = []
+    if not xmlFile:
+      commands.append('cli -u %s stopTestGroup "//%s"'   % (self._tvmcUser, tgName))
+      commands.append('cli -u %s deleteTestGroup "//%s"' % (self._tvmcUser, tgName))
+    importCommand = 'cli -u %s importTestGroup "//" /tmp/robot.xml' % self._tvmcUser
+
+    imported = self._execSshBatch(commands + [importCommand])[-1]
+    if imported.error is not None:
+      raise AssertionError('ssh command "%s" failed with error "%s"' % (importCommand, imported.error))
+    ShenickCache.getCache().stopped(self._tvmcIp)
 
     # create new empty test group
     self.testGroupCreate(self._tgName)
@@ -1355,14 +1554,14 @@ class Shenick():
 
     try:
       debugFilePath = debugDir + '/shenick.pl'
-      self._scpGetFile('/tmp/robot.pl', debugFilePath)
+      self._getFile('/tmp/robot.pl', debugFilePath)
       returnDict['perlFile'] = debugFilePath
     except:
       pass
 
     try:
       debugFilePath = debugDir + '/shenick.xml'
-      self._scpGetFile('/tmp/robot.xml', debugFilePath)
+      self._getFile('/tmp/robot.xml', debugFilePath)
       returnDict['xmlFile'] = debugFilePath
     except:
       pass
@@ -2629,38 +2828,172 @@ class Shenick():
     - name: string, if entityType is 'aggregate' concatenate the name of the aggregate group with the aggregate type (e.g. 'Host') using '_'
     - columnLabel: desired statistic, see gui column labels (without metric, e.g. /s)
     - presentation: rate|cu(multative)|(per-)int(erval)
+
+    Values of a test group started with testGroupStart are cached until the controller's next sampling interval, see statisticsCacheIntervalSet.
     """
 
+    columnLabel = self._statisticsColumnLabel(columnLabel, presentation)
+
+    cache = ShenickCache.getCache()
+    key   = (self._tvmcIp, self._tvmcUser, statsType.lower(), entityType.lower(), name, columnLabel)
+    stat  = cache.get(key)
+
+    if stat is None:
+      stat = self._execSshCommand('cli -u %s getStat %s "%s" %s %s' % (self._tvmcUser, name, columnLabel, statsType.capitalize(), entityType.capitalize()))
+      cache.put(key, stat)
+
+    return self._statisticsValue(stat)
+
+  def statisticsCacheIntervalSet(self, interval, statsType='normal'):
+    """
+    Sets the sampling interval of the controller used for caching statisticsGet values. A value is reused until
+    the next interval boundary, counted from testGroupStart. The interval is also taken from xml files uploaded with testGroupUpload.
+    - interval: 30sec|1min|5min or seconds, 0 disables the cache. Default: 30sec for normal, 0 for fine statistics
+    - statsType: normal|fine
+    """
+    ShenickCache.getCache().setInterval(self._tvmcIp, ShenickCache.intervalSeconds(interval), statsType)
+
+  def statisticsCacheCountersGet(self):
+    """
+    Returns the counters of the statistics cache (shared by all Shenick and ShenickCli instances) as
+    dictionary with the keys hits, misses, hitRate and entries.
+    """
+    return ShenickCache.getCache().counters()
+
+  def statisticsCacheClear(self):
+    """
+    Drops all cached statistics of the controller.
+    """
+    ShenickCache.getCache().invalidate(self._tvmcIp)
+
+  def _statisticsColumnLabel(self, columnLabel, presentation):
+    """
+    Returns the column label for the given presentation: rate|cu(multative)|(per-)int(erval)
+    """
     # see "cli help ColumnLabels"
 
     if   presentation == 'rate':
-      columnLabel = columnLabel.strip() + '/s'
+      return columnLabel.strip() + '/s'
     elif 'cu' in presentation:
-      columnLabel = columnLabel.strip() + ' cu'
+      return columnLabel.strip() + ' cu'
     elif 'int' in presentation:
-      columnLabel = columnLabel.strip()
+      return columnLabel.strip()
     else:
       raise AssertionError('unknown presentation value: %s' % presentation)
 
-    stat = self._execSshCommand('cli -u %s getStat %s "%s" %s %s' % (self._tvmcUser, name, columnLabel, statsType.capitalize(), entityType.capitalize()))
+  def _statisticsValue(self, stat):
+    """
+    Converts a statistic value to integer/float if possible, None stays None.
+    """
+    if stat is None:
+      return None
 
     # try to convert to integer/float
     if   re.match('^\d+$', stat):
-      stat = int(stat)
+      return int(stat)
     elif re.match('^\d+\.\d+$', stat):
-      stat = float(stat)
+      return float(stat)
     else:
-      stat = stat.strip()
+      return stat.strip()
+
+  def statisticsGetMany(self, entityType, names, columns, statsType='normal', presentation='int', method='auto'):
+    """
+    Gets the latest value of several statistics (_columns_) of several entities (_names_) with as few
+    controller operations as possible.
+    - entityType: aggregate|host|application|interface|card
+    - names: list of entity names (or a comma separated string), see statisticsGet
+    - columns: list of column labels (or a comma separated string), see statisticsGet
+    - statsType: normal|fine
+    - presentation: rate|cu(multative)|(per-)int(erval), applies to all columns
+    - method: auto|getStat|saveStats
+      - getStat: one getStat per value, all of them pipelined in a single round-trip
+      - saveStats: the latest sample of all entities and columns as one filtered zip file
+      - auto (default): getStat for up to 100 values, saveStats above
 
-    return stat
+    Returns a dictionary {name: {column: value}}. Values are converted to integer/float where possible,
+    values which are not available are None. Unknown entities fail with getStat and saveStats alike.
 
-  def statisticsSave(self, localPath='', optionsDict=None):
+    *Example*
+    | @{names}   | Create List       | STB-1        | STB-2           |
+    | @{columns} | Create List       | QmVideo MOS  | Dropped Packets |
+    | ${stats}   | statisticsGetMany | application  | ${names}        | ${columns} |
+    | Should Be True | ${stats['STB-1']['QmVideo MOS']} > 4 |
+    """
+    if isinstance(names, basestring):
+      names = [name.strip() for name in names.split(',')]
+    if isinstance(columns, basestring):
+      columns = [column.strip() for column in columns.split(',')]
+
+    labels = [self._statisticsColumnLabel(column, presentation) for column in columns]
+
+    if method == 'auto':
+      method = 'getStat' if len(names) * len(columns) <= 100 else 'saveStats'
+
+    if method == 'getStat':
+      commands = []
+      for name in names:
+        for label in labels:
+          commands.append('cli -u %s getStat %s "%s" %s %s' % (self._tvmcUser, name, label, statsType.capitalize(), entityType.capitalize()))
+
+      results = self._execSshBatch(commands)
+
+      errors = [result for result in results if result.error is not None]
+      if errors:
+        raise AssertionError('\n'.join(['ssh command "%s" failed with error "%s"' % (result.command, result.error) for result in errors]))
+
+      values = iter(results)
+      return dict((name, dict((column, self._statisticsValue(values.next().output)) for column in columns)) for name in names)
+
+    if method != 'saveStats':
+      raise AssertionError('unknown method: %s' % method)
+
+    table   = dict((name, dict((column, None) for column in columns)) for name in names)
+    options = {
+      'entityType': entityType,
+      'statsType':  statsType,
+      'entityName': '|'.join([re.escape(name) for name in names]),
+      # only the listed columns are exported, the rows are matched by Entity Name
+      'columns':    ','.join([ShenickTables.TIME_COLUMN, 'Entity Name'] + labels),
+      'samples':    '1',
+    }
+
+    found = set()
+    with self._statisticsArchive(options) as archive:
+      for folder, root, member in ShenickTables.statsMembers(archive):
+        if root == 'Meta':
+          continue
+
+        csvFile = archive.open(member)
+        for row in csv.DictReader(csvFile):
+          name = row.get('Entity Name')
+          if name not in table:
+            continue
+          found.add(name)
+          for column, label in zip(columns, labels):
+            # the csv header may carry the label with or without the presentation suffix
+            value = row.get(label, row.get(column))
+            if value is not None:
+              table[name][column] = self._statisticsValue(value)
+        csvFile.close()
+
+    missing = [name for name in names if name not in found]
+    if missing:
+      raise AssertionError('no %s statistics of %s' % (entityType, ', '.join(missing)))
+
+    return table
+
+  def statisticsSave(self, localPath='', optionsDict=None, aggregate='false', percentiles='50,95,99', inServiceOnly='true'):
     """
     Creates a zip file containing csv result files on the TVM-C and downloads it to the local PC.
 
     Parameters:
     - localPath:   <string> (optional), path where the zip file should be saved. Default file name is "csvStatistics.zip"
-                   if no file name in localPath is given. Default _localPath_ is Robot's output directory
+                   ("csvStatisticsSummary.csv" with _aggregate_) if no file name in localPath is given. Default _localPath_ is Robot's output directory
+    - aggregate:   _*false*_ , _true_ ; reduce the statistics on the TVM-C and download only the summary: a csv file with one row per
+                   entity and column (Entity Type, Table, Entity Name, Column, count, sum, mean, min, max, std and the percentiles of the
+                   intervals). A small perl script is uploaded for this. Read the file with ShenickAggregate.readSummary
+    - percentiles: <list> (optional), percentiles of the summary. Default: 50,95,99
+    - inServiceOnly: _false_ , _*true*_ ; leave out the intervals where an entity was out of service from the summary
     - optionsDict: <dictionary> (optional), contains the options:value pairs. The default options dictionary is set as following:
     | {
     |   'cumulative': 'true',
@@ -2686,6 +3019,7 @@ class Shenick():
     | statisticsSave | /home/sff00009               | ${options} | # creates /home/sff00009/csvStatistics.zip |
     | statisticsSave | /home/sff00009/              | ${options} | # creates /home/sff00009/csvStatistics.zip |
     | statisticsSave | /home/sff00009/myCsvFile.zip | ${options} | # creates /home/sff00009/myCsvFile.zip |
+    | statisticsSave | /home/sff00009/              | ${options} | aggregate=true | # creates /home/sff00009/csvStatisticsSummary.csv |
     """
     if not optionsDict: optionsDict = {}
     if 'cumulative'       not in optionsDict.keys(): optionsDict['cumulative'] =       'true'
@@ -2694,24 +3028,55 @@ class Shenick():
     optionList = []
     if isinstance(optionsDict, dict):
       for option, value in optionsDict.iteritems():
-        if   option in ['columns']:
+        # quoted, values are regular expressions (e.g. 'Application|Host') or lists with spaces
+        if   option in ['columns', 'after', 'entityName', 'description', 'aggregateGroup']:
           optionList.append('%s="%s"' % (option[0].upper() + option[1:], value))
         elif option in ['entityType', 'statsType']:
-          optionList.append('%s=%s' % (option[0].upper() + option[1:], value.title()))
+          optionList.append('%s="%s"' % (option[0].upper() + option[1:], value.title()))
         else:
           optionList.append('%s=%s' % (option[0].upper() + option[1:], value))
     optionList = ' '.join(optionList)
 
+    aggregate = str(aggregate).lower() == 'true'
+    if aggregate:
+      ShenickAggregate.percentileList(percentiles)
+
     if not localPath:
-      localPath = os.path.join(BuiltIn().replace_variables('${OUTPUTDIR}'), 'csvStatistics.zip')
+      localPath = os.path.join(BuiltIn().replace_variables('${OUTPUTDIR}'), 'csvStatisticsSummary.csv' if aggregate else 'csvStatistics.zip')
 
     remotePath = '/tmp/csvStatistics.zip'
 
     self._execSshCommand('cli -u %s saveStats %s %s' % (self._tvmcUser, optionList, remotePath))
-    self._scpGetFile(remotePath, localPath)
+    if aggregate:
+      self._statisticsAggregateRemote(remotePath, localPath, percentiles, str(inServiceOnly).lower() == 'true')
+    else:
+      self._getFile(remotePath, localPath)
     self._execSshCommand('rm %s' % remotePath)
 
-  def statisticsGetAll(self, optionsDict=None, metadata='false'):
+  def _statisticsAggregateRemote(self, remoteZip, localPath, percentiles, inServiceOnly):
+    """
+    Reduces a statistics zip file on the TVM-C with the ShenickAggregate script and downloads the summary csv file.
+    """
+    remotePath = '/tmp/csvStatisticsSummary.csv'
+
+    fd, scriptPath = tempfile.mkstemp(prefix='shenick_', suffix='.pl')
+    try:
+      with os.fdopen(fd, 'wb') as script:
+        script.write(ShenickAggregate.SCRIPT)
+      self._putFile(scriptPath, ShenickAggregate.SCRIPT_PATH)
+    finally:
+      os.remove(scriptPath)
+
+    try:
+      output = self._execSshCommand(ShenickAggregate.command(remoteZip, remotePath, percentiles, inServiceOnly))
+      if ShenickAggregate.ERROR_PREFIX in output:
+        raise AssertionError('aggregation on the TVM-C failed: %s' % output.strip())
+      self._getFile(remotePath, localPath)
+    finally:
+      self._execSshCommand('rm -f %s %s' % (ShenickAggregate.SCRIPT_PATH, remotePath))
+
+  def statisticsGetAll(self, optionsDict=None, metadata='false', columnar='false', database='', runName='', workers=1, parallelMegabytes=32,
+                       entityTypes=None, columns=None, entityNamePattern='', aggregate='false', percentiles='50,95,99', inServiceOnly='true'):
     """
     Returns a dictionary containing the tables.
 
@@ -2724,6 +3089,28 @@ class Shenick():
     - metadata: _*false*_ , _true_ ; set to true if the dictionary shall contain the meta data.
 
     *NOTE*: It is strictly recommended not to put meta data into the dictionary due to the huge amount of meta data.
+    - columnar: _*false*_ , _true_ ; set to true to get every table as ShenickTables.ColumnarTable instead of lists of strings:
+      numeric columns are numpy int64/float64 arrays, the Time column is a numpy datetime64 array and text columns
+      (e.g. 'Entity Name') are dictionary-encoded (codes array plus table.categories[column], see table.decode(column)).
+      Uses a fraction of the memory for large (e.g. fine) statistics and allows vectorised evaluation.
+    - database: <path> (optional); SQLite results warehouse the statistics are loaded into as well, see statisticsIngest
+    - runName: <string> (optional); name of the run in the warehouse. Default: the current time
+    - workers: <integer> (optional); number of processes parsing the csv files, 0 for one per cpu. Default: 1 (no process pool)
+    - parallelMegabytes: <number> (optional); zip files with less uncompressed csv data are parsed in this process
+      even if _workers_ is set, starting the pool takes longer than parsing them. Default: 32
+    - entityTypes: <list> (optional); entity types to get, e.g. Application,Host. Default: all
+    - columns: <list> (optional); column labels to get, e.g. QmVideo MOS,Dropped Packets. Time, Entity Name, IP Address and In Service
+      are always part of the tables. Default: all
+    - entityNamePattern: <string> (optional); regular expression fully matching the names of the entities to get, e.g. VQA.*. Default: all
+
+    _entityTypes_, _columns_ and _entityNamePattern_ are passed to saveStats as the options entityType, columns and entityName (and override
+    them), so other statistics are not even transferred. They are applied when parsing as well.
+    - aggregate: _*false*_ , _true_ ; reduce the intervals to per-entity summaries on the TVM-C (see statisticsSave), only the summary is
+      transferred and parsed. Returns {entity type: {table: {entity name: {column: {statistic: value}}}}} with the statistics count, sum,
+      mean, min, max, std and p<percentile>, e.g. stats['application']['IGMP Client']['VQA-1']['QmVideo MOS']['p95'].
+      _metadata_, _columnar_, _database_ and _workers_ do not apply
+    - percentiles: <list> (optional); percentiles of the summary. Default: 50,95,99
+    - inServiceOnly: _false_ , _*true*_ ; leave out the intervals where an entity was out of service from the summary
 
     | *Option*           | *Value*              | *Comment* |
     | after              | <YYYY-MM-DD HH:MM:SS> , <integer representing milliseconds since the 1970 epoch> | Only save samples or events with timestamp strictly greater than this value. Default: All available samples, but if _samples_ is specified, the most recent samples are saved, limited by number to the value of _samples_ |
@@ -2741,53 +3128,233 @@ class Shenick():
     *Example*
     | ${options} | Create Dictionary | cumulative | true | entityType | aggregate |
     | ${stats}   | statisticsGetAll  | ${options} |
+    | ${stats}   | statisticsGetAll  | ${options} | columnar=true |
+    | ${stats}   | statisticsGetAll  | ${options} | workers=0     |
+    | ${stats}   | statisticsGetAll  | entityTypes=Application | columns=QmVideo MOS,Dropped Packets | entityNamePattern=VQA.* |
+    | ${stats}   | statisticsGetAll  | ${options} | database=${OUTPUT DIR}/../results.db | runName=nightly-${DATE} |
+    | ${stats}   | statisticsGetAll  | entityTypes=Application | columns=QmVideo MOS | aggregate=true | percentiles=5,50 |
     """
-    stats   = {}
-    tempDir = tempfile.mkdtemp()
+    stats     = {}
+    selection = ShenickTables.StatsSelection(entityTypes, columns, entityNamePattern)
+
+    options = dict(optionsDict or {})
+    options.update(selection.saveStatsOptions())
+
+    if str(aggregate).lower() == 'true':
+      return self._statisticsGetSummary(options, percentiles, inServiceOnly)
 
     try:
-      # save stats on tvm-c and copy them to local machine
-      self.statisticsSave(tempDir, optionsDict)
-      # extract zip file
-      zip = zipfile.ZipFile(os.path.join(tempDir, 'csvStatistics.zip'))
-      zip.extractall(tempDir)
+      # save stats on tvm-c and read the csv files straight from the downloaded zip file
+      with self._statisticsArchive(options) as archive:
+        stats = self._statisticsRead(archive, metadata, columnar, None, workers, parallelMegabytes, selection)
+        if database:
+          self._statisticsIngestArchive(archive, database, runName)
+    except Exception as e:
+      raise AssertionError('error processing csv: %s' % e.message)
+    finally:
+      return stats
 
-      for statsFolder in glob.glob(os.path.join(tempDir, '*/')):
-        # statFolder ends with directory separator
-        head, entityType = os.path.split(statsFolder[:-1]) # get the folder name in entityType
+  def _statisticsGetSummary(self, optionsDict, percentiles, inServiceOnly):
+    """
+    Returns the per-entity summaries of the statistics aggregated on the TVM-C, see statisticsGetAll.
+    """
+    fd, summaryPath = tempfile.mkstemp(prefix='shenick_', suffix='.csv')
+    os.close(fd)
 
-        stats[entityType.lower()] = {}
+    try:
+      self.statisticsSave(summaryPath, optionsDict, 'true', percentiles, inServiceOnly)
+      with open(summaryPath, 'rb') as summaryFile:
+        return ShenickAggregate.readSummary(summaryFile)
+    finally:
+      os.remove(summaryPath)
 
-        # process all csv files
-        for statsFile in glob.glob(os.path.join(tempDir, entityType, '') + '*.csv'): # empty element in join for leading '/'
-          # get file/path elements
-          head, tail = os.path.split(statsFile) # path + filename (w/ extension)
-          root, ext  = os.path.splitext(tail)   # filename (w/o ext) + extension
+  def _statisticsRead(self, archive, metadata='false', columnar='false', lastTimes=None, workers=1, parallelMegabytes=32, selection=None):
+    """
+    Reads all tables of a statistics zip file, see statisticsGetAll. If _lastTimes_ (dictionary entity type: Time)
+    is given, only rows later than the entity type's Time are read and _lastTimes_ is updated with the latest
+    Time read. _workers_ and _parallelMegabytes_ see ShenickTables.readMembers, _selection_ is a ShenickTables.StatsSelection.
+    """
+    stats   = {}
+    members = []
+    # all tables of an entity type are filtered with the Time from before this read
+    afterTimes = dict(lastTimes) if lastTimes is not None else {}
+    afters     = {}
+
+    for entityType, root, member in ShenickTables.statsMembers(archive):
+      # folders which are not selected are not even decompressed
+      if selection is not None and not selection.wantsFolder(entityType):
+        continue
 
-          if root == 'Meta' and metadata.lower() == 'false':
-            continue
+      entityType = entityType.lower()
+
+      if entityType not in stats:
+        stats[entityType] = {}
+
+      # meta files are not even decompressed
+      if root == 'Meta' and (metadata.lower() == 'false' or lastTimes is not None):
+        continue
 
-          entityType = entityType.lower()
+      members.append((entityType, root.replace('.Normal', '').replace('.Fine', '').replace(' cu', ''), member))
+      if entityType in afterTimes:
+        afters[member] = afterTimes[entityType]
 
-          root = root.replace('.Normal', '').replace('.Fine', '').replace(' cu', '')
+    tables = ShenickTables.readMembers(archive, [member for entityType, root, member in members], columnar.lower() == 'true',
+                                       afters, workers, int(float(parallelMegabytes) * (1 << 20)), selection)
 
-          stats[entityType][root] = defaultdict(list)
+    for entityType, root, member in members:
+      table, lastTime = tables[member]
+      stats[entityType][root] = table
 
-          f = open(statsFile)
-          csvReader = csv.DictReader(f)
+      if lastTimes is not None and lastTime is not None:
+        if entityType not in lastTimes or ShenickTables.timeKey(lastTime) > ShenickTables.timeKey(lastTimes[entityType]):
+          lastTimes[entityType] = lastTime
 
-          # this will append all rows from the csv to our dict as list of values of key as table column
-          for row in csvReader:
-            for key, value in row.items():
-              stats[entityType][root][key].append(value)
+    return stats
 
-          f.close()
-      zip.close()
+  def statisticsPoll(self, optionsDict=None, columnar='false'):
+    """
+    Returns the statistics intervals which are new since the previous statisticsPoll with the same options,
+    so a running test group can be polled regularly and every interval is transferred and parsed once.
+    The first call (and the first call after testGroupStart or statisticsPollReset) returns all intervals.
+
+    The latest Time seen is remembered per entity type, the next poll uses it as _after_ option of saveStats
+    and drops the rows which are not newer. The return value has the same layout as statisticsGetAll, tables
+    without new intervals are empty.
+
+    - optionsDict: <dictionary> (optional), saveStats options as for statisticsSave (e.g. statsType, entityType, columns),
+      _after_ and _samples_ are set by the poller
+    - columnar: _*false*_ , _true_ ; return ShenickTables.ColumnarTable tables, see statisticsGetAll
+
+    *Example*
+    | ${options} | Create Dictionary | entityType | application | columns | QmVideo MOS,Dropped Packets |
+    | :FOR | ${i} | IN RANGE | 120 |
+    |      | ${new} | statisticsPoll | ${options} |
+    |      | Sleep  | 30s |
+    """
+    options = dict(optionsDict or {})
+    for option in ['after', 'samples']:
+      if option in options:
+        print '*WARN* option "%s" is set by statisticsPoll, ignoring' % option
+        del options[option]
+
+    lastTimes = self._pollState.setdefault(tuple(sorted(options.items())), {})
+    if lastTimes:
+      options['after'] = min(lastTimes.values(), key=ShenickTables.timeKey)
+
+    try:
+      with self._statisticsArchive(options) as archive:
+        return self._statisticsRead(archive, 'false', columnar, lastTimes)
     except Exception as e:
-      raise AssertionError('error processing csv: %s' % e.message)
+      raise AssertionError('error processing csv: %s' % e)
+
+  def statisticsPollReset(self):
+    """
+    Forgets the intervals seen by statisticsPoll, the next poll returns all intervals again.
+    """
+    self._pollState = {}
+
+  def statisticsLoad(self, zipFile, cacheDir='', cacheMegabytes=1024):
+    """
+    Returns the tables of a zip file downloaded with statisticsSave in the layout of statisticsGetAll with columnar=true.
+
+    The parsed columns are cached on the local disk, keyed by the content hash of the zip file, and loaded
+    as read-only memory maps, so loading the same zip file again (e.g. to evaluate it with other thresholds,
+    also from other processes) does not parse it again.
+    - zipFile: <path>, zip file downloaded with statisticsSave
+    - cacheDir: <path> (optional), cache directory. Default: shenickStatsCache in the temp directory
+    - cacheMegabytes: size limit of the cache directory, least recently used zip files are dropped. Default: 1024
+
+    *Example*
+    | statisticsSave | ${OUTPUT DIR}/csvStatistics.zip |
+    | ${stats}       | statisticsLoad | ${OUTPUT DIR}/csvStatistics.zip |
+    """
+    cache = ShenickColumnCache.getColumnCache(cacheDir or None, int(float(cacheMegabytes) * (1 << 20)))
+    stats = {}
+
+    for entityType, root, table in cache.archiveTables(zipFile):
+      root = root.replace('.Normal', '').replace('.Fine', '').replace(' cu', '')
+      stats.setdefault(entityType.lower(), {})[root] = table
+
+    return stats
+
+  def statisticsIngest(self, database, runName='', zipFile='', optionsDict=None, testGroup=''):
+    """
+    Loads statistics into a local SQLite results warehouse, so statistics of many runs can be queried
+    (warehouseTrendGet, warehouseSeriesGet) without downloading and parsing the zip files again.
+    Values are stored per run, test group, entity type, entity, column and interval, ingesting a run again replaces it.
+
+    - database: <path>, SQLite database file, created if it does not exist
+    - runName: <string> (optional), name of the run. Default: the current time, e.g. 2016-08-01 02:00:00
+    - zipFile: <path> (optional), zip file downloaded with statisticsSave. Default: save and download the statistics with _optionsDict_
+    - optionsDict: <dictionary> (optional), saveStats options as for statisticsSave
+    - testGroup: <string> (optional), test group of the run
+
+    Returns the number of values stored.
+
+    *Example*
+    | statisticsSave   | ${OUTPUT DIR}/csvStatistics.zip |
+    | statisticsIngest | ${CURDIR}/results.db | nightly-${DATE} | ${OUTPUT DIR}/csvStatistics.zip | testGroup=//GPON/LoadTest |
+    """
+    if zipFile:
+      with ShenickTables.openStatsArchive(zipFile) as archive:
+        return self._statisticsIngestArchive(archive, database, runName, testGroup)
+
+    with self._statisticsArchive(optionsDict) as archive:
+      return self._statisticsIngestArchive(archive, database, runName, testGroup)
+
+  def _statisticsIngestArchive(self, archive, database, runName='', testGroup=''):
+    if not runName:
+      runName = time.strftime('%Y-%m-%d %H:%M:%S')
+    count = ShenickWarehouse.getWarehouse(database).ingestArchive(archive, runName, testGroup, self._tvmcIp)
+    print '*DEBUG* %d values of run "%s" stored in %s' % (count, runName, database)
+    return count
+
+  def warehouseRunsGet(self, database, testGroup='', last=0):
+    """
+    Returns the runs of a results warehouse (oldest first) as list of dictionaries with the keys name, testGroup,
+    controller and ingested (seconds since the epoch).
+    - testGroup: only runs of this test group
+    - last: only the _last_ runs if > 0
+    """
+    return ShenickWarehouse.getWarehouse(database).runs(testGroup, last)
+
+  def warehouseSeriesGet(self, database, column, entityName, entityType='', testGroup='', lastRuns=0):
+    """
+    Returns the values of a statistic of the results warehouse as list of (run, entity, time, value) ordered by run and time.
+    - column: column label, e.g. QmVideo MOS
+    - entityName: entity name, SQL LIKE pattern ('%' matches anything, e.g. VQA%)
+    - entityType: application|host|interface|aggregate|testgroup|summary (optional)
+    - testGroup: only runs of this test group
+    - lastRuns: only the _lastRuns_ latest runs if > 0
+    """
+    return ShenickWarehouse.getWarehouse(database).series(column, entityName, entityType, testGroup, lastRuns)
+
+  def warehouseTrendGet(self, database, column, entityName='%', aggregate='avg', entityType='', testGroup='', lastRuns=0):
+    """
+    Returns one value per run of the results warehouse as list of (run, value) ordered by run, the aggregate
+    (avg|min|max|sum|count) of the statistic over all matching entities and intervals of the run.
+    Parameters as for warehouseSeriesGet.
+
+    *Example*
+    | ${trend} | warehouseTrendGet | ${CURDIR}/results.db | QmVideo MOS | VQA-213 | min | lastRuns=50 |
+    """
+    return ShenickWarehouse.getWarehouse(database).trend(column, entityName, aggregate, entityType, testGroup, lastRuns)
+
+  @contextmanager
+  def _statisticsArchive(self, optionsDict=None):
+    """
+    Saves the statistics on the TVM-C (see statisticsSave) and yields the download as zipfile.ZipFile on a
+    memory map of the file. Nothing is extracted, the downloaded file is removed when the block is left.
+    """
+    fd, zipPath = tempfile.mkstemp(prefix='shenick_', suffix='.zip')
+    os.close(fd)
+
+    try:
+      self.statisticsSave(zipPath, optionsDict)
+      with ShenickTables.openStatsArchive(zipPath) as archive:
+        yield archive
     finally:
-      shutil.rmtree(tempDir)
-      return stats
+      os.remove(zipPath)
 
   def igmpClientCreate(self, name, paramDict):
     """
@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import re
+import csv
+
+# the script is uploaded to the TVM-C, which has perl (the test groups are created with perl scripts) but not
+# necessarily python; IO::Uncompress::Unzip is part of perl since 5.10
+SCRIPT_PATH = '/tmp/robotAggregate.pl'
+SCRIPT = r'''#!/usr/bin/perl
+# Reduces the csv files of a saveStats zip file to one row per entity and column with count, sum, mean, min,
+# max, std (population) and percentiles of the intervals. Uploaded and run by the Shenick robot library.
+# usage: perl robotAggregate.pl <zip file> <summary csv file> <percentiles, e.g. 50,95,99> <in service only 0|1>
+use strict;
+use warnings;
+use IO::Uncompress::Unzip qw($UnzipError);
+
+my ($zipFile, $outFile, $percentiles, $inServiceOnly) = @ARGV;
+die "robotAggregate: usage: perl robotAggregate.pl <zip file> <summary csv file> <percentiles> <in service only>\n" unless defined $inServiceOnly;
+
+my @percentiles  = grep { length } split /,/, $percentiles;
+my %keyColumns   = map { $_ => 1 } ('Time', 'Entity Name', 'IP Address', 'Description', 'In Service');
+my %outOfService = map { $_ => 1 } ('false', 'no', '0', 'out of service');
+
+sub splitCsv {
+  my ($line) = @_;
+  my @fields;
+  while ($line =~ /\G(?:"((?:[^"]|"")*)"|([^,]*))(,|$)/g) {
+    my $field = defined $1 ? $1 : $2;
+    $field =~ s/""/"/g if defined $1;
+    push @fields, $field;
+    last if $3 eq '';
+  }
+  return @fields;
+}
+
+sub quote {
+  my ($value) = @_;
+  return $value unless $value =~ /[",\r\n]/;
+  $value =~ s/"/""/g;
+  return "\"$value\"";
+}
+
+# linear interpolation between the closest ranks, as numpy.percentile
+sub percentile {
+  my ($sorted, $p) = @_;
+  my $position = $#$sorted * $p / 100;
+  my $lower    = int($position);
+  my $upper    = $lower < $#$sorted ? $lower + 1 : $lower;
+  return $sorted->[$lower] + ($sorted->[$upper] - $sorted->[$lower]) * ($position - $lower);
+}
+
+# integers are written without decimals, other values always with a decimal point or exponent
+sub number {
+  my ($value, $integer) = @_;
+  return sprintf('%.0f', $value) if $integer;
+  my $text = sprintf('%.17g', $value);
+  return $text =~ /^[-+]?\d+$/ ? "$text.0" : $text;
+}
+
+sub summarise {
+  my ($out, $entityType, $table, $header, $columns, $entities, $values, $integer, $text) = @_;
+  for my $entity (@$entities) {
+    for my $index (@$columns) {
+      next if $text->{$index};
+      my @sorted = sort { $a <=> $b } @{$values->{$entity}{$index} || []};
+      my @row    = map { quote($_) } ($entityType, $table, $entity, $header->[$index]);
+      if (!@sorted) {
+        print $out join(',', @row, 0, number(0, $integer->{$index}), ('') x (4 + @percentiles)), "\n";
+        next;
+      }
+      my $sum = 0;
+      $sum += $_ for @sorted;
+      my $mean = $sum / @sorted;
+      # two passes, the deviations from the mean do not lose precision like the sum of squares would
+      my $squares = 0;
+      $squares += ($_ - $mean) ** 2 for @sorted;
+      print $out join(',', @row, scalar(@sorted), number($sum, $integer->{$index}), number($mean), number($sorted[0]), number($sorted[-1]),
+                      number(sqrt($squares / @sorted)), map { number(percentile(\@sorted, $_)) } @percentiles), "\n";
+    }
+  }
+}
+
+my $zip = IO::Uncompress::Unzip->new($zipFile) or die "robotAggregate: cannot open $zipFile: $UnzipError\n";
+open(my $out, '>', $outFile) or die "robotAggregate: cannot write $outFile: $!\n";
+print $out join(',', 'Entity Type', 'Table', 'Entity Name', 'Column', 'count', 'sum', 'mean', 'min', 'max', 'std', map { "p$_" } @percentiles), "\n";
+
+my $status;
+for ($status = 1; $status > 0; $status = $zip->nextStream()) {
+  my $member = $zip->getHeaderInfo()->{Name};
+  next unless $member =~ m{^(?:.*/)?([^/]+)/([^/]+)\.csv$}i;
+  my ($entityType, $table) = (lc($1), $2);
+  next if $table eq 'Meta';
+  $table =~ s/\.Normal|\.Fine| cu//g;
+
+  my $first = $zip->getline();
+  next unless defined $first;
+  $first =~ s/[\r\n]+$//;
+  my @header    = splitCsv($first);
+  my %index     = map { $header[$_] => $_ } 0 .. $#header;
+  my @columns   = grep { !$keyColumns{$header[$_]} } 0 .. $#header;
+  my $nameIndex = $index{'Entity Name'};
+  my $service   = $index{'In Service'};
+  my (@entities, %values, %integer, %text);
+  $integer{$_} = 1 for @columns;
+
+  while (defined(my $line = $zip->getline())) {
+    $line =~ s/[\r\n]+$//;
+    next unless length $line;
+    my @row    = splitCsv($line);
+    my $entity = defined $nameIndex && defined $row[$nameIndex] ? $row[$nameIndex] : $table;
+    push @entities, $entity unless exists $values{$entity};
+    $values{$entity} ||= {};
+    next if $inServiceOnly && defined $service && defined $row[$service] && $outOfService{lc($row[$service])};
+    for my $index (@columns) {
+      my $value = $row[$index];
+      # as in ShenickTables, a column is integer if all cells are set and whole numbers
+      if (!defined $value || !length $value) {
+        $integer{$index} = 0;
+      } elsif ($value =~ /^\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*$/) {
+        push @{$values{$entity}{$index}}, $value + 0;
+        $integer{$index} = 0 if $value != int($value);
+      } else {
+        # text columns are not aggregated, as in ShenickTables.aggregate
+        $text{$index} = 1;
+      }
+    }
+  }
+  summarise($out, $entityType, $table, \@header, \@columns, \@entities, \%values, \%integer, \%text);
+}
+die "robotAggregate: error reading $zipFile: $UnzipError\n" if $status < 0;
+close($out) or die "robotAggregate: cannot write $outFile: $!\n";
+'''
+
+# error messages of the script start with this
+ERROR_PREFIX = 'robotAggregate:'
+
+def percentileList(percentiles):
+  """
+  Returns percentiles given as list or comma-separated string ('50,95,99') as list of floats.
+  """
+  items = percentiles.split(',') if isinstance(percentiles, basestring) else percentiles
+  try:
+    values = [float(p) for p in items if str(p).strip()]
+  except ValueError:
+    values = [-1]
+  if any(p < 0 or p > 100 for p in values):
+    raise AssertionError('invalid percentiles "%s", use numbers between 0 and 100' % (percentiles,))
+  return values
+
+def command(zipPath, summaryPath, percentiles=(50, 95, 99), inServiceOnly=True):
+  """
+  Returns the shell command running the uploaded script on _zipPath_.
+  """
+  return 'perl %s "%s" "%s" %s %d' % (SCRIPT_PATH, zipPath, summaryPath, ','.join('%g' % p for p in percentileList(percentiles)),
+                                      1 if inServiceOnly else 0)
+
+def _value(cell, integer=False):
+  if cell == '':
+    return None
+  return int(cell) if integer else float(cell)
+
+def readSummary(csvFile):
+  """
+  Reads the summary csv file written by the script into {entity type: {table: {entity name: {column: {statistic: value}}}}},
+  the statistics of a table as ShenickTables.aggregate(table, byEntity=True) returns them.
+  """
+  summary = {}
+  reader  = csv.reader(csvFile)
+  try:
+    header = reader.next()
+  except StopIteration:
+    return summary
+
+  statistics = header[4:]
+  for row in reader:
+    if not row:
+      continue
+    entityType, table, entity, column = row[:4]
+    # counts and the sums of integer columns are written without decimals
+    values = dict((statistic, _value(cell, statistic == 'count' or (statistic == 'sum' and re.match('^-?\d+$', cell) is not None)))
+                  for statistic, cell in zip(statistics, row[4:]))
+    summary.setdefault(entityType, {}).setdefault(table, {}).setdefault(entity, {})[column] = values
+  return summary
@@ -0,0 +1,481 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import time
+import select
+import threading
+import ShenickPool
+import ShenickCache
+import ShenickChannel
+from collections import deque
+
+# Python 2.7 has no asyncio, so this module brings its own small event loop: one thread waits in
+# select() on the shell channels of all controllers and completes futures as the prompts arrive.
+# paramiko channels provide a file descriptor for select() on Linux and Windows.
+
+class Future():
+  """
+  Result of an asynchronous operation. Use EventLoop.runUntilComplete to wait for it.
+  """
+
+  def __init__(self):
+    self._done      = False
+    self._result    = None
+    self._exception = None
+    self._callbacks = []
+
+  def done(self):
+    return self._done
+
+  def result(self):
+    if not self._done:
+      raise AssertionError('future is not done yet')
+    if self._exception is not None:
+      raise self._exception
+    return self._result
+
+  def exception(self):
+    return self._exception
+
+  def addDoneCallback(self, callback):
+    if self._done:
+      callback(self)
+    else:
+      self._callbacks.append(callback)
+
+  def setResult(self, result):
+    self._result = result
+    self._finish()
+
+  def setException(self, exception):
+    self._exception = exception
+    self._finish()
+
+  def _finish(self):
+    self._done = True
+    callbacks, self._callbacks = self._callbacks, []
+    for callback in callbacks:
+      callback(self)
+
+def gather(futures):
+  """
+  Returns a future which is done when all _futures_ are done. Its result is the list of results,
+  the first exception (in order of _futures_) is raised instead if any future failed.
+  """
+  futures  = list(futures)
+  combined = Future()
+  pending  = [len(futures)]
+
+  def onDone(future):
+    pending[0] -= 1
+    if pending[0] == 0:
+      for f in futures:
+        if f.exception() is not None:
+          combined.setException(f.exception())
+          return
+      combined.setResult([f.result() for f in futures])
+
+  if not futures:
+    combined.setResult([])
+  for future in futures:
+    future.addDoneCallback(onDone)
+
+  return combined
+
+class EventLoop():
+  """
+  select() based event loop driving any number of AsyncShenickClient instances.
+  """
+
+  # poll interval while background connects are running
+  connectPollInterval = 0.05
+
+  def __init__(self):
+    self._clients = []
+    self._threads = []
+
+  def register(self, client):
+    if client not in self._clients:
+      self._clients.append(client)
+
+  def unregister(self, client):
+    if client in self._clients:
+      self._clients.remove(client)
+
+  def runInThread(self, function, *args):
+    """
+    Runs a blocking _function_ (e.g. the ssh handshake) in a thread, returns a future with its result.
+    The future is completed from the loop's thread.
+    """
+    future = Future()
+    outcome = {}
+
+    def target():
+      try:
+        outcome['result'] = function(*args)
+      except Exception as e:
+        outcome['exception'] = e
+
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    self._threads.append((thread, future, outcome))
+    return future
+
+  def _collectThreads(self):
+    for entry in list(self._threads):
+      thread, future, outcome = entry
+      if thread.is_alive():
+        continue
+      self._threads.remove(entry)
+      if 'exception' in outcome:
+        future.setException(outcome['exception'])
+      else:
+        future.setResult(outcome.get('result'))
+
+  def runOnce(self, timeout=None):
+    """
+    Dispatches queued commands, waits for channel activity at most _timeout_ seconds and processes it.
+    Returns False if there was nothing to wait for.
+    """
+    self._collectThreads()
+
+    sessions = []
+    for client in list(self._clients):
+      client._dispatch()
+      sessions.extend(client._busySessions())
+
+    now = time.time()
+    deadlines = [session.deadline - now for session in sessions]
+    if timeout is not None:
+      deadlines.append(timeout)
+    if self._threads:
+      deadlines.append(self.connectPollInterval)
+    wait = max(0, min(deadlines)) if deadlines else None
+
+    if not sessions and not self._threads:
+      return False
+
+    if sessions:
+      select.select([session.channel for session in sessions], [], [], wait)
+    elif wait:
+      time.sleep(wait)
+
+    for session in sessions:
+      session.process()
+
+    return True
+
+  def runUntilComplete(self, future, timeout=None):
+    """
+    Runs the loop until _future_ is done and returns its result (or raises its exception).
+    """
+    deadline = None if timeout is None else time.time() + timeout
+
+    while not future.done():
+      remaining = None if deadline is None else deadline - time.time()
+      if remaining is not None and remaining <= 0:
+        raise AssertionError('timeout after %ss waiting for result' % timeout)
+      if not self.runOnce(remaining) and not future.done():
+        raise AssertionError('nothing left to run, future can not complete')
+
+    return future.result()
+
+_defaultLoop = None
+
+def getDefaultLoop():
+  """
+  Returns the process-wide event loop shared by all synchronous facades.
+  """
+  global _defaultLoop
+  if _defaultLoop is None:
+    _defaultLoop = EventLoop()
+  return _defaultLoop
+
+class _ShellSession():
+  """
+  Non-blocking command execution on one interactive shell channel.
+  """
+
+  def __init__(self, channel, prompt='$ ', chunkSize=65536):
+    self.channel   = channel
+    self.chunkSize = chunkSize
+    self.scanner   = ShenickChannel.PromptScanner(prompt)
+    self.command   = None
+    self.future    = None
+    self.deadline  = None
+    self.chunks    = []
+    self.received  = 0
+    self.start     = None
+    self.lastStats = None
+
+  def busy(self):
+    return self.future is not None
+
+  def begin(self, command, future, timeout):
+    # clear leftovers
+    while self.channel.recv_ready():
+      self.channel.recv(self.chunkSize)
+
+    self.scanner.reset()
+    self.command  = command
+    self.future   = future
+    self.chunks   = []
+    self.received = 0
+    self.start    = time.time()
+    self.deadline = self.start + timeout
+
+    try:
+      self.channel.sendall(command + '\n')
+    except Exception as e:
+      self._finish(AssertionError('ssh command "%s" failed with error "%s"' % (command, e)))
+
+  def process(self):
+    if not self.busy():
+      return
+
+    promptFound = False
+    while self.channel.recv_ready():
+      chunk = self.channel.recv(self.chunkSize)
+      self.chunks.append(chunk)
+      self.received += len(chunk)
+      promptFound = self.scanner.feed(chunk)
+
+    if promptFound:
+      output = ''.join(self.chunks)
+      if 'cli>ERROR:' in output:
+        self._finish(AssertionError('ssh command "%s" failed with error "%s"' % (self.command, output)))
+      else:
+        # return output without command and prompt
+        self._finish(None, '\n'.join(output.splitlines()[1:-1]))
+    elif self.channel.closed or self.channel.exit_status_ready():
+      self._finish(AssertionError('ssh command "%s" failed with error "ssh channel closed by remote side"' % self.command))
+    elif time.time() >= self.deadline:
+      self._finish(AssertionError('ssh command "%s" failed with error "timeout waiting for prompt"' % self.command))
+
+  def _finish(self, exception, result=None):
+    seconds = time.time() - self.start
+    self.lastStats = ShenickChannel.CommandStats(self.command, self.received, seconds, self.received / seconds if seconds > 0 else 0.0)
+
+    future, self.future = self.future, None
+    self.command = None
+    self.chunks  = []
+    if exception is not None:
+      future.setException(exception)
+    else:
+      future.setResult(result)
+
+class AsyncShenickClient():
+  """
+  Asynchronous client for one TVM-C with the command surface of ShenickCli. Every method returns a
+  Future; commands are queued and spread over _channels_ shell channels of one ssh connection, so
+  independent commands to the same controller run concurrently as well.
+
+  | loop    = EventLoop()
+  | clients = [AsyncShenickClient(loop, ip, '//GPON/Test', 'IPTV', 2) for ip in ['10.13.225.18', '10.13.225.38']]
+  | loop.runUntilComplete(gather([client.startTestGroup() for client in clients]))
+  """
+
+  def __init__(self, loop, tvmcIp, tgName, tvmUser='adtran', partition=1, channels=1, commandTimeout=600):
+    self._loop      = loop
+    self._tvmcIp    = tvmcIp
+    self._tvmcUser  = tvmUser
+    self._partition = partition
+    self._tgName    = tgName
+    self._sshUser   = 'cli'
+    self._sshPwd    = 'diversifEye'
+    self._channels  = int(channels)
+    self._commandTimeout = int(commandTimeout)
+    self._sshClient = None
+    self._sessions  = []
+    self._queue     = deque()
+    self._connect   = None
+
+    loop.register(self)
+
+  def _openShells(self):
+    """
+    Blocking part of the connect: handshake, shells and default cli options. Runs in a thread.
+    """
+    client, channel = ShenickPool.connectShell(self._tvmcIp, self._sshUser, self._sshPwd)
+
+    sessions = []
+    for index in range(self._channels):
+      if index > 0:
+        channel = client.invoke_shell(width=256)
+      reader  = ShenickChannel.ChannelReader(channel, timeout=self._commandTimeout)
+      # wait for the first prompt, then set the defaults like ShenickCli does
+      reader.readUntilPrompt('login')
+      if index == 0 and 'true' not in reader.execute('cli available'):
+        reader.execute('cli start')
+      reader.execute('cli configure cliDefaultDiversifEyeUser=%s' % self._tvmcUser)
+      reader.execute('cli configure cliDefaultPartition=%s' % self._partition)
+      sessions.append(_ShellSession(channel))
+
+    return client, sessions
+
+  def connect(self):
+    """
+    Opens the ssh connection in the background, returns a future. Called implicitly by the first command.
+    """
+    if self._connect is None or (self._connect.done() and self._connect.exception() is not None):
+      self._connect = self._loop.runInThread(self._openShells)
+      self._connect.addDoneCallback(self._connected)
+    return self._connect
+
+  def _connected(self, future):
+    if future.exception() is not None:
+      # fail everything queued so far
+      while self._queue:
+        command, commandFuture = self._queue.popleft()
+        commandFuture.setException(future.exception())
+      return
+    self._sshClient, self._sessions = future.result()
+
+  def _isActive(self):
+    # the channels are closed before the transport notices the dropped connection
+    return self._sshClient is not None and self._sshClient.get_transport() is not None and self._sshClient.get_transport().is_active() \
+           and not any(session.channel.closed for session in self._sessions)
+
+  def _dispatch(self):
+    """
+    Hands queued commands to idle sessions, reconnects if the connection dropped.
+    """
+    if not self._queue:
+      return
+    if not self._isActive():
+      if self._connect is None or self._connect.done():
+        if self._sshClient is not None:
+          self._sshClient.close()
+          self._sshClient = None
+        self._sessions = []
+        self._connect  = None
+        self.connect()
+      return
+
+    for session in self._sessions:
+      if not self._queue:
+        break
+      if not session.busy():
+        command, future = self._queue.popleft()
+        session.begin(command, future, self._commandTimeout)
+
+  def _busySessions(self):
+    return [session for session in self._sessions if session.busy()]
+
+  def close(self):
+    self._loop.unregister(self)
+    if self._sshClient is not None:
+      self._sshClient.close()
+      self._sshClient = None
+    self._sessions = []
+
+  def execSshCommand(self, command):
+    """
+    Queues a CLI command, the future's result is the output without the command and prompt.
+    """
+    future = Future()
+    self._queue.append((command, future))
+    if self._connect is None:
+      self.connect()
+    return future
+
+  def getShenickCliStatistic(self, appName, stat, statType='Application', normal='Normal'):
+    return self.execSshCommand('cli getStat {0} "{1}" {2} {3}'.format(appName, stat, normal, statType))
+
+  def startTestGroup(self):
+    return self.execSshCommand('cli startTestGroup "%s"' % self._tgName)
+
+  def stopTestGroup(self):
+    return self.execSshCommand('cli stopTestGroup')
+
+  def saveStats(self, paramDict):
+    paramDict = dict(paramDict)
+    if not paramDict.get('fileName'):
+      raise AssertionError('saveStats: fileName is not provided in argument list which is manadatory arguement')
+    if not paramDict.get('statsType'):
+      paramDict['statsType'] = 'Normal'
+    if not paramDict.get('entityType'):
+      paramDict['entityType'] = 'Application'
+    if 'columns' not in paramDict:
+      paramDict['columns'] = ''
+
+    return self.execSshCommand('cli saveStats %s Columns=%s StatsType=%s EntityType=%s' % (paramDict['fileName'], paramDict['columns'], paramDict['statsType'], paramDict['entityType']))
+
+class ShenickCliConcurrent():
+  """
+  Synchronous Robot facade for AsyncShenickClient. All instances share one event loop, the keywords
+  block until their result is available.
+
+  *Parameters* :
+   | *Parameter* | *Type* | *Description* |
+   |*tvmcIp* | <string> | IpAddress of TVM-C |
+   |*tgName* | <string> | Shenick test group path and name in the format //Folder/testName |
+   | tvmUser | <string> | User name, default value <adtran> |
+   | partition | <integer> | Partition number, default value <1> |
+   | channels | <integer> | Number of shell channels used in parallel, default value <4> |
+   | commandTimeout | <integer> | Seconds a single CLI command may take, default value <600> |
+  """
+
+  ROBOT_LIBRARY_VERSION = '0.1'
+  ROBOT_LIBRARY_SCOPE   = 'GLOBAL'
+
+  def __init__(self, tvmcIp, tgName, tvmUser='adtran', partition=1, channels=4, commandTimeout=600):
+    self._loop   = getDefaultLoop()
+    self._tvmcIp = tvmcIp
+    self._client = AsyncShenickClient(self._loop, tvmcIp, tgName, tvmUser, partition, channels, commandTimeout)
+
+  def _run(self, future):
+    return self._loop.runUntilComplete(future)
+
+  def execSshCommand(self, command):
+    """
+    Executes a CLI command and returns its output.
+    """
+    return self._run(self._client.execSshCommand(command))
+
+  def execSshCommands(self, commands):
+    """
+    Executes a list of CLI commands concurrently and returns the list of outputs in the same order.
+    """
+    return self._run(gather([self._client.execSshCommand(command) for command in commands]))
+
+  def getShenickCliStatistic(self, appName, stat, statType='Application', normal='Normal'):
+    """
+    Same as ShenickCli.getShenickCliStatistic.
+    """
+    return self._run(self._client.getShenickCliStatistic(appName, stat, statType, normal))
+
+  def getShenickCliStatistics(self, appNames, stat, statType='Application', normal='Normal'):
+    """
+    Gets the statistic _stat_ for all _appNames_ concurrently, returns a dictionary appName: value.
+    """
+    appNames = list(appNames)
+    values   = self._run(gather([self._client.getShenickCliStatistic(appName, stat, statType, normal) for appName in appNames]))
+    return dict(zip(appNames, values))
+
+  def startTestGroup(self):
+    """
+    Same as ShenickCli.startTestGroup.
+    """
+    self._run(self._client.startTestGroup())
+    ShenickCache.getCache().started(self._tvmcIp)
+
+  def stopTestGroup(self):
+    """
+    Same as ShenickCli.stopTestGroup, no test group running is not an error.
+    """
+    try:
+      self._run(self._client.stopTestGroup())
+      print '*INFO* Test group stopped'
+    except AssertionError:
+      print '*INFO* No test group running...'
+    ShenickCache.getCache().stopped(self._tvmcIp)
+
+    return 'pass'
+
+  def saveStats(self, paramDict):
+    """
+    Same as ShenickCli.saveStats.
+    """
+    self._run(self._client.saveStats(paramDict))
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import time
+import threading
+import xml.etree.ElementTree as ET
+
+# sampling intervals in seconds, keys as used by shenickXmlSamplingIntervalChange and the test group xml
+SAMPLE_INTERVALS = {
+  '30sec':          30,
+  '1min':           60,
+  '5min':           300,
+  'Thirty Seconds': 30,
+  'One Minute':     60,
+  'Five Minutes':   300,
+}
+
+def intervalSeconds(interval):
+  """
+  Converts a sampling interval ('30sec', '1min', '5min', 'Thirty Seconds', ... or seconds) to seconds.
+  """
+  if str(interval).strip() in SAMPLE_INTERVALS:
+    return SAMPLE_INTERVALS[str(interval).strip()]
+  try:
+    return float(interval)
+  except ValueError:
+    raise AssertionError('unknown sampling interval: %s' % interval)
+
+def sampleIntervalFromXml(xmlFile):
+  """
+  Returns the normal statistics sampling interval (seconds) of a test group xml file, None if it is not set.
+  """
+  for event, elem in ET.iterparse(xmlFile):
+    if elem.tag == 'tce_normal_stats_sample_interval' and elem.text:
+      return intervalSeconds(elem.text)
+    elem.clear()
+  return None
+
+class StatisticsCache():
+  """
+  Process-wide cache of single statistic values, keyed by (controller, scope, statsType, entityType, name, column).
+  The scope separates users/partitions of the same controller.
+
+  Normal statistics are refreshed by the controller once per sampling interval counted from the start of the
+  test group, so a cached value is valid until the next interval boundary (start time plus a multiple of the
+  interval). Values are only cached while the start of the running test group is known (see started). Fine
+  statistics are only cached if a fine interval is set.
+  """
+
+  def __init__(self, normalInterval=30, fineInterval=0):
+    self.normalInterval = normalInterval
+    self.fineInterval   = fineInterval
+    self.hits           = 0
+    self.misses         = 0
+    self._intervals     = {}
+    self._starts        = {}
+    self._entries       = {}
+    self._lock          = threading.Lock()
+
+  def setInterval(self, controller, seconds, statsType='normal'):
+    """
+    Sets the sampling interval of a controller, 0 disables caching.
+    """
+    with self._lock:
+      self._intervals[(controller, statsType.lower())] = seconds
+
+  def interval(self, controller, statsType='normal'):
+    statsType = statsType.lower()
+    default   = self.fineInterval if statsType == 'fine' else self.normalInterval
+    return self._intervals.get((controller, statsType), default)
+
+  def get(self, key):
+    """
+    Returns the cached value for _key_ or None if there is no valid entry.
+    """
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry[1] > time.time():
+        self.hits += 1
+        return entry[0]
+      if entry is not None:
+        del self._entries[key]
+      self.misses += 1
+      return None
+
+  def put(self, key, value):
+    """
+    Caches _value_ until the next sampling interval boundary of the key's controller and statsType.
+    """
+    interval = self.interval(key[0], key[2])
+    start    = self._starts.get(key[0])
+    if not interval or start is None:
+      return
+    now = time.time()
+    with self._lock:
+      self._entries[key] = (value, start + (int((now - start) / interval) + 1) * interval)
+
+  def started(self, controller, timestamp=None):
+    """
+    Drops all entries of _controller_ and anchors the interval boundaries at the start of its test group
+    (_timestamp_, default now).
+    """
+    self.invalidate(controller)
+    with self._lock:
+      self._starts[controller] = time.time() if timestamp is None else float(timestamp)
+
+  def invalidate(self, controller=None):
+    """
+    Drops all entries of _controller_ (all controllers if None), e.g. after a test group was stopped.
+    """
+    with self._lock:
+      if controller is None:
+        self._entries = {}
+      else:
+        for key in [key for key in self._entries if key[0] == controller]:
+          del self._entries[key]
+
+  def stopped(self, controller):
+    """
+    Drops all entries of _controller_, nothing is cached until the next test group is started.
+    """
+    self.invalidate(controller)
+    with self._lock:
+      self._starts.pop(controller, None)
+
+  def counters(self):
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        'hits':    self.hits,
+        'misses':  self.misses,
+        'hitRate': round(float(self.hits) / lookups, 3) if lookups else 0.0,
+        'entries': len(self._entries),
+      }
+
+  def resetCounters(self):
+    with self._lock:
+      self.hits   = 0
+      self.misses = 0
+
+_cache = None
+
+def getCache():
+  """
+  Returns the process-wide StatisticsCache shared by all libraries.
+  """
+  global _cache
+  if _cache is None:
+    _cache = StatisticsCache()
+  return _cache
@@ -0,0 +1,284 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import time
+import uuid
+import select
+from collections import namedtuple
+
+# wall time, received bytes and throughput of a single command
+CommandStats = namedtuple('CommandStats', ['command', 'bytes', 'seconds', 'bytesPerSecond'])
+
+# demultiplexed result of one command of a batch, error is None if the command succeeded
+BatchResult  = namedtuple('BatchResult', ['command', 'output', 'error'])
+
+class PromptScanner():
+  """
+  Incremental prompt detection. Only the text after the last line break is kept, so every chunk
+  is scanned once regardless of the total output size.
+  """
+
+  def __init__(self, prompt='$ '):
+    self.prompt   = prompt
+    self.lastLine = ''
+
+  def reset(self):
+    self.lastLine = ''
+
+  def feed(self, chunk):
+    """
+    Feeds a received chunk, returns True if the output currently ends with the prompt.
+    """
+    pos = chunk.rfind('\n')
+    if pos == -1:
+      self.lastLine += chunk
+    else:
+      self.lastLine = chunk[pos + 1:]
+
+    return self.lastLine.endswith(self.prompt)
+
+class ChannelReader():
+  """
+  Buffered reader for an interactive shell channel (as returned by paramiko's invoke_shell).
+
+  Data is received in chunks of _chunkSize_ bytes, the reader blocks in select() on the channel
+  instead of polling and every command has to finish within _timeout_ seconds.
+  """
+
+  def __init__(self, channel, prompt='$ ', chunkSize=65536, timeout=600):
+    self.channel   = channel
+    self.prompt    = prompt
+    self.chunkSize = chunkSize
+    self.timeout   = timeout
+    self.lastStats = None
+
+  def _wait(self, deadline):
+    """
+    Blocks until the channel is readable or the deadline is reached. Returns False on timeout.
+    """
+    while not self.channel.recv_ready():
+      remaining = deadline - time.time()
+      if remaining <= 0:
+        return False
+      if self.channel.closed or self.channel.exit_status_ready():
+        raise AssertionError('ssh channel closed by remote side')
+      select.select([self.channel], [], [], remaining)
+    return True
+
+  def drain(self):
+    """
+    Discards everything that is already waiting on the channel.
+    """
+    while self.channel.recv_ready():
+      self.channel.recv(self.chunkSize)
+
+  def send(self, data):
+    self.channel.sendall(data)
+
+  def readUntilPrompt(self, command='', timeout=None, marker=None):
+    """
+    Reads until the output ends with the prompt and returns the raw output (including the echoed
+    command and the prompt). If _marker_ is given, a prompt only counts after the marker has been
+    received. Raises an AssertionError if the command did not finish in time.
+    """
+    if timeout is None:
+      timeout = self.timeout
+
+    scanner  = PromptScanner(self.prompt)
+    chunks   = []
+    received = 0
+    start    = time.time()
+    deadline = start + timeout
+    tail     = ''
+
+    while True:
+      if not self._wait(deadline):
+        raise AssertionError('timeout after %ss waiting for prompt' % timeout)
+      chunk = self.channel.recv(self.chunkSize)
+      if not chunk:
+        raise AssertionError('ssh channel closed by remote side')
+      chunks.append(chunk)
+      received += len(chunk)
+      # keep just enough of the previous chunk to find a marker split between two chunks
+      if marker is not None:
+        window = tail + chunk
+        if marker in window:
+          marker = None
+        else:
+          tail = window[-len(marker):]
+      # the prompt is only final if nothing else is pending
+      if scanner.feed(chunk) and marker is None and not self.channel.recv_ready():
+        break
+
+    seconds = time.time() - start
+    self.lastStats = CommandStats(command, received, seconds, received / seconds if seconds > 0 else 0.0)
+
+    return ''.join(chunks)
+
+  def execute(self, command, timeout=None):
+    """
+    Sends _command_ and returns the raw output up to and including the next prompt.
+    """
+    self.drain()
+    self.send(command + '\n')
+    return self.readUntilPrompt(command, timeout)
+
+  def iterLines(self, command, timeout=None):
+    """
+    Sends _command_ and yields its output line by line as it arrives, without the echoed command
+    and the final prompt. Only the current incomplete line is buffered, so the memory use does not
+    depend on the output size. If the consumer stops early (close() or garbage collection), the
+    rest of the output is read and discarded, the shell is ready for the next command afterwards.
+    """
+    if timeout is None:
+      timeout = self.timeout
+
+    self.drain()
+    self.send(command + '\n')
+
+    received = 0
+    start    = time.time()
+    deadline = start + timeout
+    partial  = ''
+    echo     = True
+    finished = False
+
+    try:
+      while True:
+        if not self._wait(deadline):
+          raise AssertionError('timeout after %ss waiting for prompt' % timeout)
+        chunk = self.channel.recv(self.chunkSize)
+        if not chunk:
+          raise AssertionError('ssh channel closed by remote side')
+        received += len(chunk)
+
+        lines   = (partial + chunk).split('\n')
+        partial = lines.pop()
+        for line in lines:
+          # the first line is the echoed command
+          if echo:
+            echo = False
+            continue
+          yield line.rstrip('\r')
+
+        # the prompt is only final if nothing else is pending
+        if partial.endswith(self.prompt) and not self.channel.recv_ready():
+          finished = True
+          break
+
+    except GeneratorExit:
+      # consumer stopped early, skip the remaining output
+      while not (partial.endswith(self.prompt) and not self.channel.recv_ready()):
+        if not self._wait(deadline):
+          raise AssertionError('timeout after %ss waiting for prompt' % timeout)
+        chunk = self.channel.recv(self.chunkSize)
+        if not chunk:
+          raise AssertionError('ssh channel closed by remote side')
+        received += len(chunk)
+        partial = (partial + chunk).rsplit('\n', 1)[-1]
+      finished = True
+
+    finally:
+      if finished:
+        seconds = time.time() - start
+        self.lastStats = CommandStats(command, received, seconds, received / seconds if seconds > 0 else 0.0)
+
+  def executeBatch(self, commands, timeout=None):
+    """
+    Sends all _commands_ in one go and returns a list of BatchResult, one per command.
+
+    Terminal echo is switched off for the batch so that the typed-ahead commands do not mix
+    into the output. Every command is followed by an echo of a unique sentinel which is used
+    to split the combined output. The commands must not read from stdin. The timeout applies
+    to each command, the whole batch may take len(commands) times as long.
+    """
+    if not commands:
+      return []
+    if timeout is None:
+      timeout = self.timeout
+
+    # nothing to pipeline, a plain command saves the echo handling round-trip
+    if len(commands) == 1:
+      output = '\n'.join(self.execute(commands[0], timeout).replace('\r', '').split('\n')[1:-1])
+      return [BatchResult(commands[0], output, output if 'cli>ERROR:' in output else None)]
+
+    # the quotes keep the sentinel from matching its own command line
+    token    = 'SHENICK_BATCH_%s' % uuid.uuid4().hex
+    sentinel = "echo '%s''_%s'"
+
+    self.execute('stty -echo; ' + sentinel % (token, 'BEGIN'), timeout)
+
+    lines = []
+    for index, command in enumerate(commands):
+      lines.append(command)
+      lines.append(sentinel % (token, index))
+    lines.append('stty echo; ' + sentinel % (token, 'END'))
+
+    self.send('\n'.join(lines) + '\n')
+    output = self.readUntilPrompt('<batch of %d commands>' % len(commands), timeout * len(commands), '%s_END' % token)
+
+    return splitBatchOutput(output, commands, token)
+
+def parseApplications(lines):
+  """
+  Parses the output lines of 'cli listApplications' or 'cli listHosts' (e.g. '  IP/VQA-1 In Service Enabled'),
+  yields (name, state) per application or host.
+  """
+  for line in lines:
+    line = line.strip()
+    if line.startswith('IP/'):
+      name, _, state = line.partition(' ')
+      yield name.split('/')[1], state.strip()
+
+def parseAppIds(lines):
+  """
+  Parses the output lines of 'cli getAppIds', yields the application ids (e.g. '//Folder/TestGroup/IP/VQA-1').
+  """
+  for line in lines:
+    line = line.strip()
+    if line.startswith('//'):
+      yield line
+
+def parseTestGroups(lines):
+  """
+  Parses the output lines of 'cli listTestGroups', yields (tgName, 'running'|'stopped') per test group. Folders are skipped.
+  """
+  for line in lines:
+    if not line.startswith('//'):
+      continue
+
+    tgName = line[2:].replace('<<<Running>>>', '').replace('<<<Last>>>', '').rstrip()
+
+    if tgName.endswith('/') or tgName == '':
+      continue
+
+    yield tgName, 'running' if '<<<Running>>>' in line else 'stopped'
+
+def splitBatchOutput(output, commands, token):
+  """
+  Splits the output of ChannelReader.executeBatch at the sentinels. The prompt is taken from
+  the last line and stripped from the start of every line, as it precedes each (not echoed) command.
+  """
+  lines  = output.replace('\r', '').split('\n')
+  prompt = lines.pop()
+
+  results = []
+  current = []
+  for line in lines:
+    while prompt and line.startswith(prompt):
+      line = line[len(prompt):]
+
+    if line == '%s_%d' % (token, len(results)):
+      text  = '\n'.join(current)
+      error = text if 'cli>ERROR:' in text else None
+      results.append(BatchResult(commands[len(results)], text, error))
+      current = []
+      if len(results) == len(commands):
+        break
+    else:
+      current.append(line)
+
+  if len(results) != len(commands):
+    raise AssertionError('batch output incomplete, got %d of %d results' % (len(results), len(commands)))
+
+  return results
@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import json
+import numpy
+import shutil
+import tempfile
+import threading
+import ShenickTables
+import ShenickTransfer
+
+def _str(value):
+  # json returns unicode, the csv reader str
+  return value.encode('utf-8')
+
+class ColumnCache():
+  """
+  Local cache of parsed statistics, keyed by the content hash of the zip or csv file they were parsed from.
+
+  Every entry is a directory <sha1> holding one .npy file per column and a manifest.json with the table layout
+  and the categories of dictionary-encoded columns. Cached columns are loaded as read-only memory maps, so a
+  hit costs no parsing and processes reading the same entry share the pages. Entries are written to a temporary
+  directory and renamed, so concurrent processes never see a partial entry. The least recently used entries are
+  removed when the cache grows beyond maxBytes.
+  """
+
+  MANIFEST = 'manifest.json'
+
+  def __init__(self, directory=None, maxBytes=1 << 30):
+    self.directory = directory or os.path.join(tempfile.gettempdir(), 'shenickStatsCache')
+    self.maxBytes  = int(maxBytes)
+    self.hits      = 0
+    self.misses    = 0
+    self._lock     = threading.Lock()
+    if not os.path.isdir(self.directory):
+      try:
+        os.makedirs(self.directory)
+      except OSError:
+        # created by another process meanwhile
+        if not os.path.isdir(self.directory):
+          raise
+
+  def archiveTables(self, zipPath):
+    """
+    Returns the tables of a statistics zip file as list of (folder, name, ColumnarTable), see ShenickTables.statsMembers.
+    Meta files are skipped.
+    """
+    def parse():
+      tables = []
+      with ShenickTables.openStatsArchive(zipPath) as archive:
+        for folder, root, member in ShenickTables.statsMembers(archive):
+          if root == 'Meta':
+            continue
+          with archive.open(member) as csvFile:
+            tables.append((folder, root, ShenickTables.readColumnar(csvFile)))
+      return tables
+    return self._get(zipPath, parse)
+
+  def csvTable(self, csvPath):
+    """
+    Returns a csv file (e.g. Summary_Multicast_Client.csv) as ColumnarTable.
+    """
+    def parse():
+      with open(csvPath, 'rb') as csvFile:
+        return [('', os.path.splitext(os.path.basename(csvPath))[0], ShenickTables.readColumnar(csvFile))]
+    return self._get(csvPath, parse)[0][2]
+
+  def _get(self, path, parse):
+    key   = ShenickTransfer.fileDigest(path, 'sha1')
+    entry = os.path.join(self.directory, key)
+
+    tables = self._load(entry)
+    if tables is not None:
+      with self._lock:
+        self.hits += 1
+      return tables
+
+    with self._lock:
+      self.misses += 1
+    tables = parse()
+    self._store(entry, tables)
+    self._evict(keep=key)
+    return tables
+
+  def _load(self, entry):
+    manifestPath = os.path.join(entry, self.MANIFEST)
+    try:
+      with open(manifestPath) as manifestFile:
+        manifest = json.load(manifestFile)
+      tables = []
+      for info in manifest['tables']:
+        columns    = dict((_str(name), numpy.load(os.path.join(entry, fileName), mmap_mode='r')) for name, fileName in info['files'].items())
+        categories = dict((_str(name), [_str(value) for value in values]) for name, values in info['categories'].items())
+        table = ShenickTables.ColumnarTable(columns, categories)
+        table.order    = [_str(name) for name in info['order']]
+        table.lastTime = _str(info['lastTime']) if info['lastTime'] is not None else None
+        tables.append((_str(info['folder']), _str(info['name']), table))
+    except (IOError, OSError, ValueError, KeyError):
+      return None
+    # the manifest's modification time is the last use of the entry
+    try:
+      os.utime(manifestPath, None)
+    except OSError:
+      pass
+    return tables
+
+  def _store(self, entry, tables):
+    tmp = tempfile.mkdtemp(prefix='.tmp', dir=self.directory)
+    try:
+      manifest = {'tables': [], 'bytes': 0}
+      for tableIndex, (folder, name, table) in enumerate(tables):
+        files = {}
+        for columnIndex, column in enumerate(table.columnNames()):
+          fileName = 't%dc%d.npy' % (tableIndex, columnIndex)
+          numpy.save(os.path.join(tmp, fileName), numpy.asarray(table[column]))
+          manifest['bytes'] += os.path.getsize(os.path.join(tmp, fileName))
+          files[column] = fileName
+        manifest['tables'].append({
+          'folder':     folder,
+          'name':       name,
+          'order':      table.columnNames(),
+          'categories': table.categories,
+          'lastTime':   getattr(table, 'lastTime', None),
+          'files':      files,
+        })
+      with open(os.path.join(tmp, self.MANIFEST), 'w') as manifestFile:
+        json.dump(manifest, manifestFile)
+      os.rename(tmp, entry)
+    except OSError:
+      # another process stored the same entry meanwhile
+      shutil.rmtree(tmp, ignore_errors=True)
+      if not os.path.isdir(entry):
+        raise
+
+  def entries(self):
+    """
+    Returns the cache entries as list of (last use, bytes, key), least recently used first.
+    """
+    entries = []
+    for key in os.listdir(self.directory):
+      manifestPath = os.path.join(self.directory, key, self.MANIFEST)
+      try:
+        with open(manifestPath) as manifestFile:
+          size = json.load(manifestFile)['bytes']
+        entries.append((os.path.getmtime(manifestPath), size, key))
+      except (IOError, OSError, ValueError, KeyError):
+        continue
+    return sorted(entries)
+
+  def _evict(self, keep=None):
+    entries = self.entries()
+    total   = sum([size for lastUse, size, key in entries])
+    for lastUse, size, key in entries:
+      if total <= self.maxBytes:
+        break
+      if key == keep:
+        continue
+      # files still mapped by another process may not be removable (Windows), they are tried again next time
+      shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+      total -= size
+
+  def counters(self):
+    entries = self.entries()
+    with self._lock:
+      return {
+        'hits':    self.hits,
+        'misses':  self.misses,
+        'entries': len(entries),
+        'bytes':   sum([size for lastUse, size, key in entries]),
+      }
+
+  def clear(self):
+    for lastUse, size, key in self.entries():
+      shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+
+_columnCaches = {}
+
+def getColumnCache(directory=None, maxBytes=1 << 30):
+  """
+  Returns the ColumnCache of _directory_ (default: shenickStatsCache in the temp directory), shared by all
+  libraries of the process. _maxBytes_ updates the size limit of an existing cache.
+  """
+  cache = _columnCaches.get(directory)
+  if cache is None:
+    cache = _columnCaches[directory] = ColumnCache(directory, maxBytes)
+  cache.maxBytes = int(maxBytes)
+  return cache
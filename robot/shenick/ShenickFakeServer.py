@@ -0,0 +1,693 @@
+#!/usr/bin/python
+# coding: utf-8
+
+"""
+Local fake TVM-C: a paramiko ssh server speaking the shell/cli protocol used by ShenickCli and Shenick.
+
+Use it from python:
+| server = FakeTvmc(apps=100, latency=0.05).start()
+| cli    = ShenickCli('127.0.0.1:%d' % server.port, '//GPON/GPON_Triple_Play_LoadTest')
+| server.stop()
+
+or as a standalone process for load tests:
+| python ShenickFakeServer.py --port 2222 --apps 5000 --intervals 120 --latency 0.05
+"""
+
+import io
+import os
+import stat
+import hashlib
+import re
+import sys
+import time
+import random
+import shlex
+import shutil
+import socket
+import tempfile
+import subprocess
+import zipfile
+import zlib
+import argparse
+import threading
+import paramiko
+
+PROMPT = 'cli@tvmc:~$ '
+HOME   = '/home/cli'
+
+IGMP_COLUMNS = ['QmVideo MOS', 'Dropped Packets', 'QmVideo Impaired I-Frames', 'QmVideo Impaired P-Frames', 'QmVideo Impaired B-Frames',
+                'Join Time ms', 'Joins Initiated', 'Joins Completed', 'Leaves Initiated', 'Leaves Completed', 'In KiloBits/s']
+HTTP_COLUMNS = ['In KiloBits/s', 'Out KiloBits/s', 'Requests Sent', 'Responses Received']
+
+# name prefix, application type and statistics columns of the generated applications
+APP_KINDS = [
+  ('VQA',         'IGMP Client', IGMP_COLUMNS),
+  ('STB_Client',  'IGMP Client', IGMP_COLUMNS),
+  ('Client_HTTP', 'HTTP Client', HTTP_COLUMNS),
+]
+
+def _splitCommands(line):
+  """
+  Splits a shell line at ';' outside of quotes.
+  """
+  commands = []
+  current  = ''
+  quote    = None
+  for char in line:
+    if quote:
+      if char == quote:
+        quote = None
+    elif char in '\'"':
+      quote = char
+    elif char == ';':
+      commands.append(current)
+      current = ''
+      continue
+    current += char
+  commands.append(current)
+  return [command.strip() for command in commands if command.strip()]
+
+def _remotePath(path):
+  if not path.startswith('/'):
+    path = HOME + '/' + path
+  return os.path.normpath(path)
+
+class FakeTvmc():
+  """
+  Emulated controller state plus the listening server.
+
+  - port: tcp port, 0 picks a free one (see _port_ after start)
+  - apps: number of applications per test group, hosts are created 1:1
+  - intervals: number of statistics intervals available when the server starts
+  - sampleInterval: seconds per statistics interval, new intervals appear as time passes
+  - latency: seconds every command takes
+  - errorRate: probability of a cli command failing with cli>ERROR
+  - errorCommands: list of regular expressions, matching cli commands and perl scripts always fail
+  - dropRate: probability of the connection being dropped while a command executes
+  - dropAfter: drop every connection after this many commands
+  - sftpDropAfter: drop the connection after this many bytes of a single sftp transfer, to test resume
+  - testGroups: initial test groups
+  """
+
+  def __init__(self, port=0, apps=10, intervals=10, sampleInterval=30, latency=0.0, errorRate=0.0,
+               errorCommands=None, dropRate=0.0, dropAfter=None, sftpDropAfter=None, testGroups=None, user='cli', password='diversifEye'):
+    self.port           = port
+    self.apps           = int(apps)
+    self.sampleInterval = int(sampleInterval)
+    self.latency        = float(latency)
+    self.errorRate      = float(errorRate)
+    self.errorCommands  = [re.compile(pattern) for pattern in (errorCommands or [])]
+    self.dropRate       = float(dropRate)
+    self.dropAfter      = dropAfter
+    self.sftpDropAfter  = sftpDropAfter
+    self.user           = user
+    self.password       = password
+    self.startTime      = int(time.time()) - int(intervals) * self.sampleInterval
+    self.files          = {}
+    self.testGroups     = {}
+    self.commandCount   = 0
+    self.connections    = 0
+    self._lock          = threading.Lock()
+    self._random        = random.Random(0)
+    self._socket        = None
+    self._thread        = None
+    self._running       = False
+    self._hostKey       = paramiko.RSAKey.generate(2048)
+
+    for tgName in (testGroups or ['GPON/GPON_Triple_Play_LoadTest']):
+      self.addTestGroup(tgName)
+
+  ### state
+
+  def addTestGroup(self, tgName):
+    tgName = tgName.lstrip('/')
+    apps = []
+    for index in range(self.apps):
+      prefix, appType, columns = APP_KINDS[index % len(APP_KINDS)]
+      apps.append({'name': '%s-%d' % (prefix, index + 1), 'type': appType, 'columns': columns,
+                   'ip': '10.0.%d.%d/24' % (index // 250, index % 250 + 1), 'service': 'In Service', 'admin': 'Enabled'})
+    self.testGroups[tgName] = {'running': False, 'apps': apps}
+
+  def _testGroup(self, tgName):
+    tgName = tgName.strip('"\'').lstrip('/')
+    if tgName not in self.testGroups:
+      raise AssertionError('Test group //%s does not exist' % tgName)
+    return self.testGroups[tgName]
+
+  def _statValue(self, name, column, interval):
+    """
+    Deterministic per entity, column and interval index (1 is the first interval), the same on every run.
+    """
+    seed = zlib.crc32('%s,%s,%d' % (name, column.replace(' cu', '').replace('/s', ''), interval)) & 0xffff
+    if 'MOS' in column:
+      return '%.2f' % (3.8 + (seed % 120) / 100.0)
+    if 'Time' in column:
+      return '%.1f' % (40 + seed % 120)
+    if 'Bits' in column:
+      return '%.1f' % (4000 + seed % 2000)
+    if 'Initiated' in column:
+      return str(100)
+    if 'Completed' in column:
+      return str(95 + seed % 6)
+    return str(seed % 25)
+
+  def _intervalTimes(self):
+    now = int(time.time())
+    return range(self.startTime + self.sampleInterval, now + 1, self.sampleInterval)
+
+  def _intervalIndex(self, t):
+    return (t - self.startTime) // self.sampleInterval
+
+  ### statistics zip
+
+  def _statsZip(self, options):
+    """
+    Creates the csvStatistics zip content honoring the saveStats options EntityType and EntityName
+    (regular expressions, full match), Columns, After and Samples.
+    """
+    entityType = re.compile('(?:%s)$' % options['entitytype'], re.IGNORECASE) if options.get('entitytype') else None
+    entityName = re.compile('(?:%s)$' % options['entityname']) if options.get('entityname') else None
+    columns    = [c.strip().replace(' cu', '').replace('/s', '') for c in options.get('columns', '').split(',') if c.strip()]
+    after      = options.get('after')
+    times      = self._intervalTimes()
+
+    if after:
+      if after.isdigit():
+        after = int(after) / 1000
+      else:
+        after = int(time.mktime(time.strptime(after, '%Y-%m-%d %H:%M:%S')))
+      times = [t for t in times if t > after]
+    if options.get('samples'):
+      times = times[-int(options['samples']):]
+
+    tables = {}
+    for tgName, testGroup in sorted(self.testGroups.items()):
+      for app in testGroup['apps']:
+        for folder, table, header in [('Application', app['type'], ['Time', 'Entity Name', 'IP Address', 'In Service'] + app['columns']),
+                                      ('Host', 'Host', ['Time', 'Entity Name', 'IP Address', 'In Service', 'In KiloBits/s', 'Out KiloBits/s'])]:
+          if entityType and not entityType.match(folder):
+            continue
+          name = app['name'] if folder == 'Application' else 'Host_' + app['name']
+          if entityName and not entityName.match(name):
+            continue
+          if columns:
+            # like the controller, only the listed columns are exported, Time and Entity Name as well
+            header = [c for c in header if c.replace('/s', '') in columns]
+          key = (folder, table)
+          if key not in tables:
+            tables[key] = (header, [])
+          for t in times:
+            values = {'Time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)), 'Entity Name': name, 'IP Address': app['ip'],
+                      'In Service': 'true' if app['service'] == 'In Service' else 'false'}
+            row = [values[c] if c in values else self._statValue(name, c, self._intervalIndex(t)) for c in header]
+            tables[key][1].append(row)
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+      folders = set()
+      for (folder, table), (header, rows) in sorted(tables.items()):
+        lines = [','.join(header)] + [','.join(row) for row in rows]
+        archive.writestr('%s/%s.Normal.csv' % (folder, table), '\r\n'.join(lines) + '\r\n')
+        folders.add(folder)
+      for folder in sorted(folders):
+        archive.writestr('%s/Meta.csv' % folder, 'Key,Value\r\nStatsType,Normal\r\nEntityType,%s\r\n' % folder)
+    return buf.getvalue()
+
+  ### commands
+
+  def _cli(self, args):
+    """
+    Executes a cli command, returns the output lines.
+    """
+    if args and args[0] == '-u':
+      args = args[2:]
+    if args and args[0] == '-p':
+      args = args[2:]
+    if not args:
+      raise AssertionError('missing command')
+
+    for pattern in self.errorCommands:
+      if pattern.search(' '.join(args)):
+        raise AssertionError('injected error')
+    if self.errorRate and self._random.random() < self.errorRate:
+      raise AssertionError('injected error')
+
+    command, args = args[0], args[1:]
+
+    if command == 'available':
+      return ['true']
+    if command in ['start', 'configure', 'reportNotifications']:
+      return []
+    if command == 'listTestGroups':
+      lines = []
+      for folder in sorted(set(name.rsplit('/', 1)[0] + '/' for name in self.testGroups if '/' in name)):
+        lines.append('//' + folder)
+      for tgName, testGroup in sorted(self.testGroups.items()):
+        lines.append('//%s%s' % (tgName, ' <<<Running>>>' if testGroup['running'] else ''))
+      return lines
+    if command in ['listApplications', 'listHosts']:
+      testGroup = self._testGroup(args[0]) if args else self.testGroups.values()[0]
+      prefix = 'IP/' if command == 'listApplications' else 'IP/Host_'
+      return ['  %s%s %s %s' % (prefix, app['name'], app['service'], app['admin']) for app in testGroup['apps']]
+    if command == 'getAppIds':
+      tgName = args[0].strip('"\'').lstrip('/')
+      testGroup = self._testGroup(tgName)
+      return ['//%s/IP/%s' % (tgName, app['name']) for app in testGroup['apps']]
+    if command == 'getStat':
+      if len(args) < 2:
+        raise AssertionError('usage: getStat <name> <column> [statsType] [entityType]')
+      times = self._intervalTimes()
+      return [self._statValue(args[0], args[1], len(times))]
+    if command == 'saveStats':
+      options = {}
+      path = None
+      for arg in args:
+        if '=' in arg:
+          key, value = arg.split('=', 1)
+          options[key.lower()] = value.strip('"')
+        else:
+          path = arg
+      if not path:
+        raise AssertionError('no file name given')
+      self.files[_remotePath(path)] = self._statsZip(options)
+      return []
+    if command == 'importTestGroup':
+      # ShenickCli passes "//tg file", Shenick passes "//" file
+      if len(args) == 1:
+        tgName = args[0].split(' ')[0]
+      else:
+        content = self.files.get(_remotePath(args[1]))
+        if content is None:
+          raise AssertionError('no such file: %s' % args[1])
+        match = re.search(r'name="([^"]+)"', content)
+        tgName = match.group(1) if match else 'imported'
+      self.addTestGroup(tgName)
+      return []
+    if command in ['startTestGroup', 'stopTestGroup']:
+      if args:
+        testGroups = [self._testGroup(args[0])]
+      else:
+        testGroups = [tg for tg in self.testGroups.values() if tg['running']]
+        if not testGroups:
+          raise AssertionError('No test group running')
+      for testGroup in testGroups:
+        if command == 'stopTestGroup' and not testGroup['running']:
+          raise AssertionError('Test group not running')
+        testGroup['running'] = command == 'startTestGroup'
+      return []
+    if command == 'deleteTestGroup':
+      testGroup = self._testGroup(args[0])
+      if testGroup['running']:
+        raise AssertionError('Test group is running')
+      del self.testGroups[args[0].strip('"\'').lstrip('/')]
+      return []
+    if command.startswith('setServiceState') or command.startswith('setAdminState'):
+      return []
+
+    raise AssertionError('unknown command: %s' % command)
+
+  def execute(self, line, session):
+    """
+    Executes one shell line, returns the output text (lines terminated by \\r\\n).
+    """
+    output = []
+    for command in _splitCommands(line):
+      redirect = None
+      if '>' in command:
+        command, redirect = [part.strip() for part in command.split('>', 1)]
+      args = shlex.split(command)
+      if not args:
+        continue
+
+      if args[0] == 'stty':
+        session['echo'] = '-echo' not in args
+      elif args[0] == 'echo':
+        output.append(' '.join(args[1:]))
+      elif args[0] == 'true':
+        pass
+      elif args[0] == 'md5sum':
+        for path in args[1:]:
+          if _remotePath(path) in self.files:
+            output.append('%s  %s' % (hashlib.md5(self.files[_remotePath(path)]).hexdigest(), path))
+          else:
+            output.append('md5sum: %s: No such file or directory' % path)
+      elif args[0] == 'head' and args[1] == '-c' and args[-2:] == ['|', 'md5sum']:
+        # digest of the first bytes of a file, used to check partial transfers before they are resumed
+        output.append('%s  -' % hashlib.md5(self.files.get(_remotePath(args[3]), '')[:int(args[2])]).hexdigest())
+      elif args[0] == 'rm':
+        for path in args[1:]:
+          self.files.pop(_remotePath(path), None)
+      elif args[0] == 'perl' and any(pattern.search(command) for pattern in self.errorCommands):
+        output.append('cli>ERROR: injected error')
+      elif args[0] == 'perl' and len(args) > 2:
+        output.extend(self._runPerl(args[1:]))
+      elif args[0] == 'perl':
+        perl  = self.files.get(_remotePath(args[1]), '')
+        match = re.search(r'TestGroup->new\(name=>"([^"]+)"', perl)
+        xml   = '<diversifEye_Configuration><TestGroup name="%s"/></diversifEye_Configuration>' % (match.group(1) if match else 'robot')
+        if redirect:
+          self.files[_remotePath(redirect)] = xml
+        else:
+          output.append(xml)
+      elif args[0] == 'cli':
+        try:
+          with self._lock:
+            output.extend(self._cli(args[1:]))
+        except AssertionError as e:
+          output.append('cli>ERROR: %s' % e)
+      else:
+        output.append('sh: %s: command not found' % args[0])
+
+    return ''.join(line + '\r\n' for line in output)
+
+  def _runPerl(self, args):
+    """
+    Runs a perl script with arguments (e.g. the statistics aggregation) with the local perl. The fake's files
+    named in the arguments are copied to a temporary directory, files the script writes there are copied back.
+    """
+    directory = tempfile.mkdtemp(prefix='fakeTvmc_')
+    try:
+      local = {}
+      for arg in args:
+        if arg.startswith('/') or _remotePath(arg) in self.files:
+          local[_remotePath(arg)] = os.path.join(directory, str(len(local)) + '_' + os.path.basename(arg))
+          if _remotePath(arg) in self.files:
+            with open(local[_remotePath(arg)], 'wb') as f:
+              f.write(self.files[_remotePath(arg)])
+      process = subprocess.Popen(['perl'] + [local.get(_remotePath(arg), arg) for arg in args], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+      output  = process.communicate()[0]
+      for path, localPath in local.items():
+        if path not in self.files and os.path.exists(localPath):
+          with open(localPath, 'rb') as f:
+            self.files[path] = f.read()
+      return output.splitlines()
+    finally:
+      shutil.rmtree(directory)
+
+  ### server
+
+  def start(self):
+    """
+    Starts listening on 127.0.0.1 in a background thread, returns self.
+    """
+    self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    self._socket.bind(('127.0.0.1', self.port))
+    self._socket.listen(100)
+    self.port     = self._socket.getsockname()[1]
+    self._running = True
+    self._thread  = threading.Thread(target=self._accept)
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def stop(self):
+    self._running = False
+    if self._socket is not None:
+      self._socket.close()
+      self._socket = None
+
+  def serveForever(self):
+    if not self._running:
+      self.start()
+    try:
+      while self._running:
+        time.sleep(1)
+    except KeyboardInterrupt:
+      self.stop()
+
+  def _accept(self):
+    while self._running:
+      try:
+        sock, address = self._socket.accept()
+      except Exception:
+        break
+      thread = threading.Thread(target=self._handleConnection, args=(sock,))
+      thread.daemon = True
+      thread.start()
+
+  def _handleConnection(self, sock):
+    # the echo and the output are separate writes, don't let nagle delay the second one
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    transport = paramiko.Transport(sock)
+    transport.add_server_key(self._hostKey)
+    transport.set_subsystem_handler('sftp', paramiko.SFTPServer, _SftpInterface, self)
+    server = _ServerInterface(self, transport)
+    try:
+      transport.start_server(server=server)
+    except Exception:
+      return
+    with self._lock:
+      self.connections += 1
+
+  def _shouldDrop(self, session):
+    session['commands'] += 1
+    if self.dropAfter is not None and session['commands'] > int(self.dropAfter):
+      return True
+    return self.dropRate and self._random.random() < self.dropRate
+
+  def _runShell(self, channel, transport):
+    session = {'echo': True, 'commands': 0}
+    channel.sendall('Welcome to the diversifEye fake TVM-C\r\n' + PROMPT)
+    pending = ''
+
+    while self._running:
+      data = channel.recv(4096)
+      if not data:
+        break
+      pending += data.replace('\r\n', '\n').replace('\r', '\n')
+
+      while '\n' in pending:
+        line, pending = pending.split('\n', 1)
+        if session['echo']:
+          channel.sendall(line + '\r\n')
+        if self.latency:
+          time.sleep(self.latency)
+        if line.strip() and self._shouldDrop(session):
+          transport.close()
+          return
+        try:
+          channel.sendall(self.execute(line, session) + PROMPT)
+        except socket.error:
+          # the client gave up waiting (e.g. a command timeout) and closed the channel
+          return
+
+    channel.close()
+
+  def _runExec(self, channel, command):
+    args = shlex.split(command)
+    try:
+      if args[0] != 'scp':
+        output = self.execute(command, {'echo': False, 'commands': 0})
+        # the transport acknowledges the exec request after check_channel_exec_request returned,
+        # closing the channel before that makes the client's exec_command fail with "Channel closed"
+        time.sleep(0.05)
+        channel.sendall(output)
+        channel.send_exit_status(0)
+      elif '-t' in args:
+        self._scpSink(channel, _remotePath(args[-1]))
+      elif '-f' in args:
+        self._scpSource(channel, _remotePath(args[-1]))
+    except Exception:
+      channel.send_exit_status(1)
+    channel.close()
+
+  def _scpSink(self, channel, target):
+    """
+    Receiving side of 'scp -t' (upload to the controller).
+    """
+    channel.sendall('\0')
+    reader = channel.makefile('rb')
+    while True:
+      header = reader.readline()
+      if not header:
+        break
+      if header[0] == 'C':
+        mode, size, name = header[1:].rstrip('\n').split(' ', 2)
+        channel.sendall('\0')
+        data = reader.read(int(size))
+        reader.read(1)
+        path = target if not target.endswith('/') and target not in self._dirs() else target.rstrip('/') + '/' + name
+        self.files[path] = data
+      channel.sendall('\0')
+    channel.send_exit_status(0)
+
+  def _dirs(self):
+    return set(os.path.dirname(path) for path in self.files) | set([HOME, '/tmp'])
+
+  def _scpSource(self, channel, source):
+    """
+    Sending side of 'scp -f' (download from the controller).
+    """
+    reader = channel.makefile('rb')
+    reader.read(1)
+    if source not in self.files:
+      channel.sendall('\x01scp: %s: No such file or directory\n' % source)
+      channel.send_exit_status(1)
+      return
+    data = self.files[source]
+    channel.sendall('C0644 %d %s\n' % (len(data), os.path.basename(source)))
+    reader.read(1)
+    for offset in range(0, len(data), 32768):
+      channel.sendall(data[offset:offset + 32768])
+    channel.sendall('\0')
+    reader.read(1)
+    channel.send_exit_status(0)
+
+class _SftpHandle(paramiko.SFTPHandle):
+  """
+  Open file of the sftp subsystem, written files are stored when they are closed.
+  """
+
+  def __init__(self, tvmc, transport, path, data, writable):
+    paramiko.SFTPHandle.__init__(self)
+    self.tvmc      = tvmc
+    self.transport = transport
+    self.path      = path
+    self.data      = bytearray(data)
+    self.writable  = writable
+    self.served    = 0
+
+  def _count(self, size):
+    self.served += size
+    if self.tvmc.sftpDropAfter is not None and self.served > int(self.tvmc.sftpDropAfter):
+      self.transport.close()
+
+  def read(self, offset, length):
+    data = str(self.data[offset:offset + length])
+    self._count(len(data))
+    return data
+
+  def write(self, offset, data):
+    if not self.writable:
+      return paramiko.SFTP_PERMISSION_DENIED
+    self._count(len(data))
+    if offset > len(self.data):
+      self.data.extend('\0' * (offset - len(self.data)))
+    self.data[offset:offset + len(data)] = data
+    # written data is kept even if the transfer is dropped later
+    self.tvmc.files[self.path] = str(self.data)
+    return paramiko.SFTP_OK
+
+  def stat(self):
+    return _attributes(len(self.data))
+
+  def close(self):
+    if self.writable:
+      self.tvmc.files[self.path] = str(self.data)
+
+def _attributes(size):
+  attributes = paramiko.SFTPAttributes()
+  attributes.st_size = size
+  attributes.st_mode = stat.S_IFREG | 0644
+  attributes.st_mtime = int(time.time())
+  return attributes
+
+class _SftpInterface(paramiko.SFTPServerInterface):
+  """
+  sftp subsystem on top of the fake's files.
+  """
+
+  def __init__(self, server, tvmc):
+    paramiko.SFTPServerInterface.__init__(self, server)
+    self.tvmc      = tvmc
+    self.transport = server.transport
+
+  def open(self, path, flags, attr):
+    path     = _remotePath(path)
+    writable = bool(flags & (os.O_WRONLY | os.O_RDWR))
+    if path not in self.tvmc.files and not flags & os.O_CREAT:
+      return paramiko.SFTP_NO_SUCH_FILE
+    data = '' if flags & os.O_TRUNC else self.tvmc.files.get(path, '')
+    if writable:
+      self.tvmc.files[path] = data
+    return _SftpHandle(self.tvmc, self.transport, path, data, writable)
+
+  def stat(self, path):
+    path = _remotePath(path)
+    if path in self.tvmc._dirs():
+      attributes = _attributes(0)
+      attributes.st_mode = stat.S_IFDIR | 0755
+      return attributes
+    if path not in self.tvmc.files:
+      return paramiko.SFTP_NO_SUCH_FILE
+    return _attributes(len(self.tvmc.files[path]))
+
+  lstat = stat
+
+  def remove(self, path):
+    if self.tvmc.files.pop(_remotePath(path), None) is None:
+      return paramiko.SFTP_NO_SUCH_FILE
+    return paramiko.SFTP_OK
+
+  def rename(self, oldpath, newpath):
+    oldpath, newpath = _remotePath(oldpath), _remotePath(newpath)
+    if oldpath not in self.tvmc.files:
+      return paramiko.SFTP_NO_SUCH_FILE
+    if newpath in self.tvmc.files:
+      return paramiko.SFTP_FAILURE
+    self.tvmc.files[newpath] = self.tvmc.files.pop(oldpath)
+    return paramiko.SFTP_OK
+
+  def posix_rename(self, oldpath, newpath):
+    oldpath, newpath = _remotePath(oldpath), _remotePath(newpath)
+    if oldpath not in self.tvmc.files:
+      return paramiko.SFTP_NO_SUCH_FILE
+    self.tvmc.files[newpath] = self.tvmc.files.pop(oldpath)
+    return paramiko.SFTP_OK
+
+class _ServerInterface(paramiko.ServerInterface):
+
+  def __init__(self, tvmc, transport):
+    self.tvmc      = tvmc
+    self.transport = transport
+
+  def check_channel_request(self, kind, chanid):
+    if kind == 'session':
+      return paramiko.OPEN_SUCCEEDED
+    return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+  def get_allowed_auths(self, username):
+    return 'password'
+
+  def check_auth_password(self, username, password):
+    if username == self.tvmc.user and password == self.tvmc.password:
+      return paramiko.AUTH_SUCCESSFUL
+    return paramiko.AUTH_FAILED
+
+  def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+    return True
+
+  def check_channel_shell_request(self, channel):
+    thread = threading.Thread(target=self.tvmc._runShell, args=(channel, self.transport))
+    thread.daemon = True
+    thread.start()
+    return True
+
+  def check_channel_exec_request(self, channel, command):
+    thread = threading.Thread(target=self.tvmc._runExec, args=(channel, command))
+    thread.daemon = True
+    thread.start()
+    return True
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Fake diversifEye TVM-C ssh server')
+  parser.add_argument('--port',           type=int,   default=2222)
+  parser.add_argument('--apps',           type=int,   default=10,  help='applications per test group')
+  parser.add_argument('--intervals',      type=int,   default=10,  help='statistics intervals available at start')
+  parser.add_argument('--sample-interval',type=int,   default=30,  help='seconds per statistics interval')
+  parser.add_argument('--latency',        type=float, default=0.0, help='seconds per command')
+  parser.add_argument('--error-rate',     type=float, default=0.0, help='probability of a cli command failing')
+  parser.add_argument('--error-command',  action='append', default=[], help='regex of cli commands that always fail')
+  parser.add_argument('--drop-rate',      type=float, default=0.0, help='probability of dropping the connection per command')
+  parser.add_argument('--drop-after',     type=int,   default=None, help='drop connections after this many commands')
+  parser.add_argument('--sftp-drop-after',type=int,   default=None, help='drop connections after this many bytes of a sftp transfer')
+  parser.add_argument('--test-group',     action='append', default=None, help='initial test group, e.g. GPON/GPON_Triple_Play_LoadTest')
+  args = parser.parse_args()
+
+  server = FakeTvmc(args.port, args.apps, args.intervals, args.sample_interval, args.latency, args.error_rate,
+                    args.error_command, args.drop_rate, args.drop_after, args.sftp_drop_after, args.test_group)
+  server.start()
+  print 'fake TVM-C listening on 127.0.0.1:%d' % server.port
+  sys.stdout.flush()
+  server.serveForever()
@@ -0,0 +1,148 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import json
+import time
+import shlex
+import threading
+from contextlib import contextmanager
+
+# upper bounds (seconds) of the latency histogram buckets, the last bucket is unbounded
+BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60, 300]
+
+def commandVerb(command):
+  """
+  Returns the verb of a shell command, e.g. 'getStat' for 'cli -u robot getStat ...' and 'perl' for 'perl /tmp/robot.pl'.
+  """
+  try:
+    args = shlex.split(command)
+  except ValueError:
+    args = command.split()
+  if not args:
+    return ''
+  if args[0] != 'cli':
+    return args[0]
+  args = args[1:]
+  while len(args) > 1 and args[0] in ['-u', '-p']:
+    args = args[2:]
+  return args[0] if args else 'cli'
+
+def localFileSize(local, remote=None):
+  """
+  Returns the size of a local file, _local_ may be the directory _remote_ was copied into. 0 if there is no such file.
+  """
+  if remote is not None and os.path.isdir(local):
+    local = os.path.join(local, os.path.basename(remote))
+  return os.path.getsize(local) if os.path.isfile(local) else 0
+
+class LatencyStats():
+  """
+  Count, byte counters and latency histogram of one operation.
+  """
+
+  def __init__(self):
+    self.count         = 0
+    self.errors        = 0
+    self.seconds       = 0.0
+    self.minSeconds    = None
+    self.maxSeconds    = 0.0
+    self.bytesSent     = 0
+    self.bytesReceived = 0
+    self.histogram     = [0] * (len(BUCKETS) + 1)
+
+  def add(self, seconds, bytesSent=0, bytesReceived=0, error=False):
+    self.count         += 1
+    self.errors        += 1 if error else 0
+    self.seconds       += seconds
+    self.bytesSent     += bytesSent
+    self.bytesReceived += bytesReceived
+    self.maxSeconds     = max(self.maxSeconds, seconds)
+    self.minSeconds     = seconds if self.minSeconds is None else min(self.minSeconds, seconds)
+
+    for index, bound in enumerate(BUCKETS):
+      if seconds <= bound:
+        self.histogram[index] += 1
+        break
+    else:
+      self.histogram[-1] += 1
+
+  def asDict(self):
+    labels = ['<=%ss' % bound for bound in BUCKETS] + ['>%ss' % BUCKETS[-1]]
+    return {
+      'count':         self.count,
+      'errors':        self.errors,
+      'totalSeconds':  round(self.seconds, 6),
+      'meanSeconds':   round(self.seconds / self.count, 6) if self.count else 0.0,
+      'minSeconds':    round(self.minSeconds or 0.0, 6),
+      'maxSeconds':    round(self.maxSeconds, 6),
+      'bytesSent':     self.bytesSent,
+      'bytesReceived': self.bytesReceived,
+      'histogram':     dict((label, count) for label, count in zip(labels, self.histogram) if count),
+    }
+
+class IoMetrics():
+  """
+  Process-wide controller I/O metrics, grouped by operation (connect, command, batch, scpPut, scpGet)
+  and by command verb (e.g. getStat, saveStats, perl).
+  """
+
+  def __init__(self):
+    self._lock       = threading.Lock()
+    self._operations = {}
+    self._verbs      = {}
+    self._started    = time.time()
+
+  def record(self, operation, seconds, verb=None, bytesSent=0, bytesReceived=0, error=False):
+    with self._lock:
+      self._operations.setdefault(operation, LatencyStats()).add(seconds, bytesSent, bytesReceived, error)
+      if verb:
+        self._verbs.setdefault(verb, LatencyStats()).add(seconds, bytesSent, bytesReceived, error)
+
+  @contextmanager
+  def measure(self, operation, verb=None):
+    """
+    Times the block and records it. The block may set 'bytesSent'/'bytesReceived' in the yielded dictionary.
+    """
+    counters = {'bytesSent': 0, 'bytesReceived': 0}
+    start    = time.time()
+    try:
+      yield counters
+    except GeneratorExit:
+      # a consumer that stopped iterating early is not an error
+      self.record(operation, time.time() - start, verb, counters['bytesSent'], counters['bytesReceived'])
+      raise
+    except:
+      self.record(operation, time.time() - start, verb, counters['bytesSent'], counters['bytesReceived'], True)
+      raise
+    self.record(operation, time.time() - start, verb, counters['bytesSent'], counters['bytesReceived'])
+
+  def snapshot(self):
+    with self._lock:
+      return {
+        'wallSeconds': round(time.time() - self._started, 3),
+        'operations':  dict((name, stats.asDict()) for name, stats in self._operations.items()),
+        'verbs':       dict((name, stats.asDict()) for name, stats in self._verbs.items()),
+      }
+
+  def dump(self, path):
+    with open(path, 'w') as jsonFile:
+      json.dump(self.snapshot(), jsonFile, indent=2, sort_keys=True)
+    return path
+
+  def reset(self):
+    with self._lock:
+      self._operations = {}
+      self._verbs      = {}
+      self._started    = time.time()
+
+_metrics = None
+
+def getMetrics():
+  """
+  Returns the process-wide IoMetrics instance shared by all libraries.
+  """
+  global _metrics
+  if _metrics is None:
+    _metrics = IoMetrics()
+  return _metrics
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import time
+import atexit
+import threading
+import paramiko
+import ShenickChannel
+from contextlib import contextmanager
+
+class PooledSession():
+  """
+  A live shell channel handed out by the ConnectionPool.
+  - key: (tvmcIp, sshUser, tvmUser, partition)
+  - client: paramiko.SSHClient, use client.get_transport() for scp/sftp
+  - channel: shell channel, reader: ShenickChannel.ChannelReader on this channel
+  """
+
+  def __init__(self, key, client, channel, reader):
+    self.key      = key
+    self.client   = client
+    self.channel  = channel
+    self.reader   = reader
+    self.lastUsed = time.time()
+    self.inUse    = False
+
+  def isAlive(self):
+    transport = self.client.get_transport()
+    return transport is not None and transport.is_active() and not self.channel.closed and not self.channel.exit_status_ready()
+
+  def close(self):
+    try:
+      self.client.close()
+    except:
+      pass
+
+class ConnectionPool():
+  """
+  Process-wide pool of ssh shell sessions, keyed by (tvmcIp, sshUser, tvmUser, partition).
+
+  - maxPerController: maximum number of connections per controller ip (all keys together)
+  - idleTimeout: seconds after which an unused session is closed
+  - healthCheckInterval: sessions idle for longer than this are probed with a no-op command before reuse
+  - acquireTimeout: seconds to wait for a free connection if the controller is at its limit
+  """
+
+  def __init__(self, maxPerController=4, idleTimeout=300, healthCheckInterval=60, acquireTimeout=600):
+    self.maxPerController    = maxPerController
+    self.idleTimeout         = idleTimeout
+    self.healthCheckInterval = healthCheckInterval
+    self.acquireTimeout      = acquireTimeout
+    self._sessions  = []
+    self._creating  = {}
+    self._condition = threading.Condition()
+
+  def _controllerCount(self, tvmcIp):
+    return len([s for s in self._sessions if s.key[0] == tvmcIp]) + self._creating.get(tvmcIp, 0)
+
+  def _remove(self, session):
+    if session in self._sessions:
+      self._sessions.remove(session)
+    session.close()
+
+  def _evictIdle(self):
+    now = time.time()
+    for session in list(self._sessions):
+      if not session.inUse and (now - session.lastUsed > self.idleTimeout or not session.isAlive()):
+        self._remove(session)
+
+  def _isHealthy(self, session):
+    """
+    Checks transport and channel; sessions idle for a while also have to answer a no-op command.
+    """
+    if not session.isAlive():
+      return False
+    if time.time() - session.lastUsed > self.healthCheckInterval:
+      try:
+        session.reader.execute('true', 10)
+      except AssertionError:
+        return False
+    return True
+
+  def acquire(self, key, connect, setup=None):
+    """
+    Returns a PooledSession for _key_, reusing an idle one if possible. _connect_ is called without
+    arguments to open a new connection and must return (client, channel); _setup_ is called once with
+    each new session (e.g. to set the cli defaults). Release the session with _release_.
+    """
+    deadline = time.time() + self.acquireTimeout
+
+    with self._condition:
+      while True:
+        self._evictIdle()
+
+        for session in self._sessions:
+          if session.key == key and not session.inUse:
+            session.inUse = True
+            break
+        else:
+          session = None
+
+        if session is not None:
+          # check outside of the lock below, the probe needs a round-trip
+          break
+
+        if self._controllerCount(key[0]) >= self.maxPerController:
+          # make room by closing an idle session of another key on the same controller
+          idle = [s for s in self._sessions if s.key[0] == key[0] and not s.inUse]
+          if idle:
+            self._remove(idle[0])
+
+        if self._controllerCount(key[0]) < self.maxPerController:
+          self._creating[key[0]] = self._creating.get(key[0], 0) + 1
+          break
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+          raise AssertionError('no free ssh connection to %s within %ss' % (key[0], self.acquireTimeout))
+        self._condition.wait(remaining)
+
+    if session is not None:
+      if self._isHealthy(session):
+        session.lastUsed = time.time()
+        return session
+      # dead session, drop it and try again
+      self.release(session, discard=True)
+      return self.acquire(key, connect, setup)
+
+    try:
+      client, channel = connect()
+      session = PooledSession(key, client, channel, ShenickChannel.ChannelReader(channel))
+      # wait for the login banner and first prompt
+      session.reader.readUntilPrompt('login')
+      if setup is not None:
+        setup(session)
+    except:
+      if session is not None:
+        session.close()
+      with self._condition:
+        self._creating[key[0]] -= 1
+        self._condition.notify_all()
+      raise
+
+    with self._condition:
+      self._creating[key[0]] -= 1
+      session.inUse = True
+      self._sessions.append(session)
+
+    return session
+
+  def release(self, session, discard=False):
+    """
+    Returns _session_ to the pool. Discarded sessions (e.g. after a timeout mid-command) are closed.
+    """
+    with self._condition:
+      session.inUse    = False
+      session.lastUsed = time.time()
+      if discard:
+        self._remove(session)
+      self._condition.notify_all()
+
+  @contextmanager
+  def lease(self, key, connect, setup=None):
+    """
+    Context manager around acquire/release. The session is discarded if the block raises, a generator
+    closed by its consumer (GeneratorExit) is expected to leave the session ready for the next command.
+    """
+    session = self.acquire(key, connect, setup)
+    try:
+      yield session
+    except GeneratorExit:
+      self.release(session)
+      raise
+    except:
+      self.release(session, discard=True)
+      raise
+    self.release(session)
+
+  def closeAll(self):
+    with self._condition:
+      for session in list(self._sessions):
+        self._remove(session)
+      self._condition.notify_all()
+
+_pool = None
+
+def getPool():
+  """
+  Returns the process-wide connection pool.
+  """
+  global _pool
+  if _pool is None:
+    _pool = ConnectionPool()
+    atexit.register(_pool.closeAll)
+  return _pool
+
+def splitAddress(tvmcIp):
+  """
+  Splits 'host' or 'host:port' (e.g. a local fake controller) into host and port, default port is 22.
+  """
+  if tvmcIp.count(':') == 1:
+    host, port = tvmcIp.split(':')
+    return host, int(port)
+  return tvmcIp, 22
+
+def connectShell(tvmcIp, sshUser='cli', sshPwd='diversifEye'):
+  """
+  Default connect function for the pool: ssh connection plus an interactive shell.
+  """
+  try:
+    host, port = splitAddress(tvmcIp)
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    client.connect(host, port=port, username=sshUser, password=sshPwd, allow_agent=False)
+    channel = client.invoke_shell(width=256)
+  except:
+    raise AssertionError('could not open ssh connection.')
+  return client, channel
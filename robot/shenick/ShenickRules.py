@@ -0,0 +1,446 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import re
+import csv
+import gzip
+import heapq
+import numpy
+import ShenickTables
+from ShenickSampler import OPERATORS
+
+# log wording of a comparison, (passed, failed)
+WORDING = {
+  '>=': ('was greater than or equal to', 'was less than'),
+  '<=': ('was less than or equal to',    'was greater than'),
+  '>':  ('was greater than',             'was less than or equal to'),
+  '<':  ('was less than',                'was greater than or equal to'),
+  '==': ('was equal to',                 'was not equal to'),
+  '!=': ('was not equal to',             'was equal to'),
+}
+
+def _divide(left, right):
+  # x / 0 is NaN like 0 / 0 instead of inf, so divisions by zero never pass
+  quotient = numpy.true_divide(left, right)
+  quotient[numpy.broadcast_to(right == 0, quotient.shape)] = numpy.nan
+  return quotient
+
+ARITHMETIC = {
+  '+': numpy.add,
+  '-': numpy.subtract,
+  '*': numpy.multiply,
+  '/': _divide,
+}
+
+# operators need blanks around them, column labels contain '/' and '-' (e.g. 'In KiloBits/s', 'Impaired B-Frames')
+_COMPARISON = re.compile(r'\s(<=|>=|==|!=|<|>)\s')
+_MATCH      = re.compile(r'\s(!~|~)\s')
+_ARITHMETIC = re.compile(r'\s([-+*/])\s')
+_NUMBER     = re.compile(r'^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$')
+
+def _number(value):
+  try:
+    return float(value)
+  except ValueError:
+    return float('nan')
+
+def _format(value):
+  if value != value:
+    return 'nan'
+  return str(int(value)) if float(value).is_integer() else '%.10g' % value
+
+class _Columns():
+  """
+  Column access for the rules of one evaluation, every column is converted once however many rules use it.
+  """
+
+  def __init__(self, table):
+    self.table    = table
+    self._numeric = {}
+    self._text    = {}
+
+  def rowCount(self):
+    return self.table.rowCount()
+
+  def _check(self, column):
+    if column not in self.table:
+      raise AssertionError('column "%s" is not in the table, columns are: %s' % (column, ', '.join(self.table.columnNames())))
+
+  def numeric(self, column):
+    """
+    Returns a column as float64 array, text cells are NaN.
+    """
+    if column not in self._numeric:
+      self._check(column)
+      values = self.table[column]
+      if column in self.table.categories:
+        # one conversion per distinct text instead of one per row
+        values = numpy.array([_number(value) for value in self.table.categories[column]] + [numpy.nan])[values]
+      self._numeric[column] = numpy.asarray(values, dtype=numpy.float64)
+    return self._numeric[column]
+
+  def matches(self, column, pattern):
+    """
+    Returns a boolean mask of the rows where the compiled regular expression _pattern_ is found in _column_.
+    """
+    key = (column, pattern.pattern)
+    if key not in self._text:
+      self._check(column)
+      if column in self.table.categories:
+        # the pattern is matched once per distinct text, the codes pick the result for every row
+        found = numpy.array([pattern.search(value) is not None for value in self.table.categories[column]] + [False])
+        self._text[key] = found[self.table[column]]
+      else:
+        self._text[key] = numpy.array([pattern.search(_format(value)) is not None for value in self.numeric(column)], dtype=bool)
+    return self._text[key]
+
+def _compileOperand(token):
+  token = token.strip()
+  if _NUMBER.match(token):
+    number = float(token)
+    return lambda columns: numpy.full(columns.rowCount(), number)
+  if token.startswith('[') and token.endswith(']'):
+    token = token[1:-1].strip()
+  if not token:
+    raise AssertionError('missing column or number')
+  return lambda columns: columns.numeric(token)
+
+def _binary(left, right, function):
+  return lambda columns: function(left(columns), right(columns))
+
+def _compileProduct(tokens):
+  # tokens: operand, operator, operand, ... with * and / only
+  result = _compileOperand(tokens[0])
+  for op, operand in zip(tokens[1::2], tokens[2::2]):
+    result = _binary(result, _compileOperand(operand), ARITHMETIC[op])
+  return result
+
+def compileExpression(text):
+  """
+  Compiles an arithmetic expression of column labels and numbers (e.g. 'Joins Completed / Joins Initiated') into
+  a function(columns) returning a float64 array. Operators (+ - * /) need blanks around them, * and / bind
+  stronger than + and -. Column labels in brackets ([...]) may contain anything but ']'.
+  """
+  tokens = _ARITHMETIC.split(' %s ' % text.strip())
+  terms  = [[tokens[0]]]
+  for op, operand in zip(tokens[1::2], tokens[2::2]):
+    if op in '*/':
+      terms[-1] += [op, operand]
+    else:
+      terms.append([op, operand])
+
+  result = _compileProduct(terms[0])
+  for term in terms[1:]:
+    result = _binary(result, _compileProduct(term[1:]), ARITHMETIC[term[0]])
+  return result
+
+def compileCondition(text):
+  """
+  Compiles a row condition into a function(columns) returning a boolean mask:
+  '<column> ~ <regex>' (regular expression found in the column, case insensitive), '<column> !~ <regex>'
+  or a comparison of two expressions, e.g. 'Joins Initiated > 0'.
+  """
+  padded = ' %s ' % text
+  match  = _MATCH.search(padded)
+  if match:
+    column  = padded[:match.start()].strip().strip('[]')
+    pattern = re.compile(padded[match.end():].strip(), re.IGNORECASE)
+    if match.group(1) == '~':
+      return lambda columns: columns.matches(column, pattern)
+    return lambda columns: ~columns.matches(column, pattern)
+
+  left, op, right = _splitComparison(text)
+  return _binary(left, right, _compare(op))
+
+def _compare(op):
+  """
+  Returns the comparison _op_ of two arrays which is False where a side is not a finite number (empty cell, division by zero),
+  for != as well.
+  """
+  return lambda values, limits: OPERATORS[op](values, limits) & numpy.isfinite(values) & numpy.isfinite(limits)
+
+def _splitComparison(text):
+  padded  = ' %s ' % text
+  matches = list(_COMPARISON.finditer(padded))
+  if len(matches) != 1:
+    raise AssertionError('"%s" needs exactly one comparison (<, <=, ==, !=, >=, >) with blanks around it' % text.strip())
+  match = matches[0]
+  return compileExpression(padded[:match.start()]), match.group(1), compileExpression(padded[match.end():])
+
+class Rule():
+  """
+  A compiled threshold rule: '<expression> <operator> <expression> [where <condition> [and <condition> ...]]', e.g.
+  | Mean QmVideo MOS >= 4 where Entity Name ~ VQA
+  | Joins Completed / Joins Initiated >= 0.95 where Entity Name ~ Zap and Joins Initiated > 0
+  see compileExpression and compileCondition. _name_ labels the rule in verdicts and the log, default is the rule
+  without conditions (in the log its left side).
+  """
+
+  def __init__(self, text, name=None):
+    self.text = text.strip()
+    parts     = re.split(r'\s+where\s+', self.text, 1, flags=re.IGNORECASE)
+    try:
+      self.left, self.op, self.right = _splitComparison(parts[0])
+      self.conditions = [compileCondition(condition) for condition in re.split(r'\s+and\s+', parts[1], flags=re.IGNORECASE)] if len(parts) > 1 else []
+    except (AssertionError, re.error) as e:
+      raise AssertionError('invalid rule "%s": %s' % (self.text, e))
+    self.name  = name or parts[0].strip()
+    # the log reads '<entity> <label> <value> was less than <limit>'
+    self.label = name or _COMPARISON.split(' %s ' % parts[0])[0].strip()
+
+  def evaluate(self, columns):
+    """
+    Returns the boolean masks (applies, passed) and the arrays (values, limits) over all rows.
+    """
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+      applies = numpy.ones(columns.rowCount(), dtype=bool)
+      for condition in self.conditions:
+        applies &= condition(columns)
+      if not applies.any():
+        # the columns of a rule which applies to no row need not exist, e.g. HTTP rules on a multicast summary
+        nothing = numpy.full(columns.rowCount(), numpy.nan)
+        return applies, numpy.zeros(columns.rowCount(), dtype=bool), nothing, nothing
+      values = self.left(columns)
+      limits = self.right(columns)
+      # NaN (empty cells, divisions by zero) never passes
+      passed = _compare(self.op)(values, limits)
+    return applies, passed, values, limits
+
+class Verdicts():
+  """
+  Per-entity result of a RuleSet: names (one per row), skipped (boolean array), rules, and the arrays
+  applies, passed, values and limits with one row per rule and one column per entity.
+  """
+
+  def __init__(self, names, skipped, rules, applies, passed, values, limits):
+    self.names   = names
+    self.skipped = skipped
+    self.rules   = rules
+    self.applies = applies & ~skipped
+    self.passed  = passed
+    self.values  = values
+    self.limits  = limits
+
+  def failed(self):
+    """
+    Returns the boolean array (rules x entities) of the checks which failed.
+    """
+    return self.applies & ~self.passed
+
+  def verdicts(self):
+    """
+    Returns the verdict of every entity: FAIL if a rule failed, PASS if rules applied and passed, SKIP for
+    skipped entities and NONE if no rule applies.
+    """
+    verdicts = numpy.where(self.applies.any(axis=0), 'PASS', 'NONE')
+    verdicts[self.failed().any(axis=0)] = 'FAIL'
+    verdicts[self.skipped] = 'SKIP'
+    return verdicts
+
+  def allPassed(self):
+    return not self.failed().any()
+
+  def counts(self):
+    verdicts = self.verdicts()
+    return dict((verdict, int((verdicts == verdict).sum())) for verdict in ['PASS', 'FAIL', 'SKIP', 'NONE'])
+
+  def rows(self):
+    """
+    Returns the verdict table as list of dictionaries, one per entity: Entity Name, verdict and PASS/FAIL
+    (empty if the rule does not apply) per rule name.
+    """
+    verdicts = self.verdicts()
+    rows     = []
+    for index, name in enumerate(self.names):
+      row = {'Entity Name': name, 'verdict': str(verdicts[index])}
+      for number, rule in enumerate(self.rules):
+        row[rule.name] = ('PASS' if self.passed[number, index] else 'FAIL') if self.applies[number, index] else ''
+      rows.append(row)
+    return rows
+
+  def failures(self):
+    """
+    Returns the failed checks as list of dictionaries with the keys entity, rule, value, operator and limit.
+    """
+    # transposed, the failures are listed per entity as in the log
+    return [{'entity': self.names[index], 'rule': self.rules[number].name, 'value': float(self.values[number, index]),
+             'operator': self.rules[number].op, 'limit': float(self.limits[number, index])} for index, number in zip(*numpy.nonzero(self.failed().T))]
+
+  def messages(self):
+    """
+    Yields one log line per check, e.g. 'PASS :: <VQA-1> MOS 4.2 was greater than or equal to 4'.
+    """
+    for index in numpy.nonzero(self.applies.any(axis=0))[0]:
+      for number, rule in enumerate(self.rules):
+        if not self.applies[number, index]:
+          continue
+        passed = bool(self.passed[number, index])
+        yield '%s :: <%s> %s %s %s %s' % ('PASS' if passed else 'FAIL', self.names[index], rule.label, _format(self.values[number, index]),
+                                          WORDING[rule.op][0 if passed else 1], _format(self.limits[number, index]))
+
+def _badness(op, values, limits):
+  """
+  Returns how far failed checks are from passing, larger is worse; missing values are the worst.
+  """
+  with numpy.errstate(invalid='ignore'):
+    if op in ['>=', '>']:
+      badness = limits - values
+    elif op in ['<=', '<']:
+      badness = values - limits
+    else:
+      badness = numpy.abs(values - limits)
+  badness[numpy.isnan(badness)] = numpy.inf
+  return badness
+
+class VerdictSummary():
+  """
+  Result of a streamed evaluation (RuleSet.evaluateStream) in bounded memory: verdict counts, checks and failures
+  per rule, the _worst_ offenders per rule and the names of the first _maxNames_ failing entities.
+  """
+
+  def __init__(self, rules, worst=10, maxNames=1000):
+    self.rules        = rules
+    self.worst        = int(worst)
+    self.maxNames     = int(maxNames)
+    self.rows         = 0
+    self.chunks       = 0
+    self.counts       = dict.fromkeys(['PASS', 'FAIL', 'SKIP', 'NONE'], 0)
+    self.checked      = [0] * len(rules)
+    self.failedChecks = [0] * len(rules)
+    # per rule (badness, entity, value, limit), worst first
+    self.offenders    = [[] for rule in rules]
+    self.failingNames = []
+
+  def add(self, verdicts):
+    """
+    Adds the Verdicts of one chunk.
+    """
+    self.chunks += 1
+    self.rows   += len(verdicts.names)
+    for verdict, count in verdicts.counts().items():
+      self.counts[verdict] += count
+
+    failed = verdicts.failed()
+    for number, rule in enumerate(self.rules):
+      self.checked[number] += int(verdicts.applies[number].sum())
+      indices = numpy.nonzero(failed[number])[0]
+      self.failedChecks[number] += len(indices)
+      if not len(indices) or not self.worst:
+        continue
+      badness = _badness(rule.op, verdicts.values[number, indices], verdicts.limits[number, indices])
+      if len(indices) > self.worst:
+        # only the worst of the chunk are candidates
+        keep    = numpy.argpartition(-badness, self.worst - 1)[:self.worst]
+        indices = indices[keep]
+        badness = badness[keep]
+      candidates = self.offenders[number] + [(float(bad), verdicts.names[index], float(verdicts.values[number, index]), float(verdicts.limits[number, index]))
+                                             for bad, index in zip(badness, indices)]
+      self.offenders[number] = heapq.nlargest(self.worst, candidates, key=lambda offender: offender[0])
+
+    if len(self.failingNames) < self.maxNames:
+      failing = numpy.nonzero(failed.any(axis=0))[0][:self.maxNames - len(self.failingNames)]
+      self.failingNames += [verdicts.names[index] for index in failing]
+
+  def allPassed(self):
+    return self.counts['FAIL'] == 0
+
+  def lines(self):
+    """
+    Returns the summary as a few log lines: verdict counts, one line per rule with its failures and worst offenders.
+    """
+    lines = ['%d entities: %d PASS, %d FAIL, %d SKIP, %d without rules' % (self.rows, self.counts['PASS'], self.counts['FAIL'], self.counts['SKIP'], self.counts['NONE'])]
+    for number, rule in enumerate(self.rules):
+      line = '%s: %d of %d checks failed' % (rule.name, self.failedChecks[number], self.checked[number])
+      if self.offenders[number]:
+        line += ', worst: ' + ', '.join('<%s> %s' % (entity, _format(value)) for bad, entity, value, limit in self.offenders[number])
+      lines.append(line)
+    return lines
+
+  def asDict(self):
+    """
+    Returns the summary as dictionary with the keys rows, counts, rules (name, checked, failed, worst) and failingNames.
+    """
+    return {
+      'rows':         self.rows,
+      'counts':       dict(self.counts),
+      'rules':        [{'name': rule.name, 'checked': self.checked[number], 'failed': self.failedChecks[number],
+                        'worst': [{'entity': entity, 'value': value, 'limit': limit} for bad, entity, value, limit in self.offenders[number]]}
+                       for number, rule in enumerate(self.rules)],
+      'failingNames': list(self.failingNames),
+    }
+
+def openDetail(path):
+  """
+  Opens a detail csv file for writing, gzip compressed if _path_ ends with .gz.
+  """
+  return gzip.open(path, 'wb') if path.lower().endswith('.gz') else open(path, 'wb')
+
+class RuleSet():
+  """
+  Rules compiled once and evaluated as column operations over a whole table (ShenickTables.ColumnarTable).
+
+  - rules: list of rule texts or Rule objects, or dictionary {name: rule text}
+  - skip: condition (see compileCondition) of rows which are not evaluated, e.g. 'IP Address ~ ^0\\.0\\.0\\.0'
+  - nameColumn: column naming the entities
+  """
+
+  def __init__(self, rules, skip='', nameColumn='Entity Name'):
+    if isinstance(rules, dict):
+      rules = [Rule(text, name) for name, text in sorted(rules.items())]
+    self.rules      = [rule if isinstance(rule, Rule) else Rule(rule) for rule in rules]
+    self.skip       = compileCondition(skip) if skip else None
+    self.nameColumn = nameColumn
+
+  def evaluate(self, table):
+    """
+    Returns the Verdicts of the rows of _table_.
+    """
+    columns = _Columns(table)
+    count   = table.rowCount()
+    names   = table.decode(self.nameColumn) if self.nameColumn in table.categories else [str(index) for index in range(count)]
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+      skipped = self.skip(columns) if self.skip is not None else numpy.zeros(count, dtype=bool)
+
+    shape   = (len(self.rules), count)
+    applies = numpy.zeros(shape, dtype=bool)
+    passed  = numpy.zeros(shape, dtype=bool)
+    values  = numpy.zeros(shape)
+    limits  = numpy.zeros(shape)
+    for number, rule in enumerate(self.rules):
+      applies[number], passed[number], values[number], limits[number] = rule.evaluate(columns)
+    return Verdicts(names, skipped, self.rules, applies, passed, values, limits)
+
+  def evaluateFile(self, csvPath):
+    """
+    Returns the Verdicts of the rows of a csv file, e.g. Summary_Multicast_Client.csv.
+    """
+    with open(csvPath, 'rb') as csvFile:
+      return self.evaluate(ShenickTables.readColumnar(csvFile))
+
+  def evaluateStream(self, csvPath, chunkRows=50000, worst=10, maxNames=1000, detailPath=''):
+    """
+    Evaluates a csv file in chunks of _chunkRows_ rows and returns a VerdictSummary, memory does not grow with the
+    number of entities. With _detailPath_ the verdict of every entity (Entity Name, verdict, per rule PASS/FAIL and
+    the value) is written to this csv file as well, compressed if it ends with .gz.
+    """
+    summary = VerdictSummary(self.rules, worst, maxNames)
+    detail  = openDetail(detailPath) if detailPath else None
+    try:
+      writer = None
+      if detail is not None:
+        writer = csv.writer(detail, lineterminator='\n')
+        writer.writerow(['Entity Name', 'verdict'] + [name for rule in self.rules for name in [rule.name, rule.name + ' value']])
+
+      with open(csvPath, 'rb') as csvFile:
+        for table in ShenickTables.readColumnarChunks(csvFile, chunkRows):
+          verdicts = self.evaluate(table)
+          summary.add(verdicts)
+          if writer is not None:
+            statuses = numpy.where(verdicts.applies, numpy.where(verdicts.passed, 'PASS', 'FAIL'), '')
+            values   = numpy.where(verdicts.applies, verdicts.values.astype(str), '')
+            columns  = [column for number in range(len(self.rules)) for column in [statuses[number], values[number]]]
+            writer.writerows(zip(verdicts.names, verdicts.verdicts(), *columns))
+    finally:
+      if detail is not None:
+        detail.close()
+    return summary
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import re
+import time
+import threading
+import operator
+from collections import deque
+
+OPERATORS = {
+  '<':  operator.lt,
+  '<=': operator.le,
+  '>':  operator.gt,
+  '>=': operator.ge,
+  '==': operator.eq,
+  '!=': operator.ne,
+}
+
+def parseThreshold(condition):
+  """
+  Parses a threshold condition which a statistic has to fulfill, e.g. '>= 4' or '<=20', returns (operator string, limit).
+  """
+  match = re.match('^\s*(<=|>=|==|!=|<|>)\s*(-?\d+(?:\.\d+)?)\s*$', str(condition))
+  if not match:
+    raise AssertionError('invalid threshold "%s", use <operator><number>, e.g. ">=4" or "<= 20"' % condition)
+  return match.group(1), float(match.group(2))
+
+class StatsSampler():
+  """
+  Background thread polling a set of statistics of a set of applications into a ring buffer.
+
+  - fetch: function(appNames, stats) returning {appName: {stat: value}}, called from the sampler thread. Values which
+    could not be read are None
+  - appNames, stats: what to sample
+  - thresholds: {stat: condition}, conditions the values have to fulfill, e.g. {'QmVideo MOS': '>=4'}
+  - onAbort: function(breaches) called once if a threshold is breached, e.g. to stop the test group.
+    The sampler stops afterwards.
+  - interval: seconds between two samples
+  - bufferSize: number of samples kept, older samples are dropped
+  - breachCount: number of consecutive samples a condition has to fail before onAbort is called
+  - maxErrors: number of consecutive failed fetches after which the sampler gives up (stoppedOnErrors)
+  """
+
+  def __init__(self, fetch, appNames, stats, thresholds=None, onAbort=None, interval=30, bufferSize=1000, breachCount=1, maxErrors=10):
+    self.fetch           = fetch
+    self.appNames        = list(appNames)
+    self.stats           = list(stats)
+    self.thresholds      = dict((stat, parseThreshold(condition)) for stat, condition in (thresholds or {}).items())
+    self.onAbort         = onAbort
+    self.interval        = float(interval)
+    self.breachCount     = int(breachCount)
+    self.maxErrors       = int(maxErrors)
+    self.samples         = deque(maxlen=int(bufferSize))
+    self.breaches        = []
+    self.aborted         = False
+    self.errors          = 0
+    self.lastError       = None
+    self.stoppedOnErrors = False
+    self.missing         = 0
+    self._failing        = {}
+    self._lock           = threading.Lock()
+    self._stopEvent      = threading.Event()
+    self._thread         = None
+
+  def start(self):
+    self._thread = threading.Thread(target=self._run, name='ShenickStatsSampler')
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def stop(self, timeout=None):
+    self._stopEvent.set()
+    if self._thread is not None and self._thread is not threading.current_thread():
+      self._thread.join(timeout)
+
+  def isRunning(self):
+    return self._thread is not None and self._thread.is_alive()
+
+  def _run(self):
+    consecutiveErrors = 0
+
+    while not self._stopEvent.is_set():
+      started = time.time()
+      try:
+        values = self.fetch(self.appNames, self.stats)
+      except Exception as e:
+        consecutiveErrors += 1
+        with self._lock:
+          self.errors   += 1
+          self.lastError = str(e)
+        if consecutiveErrors >= self.maxErrors:
+          with self._lock:
+            self.stoppedOnErrors = True
+          break
+      else:
+        consecutiveErrors = 0
+        with self._lock:
+          self.samples.append((started, values))
+          self.missing += sum(1 for appValues in values.values() for value in appValues.values() if value is None)
+        breaches = self._check(started, values)
+        if breaches:
+          with self._lock:
+            self.breaches = breaches
+            self.aborted  = True
+          if self.onAbort is not None:
+            self.onAbort(breaches)
+          break
+
+      self._stopEvent.wait(max(0, self.interval - (time.time() - started)))
+
+  def _check(self, timestamp, values):
+    """
+    Returns the breaches (dictionaries with time, app, stat, value and condition) of conditions which failed
+    for breachCount consecutive samples.
+    """
+    breaches = []
+    for appName, appValues in values.items():
+      for stat, (op, limit) in self.thresholds.items():
+        value = appValues.get(stat)
+        if not isinstance(value, (int, long, float)):
+          continue
+        key = (appName, stat)
+        if OPERATORS[op](value, limit):
+          self._failing[key] = 0
+          continue
+        self._failing[key] = self._failing.get(key, 0) + 1
+        if self._failing[key] >= self.breachCount:
+          breaches.append({'time': timestamp, 'app': appName, 'stat': stat, 'value': value, 'condition': '%s %s' % (op, limit)})
+    return breaches
+
+  def getSamples(self, last=0):
+    """
+    Returns the buffered samples as list of (time, {appName: {stat: value}}), only the _last_ ones if > 0.
+    """
+    with self._lock:
+      samples = list(self.samples)
+    return samples[-int(last):] if int(last) > 0 else samples
+
+  def status(self):
+    with self._lock:
+      return {
+        'running':         self.isRunning(),
+        'aborted':         self.aborted,
+        'breaches':        list(self.breaches),
+        'samples':         len(self.samples),
+        'errors':          self.errors,
+        'lastError':       self.lastError,
+        'stoppedOnErrors': self.stoppedOnErrors,
+        'missing':         self.missing,
+      }
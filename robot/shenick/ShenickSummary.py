@@ -0,0 +1,189 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import re
+import csv
+from collections import OrderedDict
+import ShenickTables
+
+# summary file of an application table, other tables get Summary_<table>.csv
+SUMMARY_FILES = {
+  'IGMP Client': 'Summary_Multicast_Client.csv',
+  'HTTP Client': 'Summary_HTTP_Client.csv',
+}
+
+# the summary files are written where Analyse.bat puts them: <output>/<results name>/output/Miscellaneous
+SUMMARY_DIRECTORY = os.path.join('output', 'Miscellaneous')
+
+# columns which are levels (rates, scores, times) get Mean/Min/Max columns, all others are counters
+# which get their total: the last value with cumulative statistics, the sum of the intervals otherwise
+GAUGES = re.compile(r'MOS|/s$|\bms$|Jitter|Latency|Ratio|%', re.IGNORECASE)
+
+def summaryFileName(table):
+  return SUMMARY_FILES.get(table, 'Summary_%s.csv' % re.sub('\W+', '_', table).strip('_'))
+
+def _format(value):
+  return str(int(value)) if value.is_integer() else '%.10g' % value
+
+class _TableSummary():
+  """
+  Per-entity accumulators of one statistics table, filled row by row.
+  """
+
+  def __init__(self, header, cumulative, inServiceOnly):
+    self.header        = header
+    self.cumulative    = cumulative
+    self.inServiceOnly = inServiceOnly
+    self.nameIndex     = header.index('Entity Name') if 'Entity Name' in header else None
+    self.ipIndex       = header.index('IP Address') if 'IP Address' in header else None
+    self.serviceIndex  = header.index(ShenickTables.IN_SERVICE_COLUMN) if ShenickTables.IN_SERVICE_COLUMN in header else None
+    self.columns       = [(index, name, GAUGES.search(name) is not None) for index, name in enumerate(header)
+                          if name not in ShenickTables.STRING_COLUMNS and name != ShenickTables.TIME_COLUMN]
+    self.text          = set()
+    # entity name: [ip address, {column index: [count, sum, min, max, last]}]
+    self.entities      = OrderedDict()
+
+  def add(self, row):
+    name   = row[self.nameIndex] if self.nameIndex is not None and self.nameIndex < len(row) else ''
+    entity = self.entities.get(name)
+    if entity is None:
+      entity = self.entities[name] = ['', {}]
+    if self.ipIndex is not None and self.ipIndex < len(row):
+      entity[0] = row[self.ipIndex]
+    inService = self.serviceIndex is None or self.serviceIndex >= len(row) or row[self.serviceIndex].strip().lower() not in ShenickTables.OUT_OF_SERVICE
+
+    values = entity[1]
+    for index, name, gauge in self.columns:
+      if index >= len(row) or row[index] == '':
+        continue
+      try:
+        value = float(row[index])
+      except ValueError:
+        self.text.add(index)
+        continue
+      # counters always count, levels of out of service intervals are left out
+      if gauge and self.inServiceOnly and not inService:
+        continue
+      accumulator = values.get(index)
+      if accumulator is None:
+        values[index] = [1, value, value, value, value]
+        continue
+      accumulator[0] += 1
+      accumulator[1] += value
+      if value < accumulator[2]:
+        accumulator[2] = value
+      if value > accumulator[3]:
+        accumulator[3] = value
+      accumulator[4] = value
+
+  def summaryHeader(self):
+    header = ['Entity Name', 'IP Address']
+    for index, name, gauge in self.columns:
+      if index in self.text:
+        continue
+      header += ['Mean ' + name, 'Min ' + name, 'Max ' + name] if gauge else [name]
+    return header
+
+  def summaryRows(self):
+    for name, (ipAddress, values) in self.entities.items():
+      row = [name, ipAddress]
+      for index, column, gauge in self.columns:
+        if index in self.text:
+          continue
+        accumulator = values.get(index)
+        if accumulator is None:
+          row += ['', '', ''] if gauge else ['']
+        elif gauge:
+          count, total, minimum, maximum, last = accumulator
+          row += [_format(total / count), _format(minimum), _format(maximum)]
+        else:
+          row.append(_format(accumulator[4] if self.cumulative else accumulator[1]))
+      yield row
+
+def summariseArchive(archive, outputDirectory, tables=None, cumulative=True, inServiceOnly=True):
+  """
+  Writes one summary csv file per application table of a statistics zip file (zipfile.ZipFile, see
+  ShenickTables.openStatsArchive) to _outputDirectory_: a row per entity with Entity Name, IP Address (of the
+  last interval), Mean/Min/Max of levels (e.g. Mean QmVideo MOS, Mean Join Time ms, Mean In KiloBits/s) and
+  the total of counters (e.g. Dropped Packets, Joins Completed). Every csv file is read once, row by row.
+
+  - tables: application tables to summarise, e.g. ['IGMP Client', 'HTTP Client']. Default: all
+  - cumulative: the statistics were saved with cumulative=true (the default of statisticsSave), the total
+    of a counter is its last value instead of the sum of the intervals
+  - inServiceOnly: leave out the intervals where an entity was out of service from the levels
+
+  Returns the paths of the files written.
+  """
+  summaries = OrderedDict()
+  for entityType, root, member in ShenickTables.statsMembers(archive):
+    if entityType != 'Application' or root == 'Meta':
+      continue
+    table = root.replace('.Normal', '').replace('.Fine', '').replace(' cu', '')
+    # of the normal and fine files of a table only the first one is summarised
+    if (tables and table not in tables) or table in summaries:
+      continue
+
+    with archive.open(member) as csvFile:
+      reader = csv.reader(csvFile)
+      try:
+        header = reader.next()
+      except StopIteration:
+        continue
+      summary = summaries[table] = _TableSummary(header, cumulative, inServiceOnly)
+      for row in reader:
+        if row:
+          summary.add(row)
+
+  if not os.path.isdir(outputDirectory):
+    os.makedirs(outputDirectory)
+
+  paths = []
+  for table, summary in summaries.items():
+    path = os.path.join(outputDirectory, summaryFileName(table))
+    with open(path, 'wb') as summaryFile:
+      writer = csv.writer(summaryFile, lineterminator='\n')
+      writer.writerow(summary.summaryHeader())
+      writer.writerows(summary.summaryRows())
+    paths.append(path)
+  return paths
+
+def summariseZip(zipPath, outputPath, tables=None, cumulative=True, inServiceOnly=True):
+  """
+  Summarises a statistics zip file like Analyse.bat: the files are written to <outputPath>/<zip file name>/output/Miscellaneous.
+  Returns the paths of the files written.
+  """
+  outputDirectory = os.path.join(outputPath, os.path.splitext(os.path.basename(zipPath))[0], SUMMARY_DIRECTORY)
+  with ShenickTables.openStatsArchive(zipPath) as archive:
+    return summariseArchive(archive, outputDirectory, tables, cumulative, inServiceOnly)
+
+def plotSummary(summaryPath, bins=50):
+  """
+  Renders a histogram of every Mean column of a summary csv file over the entities as png next to the file,
+  returns the paths of the images. Needs matplotlib.
+  """
+  try:
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as pyplot
+  except ImportError:
+    raise AssertionError('plotting needs matplotlib (pip install matplotlib)')
+
+  with open(summaryPath, 'rb') as summaryFile:
+    table = ShenickTables.readColumnar(summaryFile)
+
+  images = []
+  for column in table.numericColumns():
+    if not column.startswith('Mean '):
+      continue
+    values = table[column]
+    figure = pyplot.figure(figsize=(8, 4.5))
+    pyplot.hist(values[values == values], bins=int(bins))
+    pyplot.title('%s: %s' % (os.path.splitext(os.path.basename(summaryPath))[0], column))
+    pyplot.xlabel(column)
+    pyplot.ylabel('entities')
+    image = '%s_%s.png' % (os.path.splitext(summaryPath)[0], re.sub('\W+', '_', column).strip('_'))
+    figure.savefig(image)
+    pyplot.close(figure)
+    images.append(image)
+  return images
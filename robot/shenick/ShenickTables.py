@@ -0,0 +1,541 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import re
+import csv
+import mmap
+import array
+import numpy
+import itertools
+import zipfile
+import posixpath
+import multiprocessing
+from collections import defaultdict
+from contextlib import contextmanager
+
+# columns which are always kept as strings, even if all values look numeric
+STRING_COLUMNS = ['Entity Name', 'IP Address', 'In Service', 'Description']
+TIME_COLUMN    = 'Time'
+IN_SERVICE_COLUMN = 'In Service'
+OUT_OF_SERVICE    = ['false', 'no', '0', 'out of service']
+TIME_FORMAT    = 'datetime64[s]'
+
+# columns which identify a row, kept by every StatsSelection
+KEY_COLUMNS = [TIME_COLUMN, 'Entity Name', 'IP Address', 'In Service']
+
+def _names(value):
+  """
+  Returns a list or a comma-separated string as list of stripped names, [] for None/''.
+  """
+  if not value:
+    return []
+  if isinstance(value, basestring):
+    value = value.split(',')
+  return [name.strip() for name in value if name.strip()]
+
+class StatsSelection():
+  """
+  The entity types, columns and entities wanted from a statistics zip file, everything if not set.
+
+  saveStatsOptions() pushes the selection into the controller's saveStats, so nothing else is transferred.
+  The same selection is applied when parsing (zip files saved without it, columns the controller adds),
+  folders which are not wanted are never decompressed and unwanted columns are never decoded.
+
+  - entityTypes: list or comma-separated string, e.g. 'Application,Host'
+  - columns: list or comma-separated string of column labels, e.g. 'QmVideo MOS,Dropped Packets'.
+    Time, Entity Name, IP Address and In Service are always kept (and requested from the controller).
+  - entityNamePattern: regular expression fully matching the entity names, e.g. 'VQA.*'
+  """
+
+  def __init__(self, entityTypes=None, columns=None, entityNamePattern=''):
+    self.entityTypes       = _names(entityTypes)
+    self.columns           = _names(columns)
+    self.entityNamePattern = entityNamePattern or ''
+    self._folders          = set([entityType.lower() for entityType in self.entityTypes])
+    self._columns          = set(self.columns + KEY_COLUMNS)
+    self._entityName       = None
+
+  def __getstate__(self):
+    # compiled patterns are not picklable for the process pool
+    state = self.__dict__.copy()
+    state['_entityName'] = None
+    return state
+
+  def isEmpty(self):
+    return not (self.entityTypes or self.columns or self.entityNamePattern)
+
+  def saveStatsOptions(self):
+    """
+    Returns the selection as saveStats options (see Shenick.statisticsSave).
+    """
+    options = {}
+    if self.entityTypes:
+      options['entityType'] = '|'.join(self.entityTypes)
+    if self.columns:
+      # the controller exports exactly the listed columns, the key columns have to be listed as well
+      options['columns'] = ','.join(KEY_COLUMNS + [column for column in self.columns if column not in KEY_COLUMNS])
+    if self.entityNamePattern:
+      options['entityName'] = self.entityNamePattern
+    return options
+
+  def wantsFolder(self, folder):
+    return not self._folders or folder.lower() in self._folders
+
+  def wantsColumn(self, column):
+    return not self.columns or column in self._columns
+
+  def wantsEntity(self, name):
+    if not self.entityNamePattern:
+      return True
+    if self._entityName is None:
+      self._entityName = re.compile('(?:%s)$' % self.entityNamePattern)
+    return self._entityName.match(name) is not None
+
+class ColumnarTable(dict):
+  """
+  One statistics csv file as columns: {column: numpy array}.
+
+  - numeric columns are int64 (all values integers) or float64 arrays, empty cells are NaN
+  - the Time column is a datetime64[s] array ('YYYY-MM-DD HH:MM:SS' or milliseconds since the epoch)
+  - string columns (e.g. 'Entity Name') are dictionary-encoded: the array holds int32 codes
+    into categories[column], use decode(column) to get the strings back
+  """
+
+  def __init__(self, columns=None, categories=None):
+    dict.__init__(self, columns or {})
+    self.categories = categories or {}
+    self.order      = list(self.keys())
+
+  def rowCount(self):
+    for values in self.values():
+      return len(values)
+    return 0
+
+  def columnNames(self):
+    return list(self.order)
+
+  def decode(self, column):
+    """
+    Returns the values of a dictionary-encoded column as list of strings.
+    """
+    categories = self.categories[column]
+    return [categories[code] for code in self[column]]
+
+  def code(self, column, value):
+    """
+    Returns the code of _value_ in a dictionary-encoded column, -1 if it does not occur.
+    """
+    try:
+      return self.categories[column].index(value)
+    except ValueError:
+      return -1
+
+  def rows(self, column, value):
+    """
+    Returns a boolean mask of the rows where the dictionary-encoded _column_ equals _value_, e.g. rows('Entity Name', 'VQA-1').
+    """
+    return self[column] == self.code(column, value)
+
+  def nbytes(self):
+    return sum([values.nbytes for values in self.values()])
+
+  def numericColumns(self):
+    """
+    Returns the names of the int64/float64 columns (not Time, not dictionary-encoded).
+    """
+    return [column for column in self.order if column not in self.categories and self[column].dtype.kind in 'if']
+
+  def inService(self):
+    """
+    Returns a boolean mask of the rows (intervals) where the entity was in service, all rows if there is no
+    In Service column. 'false', 'no', '0' and 'Out of Service' count as out of service.
+    """
+    if IN_SERVICE_COLUMN not in self:
+      return numpy.ones(self.rowCount(), dtype=bool)
+    values = self[IN_SERVICE_COLUMN]
+    if IN_SERVICE_COLUMN not in self.categories:
+      return values != 0
+    inService = numpy.array([value.strip().lower() not in OUT_OF_SERVICE for value in self.categories[IN_SERVICE_COLUMN]] + [True])
+    # an empty column has no categories, the appended True is never indexed otherwise
+    return inService[values]
+
+class _ColumnBuilder():
+  """
+  Collects the values of one column in compact arrays. A column starts as numeric and switches to
+  dictionary encoding with the first value that is not a number.
+  """
+
+  def __init__(self, name):
+    self.name       = name
+    self.numbers    = None if name in STRING_COLUMNS or name == TIME_COLUMN else array.array('d')
+    self.isInteger  = True
+    self.codes      = None
+    self.categories = None
+    self.index      = None
+
+  def _addString(self, value):
+    if self.codes is None:
+      self.codes      = array.array('i')
+      self.categories = []
+      self.index      = {}
+    code = self.index.get(value)
+    if code is None:
+      code = self.index[value] = len(self.categories)
+      self.categories.append(value)
+    self.codes.append(code)
+
+  def _toStrings(self):
+    """
+    Switches a numeric column to dictionary encoding, the numbers collected so far are re-encoded as text.
+    """
+    numbers, self.numbers = self.numbers, None
+    for number in numbers:
+      if number != number:
+        self._addString('')
+      elif number.is_integer():
+        self._addString(str(int(number)))
+      else:
+        self._addString(repr(number))
+
+  def add(self, value):
+    if self.numbers is not None:
+      if value == '':
+        self.numbers.append(float('nan'))
+        self.isInteger = False
+        return
+      try:
+        number = float(value)
+      except ValueError:
+        self._toStrings()
+      else:
+        self.numbers.append(number)
+        if self.isInteger and not number.is_integer():
+          self.isInteger = False
+        return
+
+    self._addString(value)
+
+  def build(self):
+    """
+    Returns (numpy array, categories or None).
+    """
+    if self.name == TIME_COLUMN and self.codes is not None:
+      try:
+        if all([value.isdigit() for value in self.categories]):
+          times = numpy.array(self.categories, dtype=numpy.int64).astype('datetime64[ms]').astype(TIME_FORMAT)
+        else:
+          times = numpy.array(self.categories, dtype=TIME_FORMAT)
+      except ValueError:
+        # unknown time format, keep it dictionary-encoded
+        return numpy.frombuffer(self.codes, dtype=numpy.int32).copy(), self.categories
+      return times[numpy.frombuffer(self.codes, dtype=numpy.int32)], None
+    if self.numbers is not None:
+      values = numpy.frombuffer(self.numbers, dtype=numpy.float64).copy()
+      if self.isInteger:
+        values = values.astype(numpy.int64)
+      return values, None
+    if self.codes is None:
+      return numpy.zeros(0, dtype=numpy.int32), []
+    return numpy.frombuffer(self.codes, dtype=numpy.int32).copy(), self.categories
+
+def timeKey(value):
+  """
+  Sort key for Time values, 'YYYY-MM-DD HH:MM:SS' or milliseconds since the epoch.
+  """
+  return (0, int(value), '') if value.isdigit() else (1, 0, value)
+
+def readColumnar(csvFile, after=None, selection=None):
+  """
+  Reads a statistics csv file (file object, read row by row) into a ColumnarTable. If _after_ is given,
+  only rows with a later Time are read. Only the columns and entities of the StatsSelection _selection_
+  are read. table.lastTime is the latest Time value read (None if no rows).
+  """
+  reader = csv.reader(csvFile)
+  try:
+    header = reader.next()
+  except StopIteration:
+    table = ColumnarTable()
+    table.lastTime = None
+    return table
+
+  timeIndex = header.index(TIME_COLUMN) if TIME_COLUMN in header else None
+  nameIndex = header.index('Entity Name') if 'Entity Name' in header and selection is not None and selection.entityNamePattern else None
+  afterKey  = timeKey(after) if after is not None else None
+  lastTime  = None
+
+  wanted   = [(index, name) for index, name in enumerate(header) if selection is None or selection.wantsColumn(name)]
+  builders = [(index, _ColumnBuilder(name)) for index, name in wanted]
+  for row in reader:
+    if not row:
+      continue
+    if nameIndex is not None and not selection.wantsEntity(row[nameIndex] if nameIndex < len(row) else ''):
+      continue
+    if timeIndex is not None and timeIndex < len(row):
+      key = timeKey(row[timeIndex])
+      if afterKey is not None and key <= afterKey:
+        continue
+      if lastTime is None or key > timeKey(lastTime):
+        lastTime = row[timeIndex]
+    for index, builder in builders:
+      # short rows are filled up with empty cells
+      builder.add(row[index] if index < len(row) else '')
+
+  table = _buildTable([builder for index, builder in builders])
+  table.lastTime = lastTime
+  return table
+
+def _buildTable(builders):
+  columns    = {}
+  categories = {}
+  for builder in builders:
+    values, valueCategories = builder.build()
+    columns[builder.name] = values
+    if valueCategories is not None:
+      categories[builder.name] = valueCategories
+
+  table = ColumnarTable(columns, categories)
+  table.order = [builder.name for builder in builders]
+  return table
+
+def readColumnarChunks(csvFile, chunkRows=50000):
+  """
+  Reads a csv file (e.g. a summary of many thousand entities) as ColumnarTables of at most _chunkRows_ rows,
+  only one chunk is in memory at a time. A column may be numeric in one chunk and dictionary-encoded in another.
+  """
+  reader = csv.reader(csvFile)
+  try:
+    header = reader.next()
+  except StopIteration:
+    return
+
+  while True:
+    builders = [_ColumnBuilder(name) for name in header]
+    read     = 0
+    for row in itertools.islice(reader, int(chunkRows)):
+      read += 1
+      if not row:
+        continue
+      for index, builder in enumerate(builders):
+        builder.add(row[index] if index < len(row) else '')
+    if not read:
+      return
+    table = _buildTable(builders)
+    if table.rowCount():
+      yield table
+
+# statistics of aggregate(), p<N> are percentiles
+AGGREGATES = ['count', 'sum', 'mean', 'min', 'max', 'std', 'p50', 'p95', 'p99']
+
+def _groupStatistics(values, groups, groupCount, percentiles):
+  """
+  Returns {statistic: array with one value per group} of float64 _values_ grouped by the int codes _groups_
+  (0 ... groupCount - 1). NaN values are ignored, groups without values get count 0 and NaN.
+  """
+  valid  = ~numpy.isnan(values)
+  values = values[valid]
+  groups = groups[valid]
+
+  # sorted by group and value: minimum, maximum and percentiles are positions within each group
+  order  = numpy.lexsort((values, groups))
+  values = values[order]
+  groups = groups[order]
+
+  counts = numpy.bincount(groups, minlength=groupCount)
+  starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+  last   = numpy.maximum(starts + counts - 1, 0)
+  empty  = counts == 0
+  sums   = numpy.bincount(groups, weights=values, minlength=groupCount)
+
+  with numpy.errstate(invalid='ignore', divide='ignore'):
+    means = sums / counts
+    # two passes, the deviations from the group mean do not lose precision like sum of squares would
+    deviations = values - means[groups]
+    stds = numpy.sqrt(numpy.bincount(groups, weights=deviations * deviations, minlength=groupCount) / counts)
+
+  result = {'count': counts, 'sum': sums, 'mean': means, 'std': stds}
+  if len(values) == 0:
+    for statistic in ['min', 'max'] + ['p%g' % p for p in percentiles]:
+      result[statistic] = numpy.full(groupCount, numpy.nan)
+    return result
+
+  result['min'] = numpy.where(empty, numpy.nan, values[numpy.minimum(starts, len(values) - 1)])
+  result['max'] = numpy.where(empty, numpy.nan, values[last])
+  for p in percentiles:
+    # linear interpolation between the closest ranks, as numpy.percentile
+    position = starts + (numpy.maximum(counts, 1) - 1) * (p / 100.0)
+    lower    = numpy.minimum(numpy.floor(position).astype(numpy.int64), len(values) - 1)
+    upper    = numpy.minimum(lower + 1, last)
+    fraction = position - numpy.floor(position)
+    result['p%g' % p] = numpy.where(empty, numpy.nan, values[lower] + (values[upper] - values[lower]) * fraction)
+  return result
+
+def _pythonValue(value, integer=False):
+  if value != value:
+    return None
+  return int(round(value)) if integer else float(value)
+
+def aggregate(table, columns=None, byEntity=False, inServiceOnly=True, percentiles=(50, 95, 99)):
+  """
+  Aggregates the interval rows of a ColumnarTable in one vectorised pass per column: count, sum, mean, min, max,
+  std (population) and the _percentiles_ (p50, p95, p99) of every numeric column (or of _columns_).
+  Empty cells are ignored, and with _inServiceOnly_ intervals where the entity was out of service as well.
+
+  Returns {column: {statistic: value}}, with _byEntity_ {entity name: {column: {statistic: value}}}.
+  Statistics without values are None, sums of integer columns are integers.
+  """
+  columns = columns or table.numericColumns()
+  mask    = table.inService() if inServiceOnly else numpy.ones(table.rowCount(), dtype=bool)
+
+  if byEntity:
+    names      = table.categories.get('Entity Name', [])
+    groups     = table['Entity Name'][mask] if 'Entity Name' in table else numpy.zeros(0, dtype=numpy.int32)
+    groupCount = len(names)
+  else:
+    names      = [None]
+    groups     = numpy.zeros(int(mask.sum()), dtype=numpy.int32)
+    groupCount = 1
+
+  result = dict((name, {}) for name in names)
+  for column in columns:
+    values     = table[column]
+    integer    = values.dtype.kind == 'i'
+    statistics = _groupStatistics(numpy.asarray(values[mask], dtype=numpy.float64), groups, groupCount, percentiles)
+    for index, name in enumerate(names):
+      result[name][column] = dict((statistic, _pythonValue(statistics[statistic][index], (integer and statistic == 'sum') or statistic == 'count'))
+                                  for statistic in statistics)
+
+  return result if byEntity else result[None]
+
+def readRows(csvFile, after=None, selection=None):
+  """
+  Reads a statistics csv file into a dictionary {column: list of strings}. If _after_ is given, only rows with
+  a later Time are read. Only the columns and entities of the StatsSelection _selection_ are read.
+  Returns (table, latest Time value read or None).
+  """
+  table    = defaultdict(list)
+  lastTime = None
+  afterKey = timeKey(after) if after is not None else None
+
+  reader = csv.DictReader(csvFile)
+  if selection is not None and selection.columns and reader.fieldnames:
+    # the reader builds a dictionary of the wanted columns only
+    reader.fieldnames = [name if selection.wantsColumn(name) else None for name in reader.fieldnames]
+    reader.restkey    = None
+
+  # this will append all rows from the csv to our dict as list of values of key as table column
+  for row in reader:
+    row.pop(None, None)
+    if selection is not None and 'Entity Name' in row and not selection.wantsEntity(row['Entity Name']):
+      continue
+    rowTime = row.get(TIME_COLUMN)
+    if afterKey is not None and rowTime is not None and timeKey(rowTime) <= afterKey:
+      continue
+    if rowTime is not None and (lastTime is None or timeKey(rowTime) > timeKey(lastTime)):
+      lastTime = rowTime
+    for key, value in row.items():
+      table[key].append(value)
+
+  return table, lastTime
+
+def _readMember(args):
+  """
+  Pool worker: reads one member of a statistics zip file, returns (member, table, lastTime).
+  """
+  path, member, columnar, after, selection = args
+  with openStatsArchive(path) as archive:
+    with archive.open(member) as csvFile:
+      if columnar:
+        table = readColumnar(csvFile, after, selection)
+        return member, table, table.lastTime
+      table, lastTime = readRows(csvFile, after, selection)
+      return member, table, lastTime
+
+def readMembers(archive, members, columnar=False, afters=None, workers=1, minBytes=32 << 20, selection=None):
+  """
+  Reads members of a statistics zip file (opened with openStatsArchive), returns {member: (table, lastTime)}.
+  Tables are ColumnarTables if _columnar_, else {column: list of strings}. _afters_ is {member: Time} to
+  read only later rows, _selection_ a StatsSelection of the columns and entities to read.
+
+  With _workers_ > 1 (0: one per cpu) the members are parsed by a process pool, unless their uncompressed
+  size is below _minBytes_ or there is only one member; small zip files are faster to read in this process.
+  """
+  afters  = afters or {}
+  workers = int(workers) or multiprocessing.cpu_count()
+  size    = sum([archive.getinfo(member).file_size for member in members])
+
+  if workers > 1 and len(members) > 1 and size >= minBytes and archive.filename:
+    pool = multiprocessing.Pool(min(workers, len(members)))
+    try:
+      # largest files first, so one big file does not end up last
+      jobs    = sorted(members, key=lambda member: -archive.getinfo(member).file_size)
+      results = pool.map(_readMember, [(archive.filename, member, columnar, afters.get(member), selection) for member in jobs], 1)
+    finally:
+      pool.close()
+      pool.join()
+    return dict((member, (table, lastTime)) for member, table, lastTime in results)
+
+  tables = {}
+  for member in members:
+    with archive.open(member) as csvFile:
+      if columnar:
+        table = readColumnar(csvFile, afters.get(member), selection)
+        tables[member] = (table, table.lastTime)
+      else:
+        tables[member] = readRows(csvFile, afters.get(member), selection)
+  return tables
+
+class _MappedFile():
+  """
+  Read-only file object on a memory map, as mmap.read() of python 2 requires a size.
+  """
+
+  def __init__(self, buf, name=None):
+    self.buf  = buf
+    self.name = name
+
+  def read(self, size=-1):
+    if size is None or size < 0:
+      size = len(self.buf) - self.buf.tell()
+    return self.buf.read(size)
+
+  def seek(self, offset, whence=0):
+    try:
+      self.buf.seek(offset, whence)
+    except ValueError as e:
+      # zipfile expects IOError for seeks before the start, e.g. of an empty archive
+      raise IOError(str(e))
+
+  def tell(self):
+    return self.buf.tell()
+
+@contextmanager
+def openStatsArchive(path):
+  """
+  Opens a downloaded statistics zip file as zipfile.ZipFile on a read-only memory map of the file.
+  Nothing is extracted, members are decompressed only when they are opened. archive.filename is _path_.
+  """
+  with open(path, 'rb') as zipFile:
+    buf = mmap.mmap(zipFile.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+      archive = zipfile.ZipFile(_MappedFile(buf, path))
+      try:
+        yield archive
+      finally:
+        archive.close()
+    finally:
+      buf.close()
+
+def statsMembers(archive):
+  """
+  Returns (folder, name, member) for every csv file of a statistics zip file, e.g.
+  ('Application', 'IGMP Client.Normal', 'Application/IGMP Client.Normal.csv'). Meta files have the name 'Meta'.
+  """
+  members = []
+  for member in archive.namelist():
+    folder, fileName = posixpath.split(member)
+    root, ext = os.path.splitext(fileName)
+    if ext.lower() != '.csv' or not folder:
+      continue
+    members.append((posixpath.basename(folder), root, member))
+  return members
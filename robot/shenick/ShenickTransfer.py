@@ -0,0 +1,138 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import hashlib
+import posixpath
+
+# partial downloads/uploads are kept next to the target with this suffix until they are complete
+PART_SUFFIX = '.part'
+
+# transfer options, see Shenick.transferOptionsSet
+DEFAULT_OPTIONS = {
+  'backend':     'sftp',
+  'windowSize':  8 << 20,
+  'chunkSize':   32768,
+  'maxRequests': 64,
+  'compress':    False,
+  'resume':      True,
+  'verify':      True,
+  'retries':     3,
+}
+
+def fileDigest(path, algorithm='md5', size=None):
+  """
+  Returns the hex digest of a local file, of its first _size_ bytes if _size_ is given.
+  """
+  digest = hashlib.new(algorithm)
+  left   = size
+  with open(path, 'rb') as f:
+    while left is None or left > 0:
+      chunk = f.read(1 << 20 if left is None else min(1 << 20, left))
+      if not chunk:
+        break
+      digest.update(chunk)
+      if left is not None:
+        left -= len(chunk)
+  return digest.hexdigest()
+
+def _remoteSize(sftp, path):
+  try:
+    return sftp.stat(path).st_size
+  except IOError:
+    return None
+
+def _replaceLocal(source, target):
+  # os.rename does not replace an existing file on windows
+  if os.path.exists(target):
+    os.remove(target)
+  os.rename(source, target)
+
+def _replaceRemote(sftp, source, target):
+  try:
+    sftp.posix_rename(source, target)
+  except IOError:
+    # servers without the posix-rename extension do not replace an existing file
+    if _remoteSize(sftp, target) is not None:
+      sftp.remove(target)
+    sftp.rename(source, target)
+
+def sftpGet(sftp, remote, local, chunkSize=32768, maxRequests=64, resume=True, remoteDigest=None):
+  """
+  Downloads _remote_ with pipelined reads: up to _maxRequests_ reads of _chunkSize_ bytes are in flight.
+  The data is written to <local>.part, which is renamed to _local_ when it is complete. _remoteDigest_
+  (function(path, size=None) returning the md5 hex digest of a remote file or of its first _size_ bytes) enables
+  verification. With _resume_ and _remoteDigest_ an existing .part file is continued instead of starting over if
+  it is the beginning of _remote_; a resumed file which does not match is downloaded again from the start.
+  _local_ may be a directory. Returns the number of bytes transferred.
+  """
+  if os.path.isdir(local):
+    local = os.path.join(local, posixpath.basename(remote))
+  part = local + PART_SUFFIX
+  size = sftp.stat(remote).st_size
+
+  offset = os.path.getsize(part) if resume and os.path.isfile(part) else 0
+  # without digests a .part file of another version of the remote file could not be told apart
+  if offset > size or (offset and (remoteDigest is None or fileDigest(part) != remoteDigest(remote, offset))):
+    offset = 0
+
+  transferred = 0
+  with sftp.open(remote, 'rb') as remoteFile:
+    while True:
+      with open(part, 'ab' if offset else 'wb') as localFile:
+        position = offset
+        while position < size:
+          # one window of requests, readv sends them all before waiting for the first answer
+          end    = min(size, position + chunkSize * maxRequests)
+          chunks = [(start, min(chunkSize, end - start)) for start in xrange(position, end, chunkSize)]
+          for data in remoteFile.readv(chunks):
+            localFile.write(data)
+            transferred += len(data)
+          position = end
+
+      if remoteDigest is None or fileDigest(part) == remoteDigest(remote):
+        break
+      if offset == 0:
+        os.remove(part)
+        raise AssertionError('checksum of %s does not match %s' % (local, remote))
+      # the partial file was of another version of the remote file
+      offset = 0
+
+  _replaceLocal(part, local)
+  return transferred
+
+def sftpPut(sftp, local, remote, chunkSize=32768, resume=True, remoteDigest=None):
+  """
+  Uploads _local_ with pipelined writes to <remote>.part, which is renamed to _remote_ when it is complete.
+  _remoteDigest_ (see sftpGet) enables verification. With _resume_ and _remoteDigest_ an existing remote .part
+  file is continued if it is the beginning of _local_. Returns the number of bytes transferred.
+  """
+  part = remote + PART_SUFFIX
+  size = os.path.getsize(local)
+
+  offset = (_remoteSize(sftp, part) or 0) if resume else 0
+  # a .part file left by an upload of another file is never continued
+  if offset > size or (offset and (remoteDigest is None or remoteDigest(part) != fileDigest(local, size=offset))):
+    offset = 0
+
+  transferred = 0
+  while True:
+    with open(local, 'rb') as localFile:
+      localFile.seek(offset)
+      with sftp.open(part, 'r+b' if offset else 'wb') as remoteFile:
+        remoteFile.seek(offset)
+        # writes are not acknowledged one by one, close waits for all of them
+        remoteFile.set_pipelined(True)
+        for chunk in iter(lambda: localFile.read(chunkSize), ''):
+          remoteFile.write(chunk)
+          transferred += len(chunk)
+
+    if remoteDigest is None or remoteDigest(part) == fileDigest(local):
+      break
+    if offset == 0:
+      sftp.remove(part)
+      raise AssertionError('checksum of %s does not match %s' % (remote, local))
+    offset = 0
+
+  _replaceRemote(sftp, part, remote)
+  return transferred
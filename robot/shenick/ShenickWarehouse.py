@@ -0,0 +1,263 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import csv
+import time
+import sqlite3
+import threading
+import ShenickTables
+
+SCHEMA = [
+  '''CREATE TABLE IF NOT EXISTS runs (
+       id         INTEGER PRIMARY KEY,
+       name       TEXT NOT NULL UNIQUE,
+       testGroup  TEXT NOT NULL DEFAULT '',
+       controller TEXT NOT NULL DEFAULT '',
+       ingested   REAL NOT NULL
+     )''',
+  '''CREATE TABLE IF NOT EXISTS entities (
+       id         INTEGER PRIMARY KEY,
+       entityType TEXT NOT NULL,
+       tableName  TEXT NOT NULL,
+       name       TEXT NOT NULL,
+       UNIQUE (entityType, tableName, name)
+     )''',
+  '''CREATE TABLE IF NOT EXISTS columns (
+       id         INTEGER PRIMARY KEY,
+       name       TEXT NOT NULL UNIQUE
+     )''',
+  # one row per run, entity, column and interval; summary tables have no interval (time '')
+  '''CREATE TABLE IF NOT EXISTS samples (
+       run        INTEGER NOT NULL REFERENCES runs (id),
+       entity     INTEGER NOT NULL REFERENCES entities (id),
+       stat       INTEGER NOT NULL REFERENCES columns (id),
+       time       TEXT NOT NULL,
+       value      REAL
+     )''',
+  'CREATE INDEX IF NOT EXISTS samplesByEntity ON samples (entity, stat, run, time)',
+  'CREATE INDEX IF NOT EXISTS samplesByRun ON samples (run)',
+  'CREATE INDEX IF NOT EXISTS entitiesByName ON entities (name)',
+]
+
+AGGREGATES = ['avg', 'min', 'max', 'sum', 'count']
+
+# columns which describe the row instead of holding a statistic
+KEY_COLUMNS = [ShenickTables.TIME_COLUMN, 'Entity Name', 'IP Address', 'Description']
+
+# rows are inserted in chunks of this size
+BATCH_SIZE = 5000
+
+def _number(value):
+  """
+  Returns a csv cell as float ('true'/'false' as 1/0), None if it is no number.
+  """
+  try:
+    return float(value)
+  except ValueError:
+    return {'true': 1.0, 'false': 0.0}.get(value.strip().lower())
+
+class Warehouse():
+  """
+  Local SQLite database of statistics of many runs, e.g. for trends over nightly runs.
+
+  Every value is stored once per run, entity (entity type, table, name), column and interval (the Time
+  column of the csv files), non-numeric cells are skipped. Lookups of a column of an entity go through the
+  samplesByEntity index, so they do not depend on the number of runs stored.
+  """
+
+  def __init__(self, path):
+    self.path  = path
+    self._lock = threading.Lock()
+    self._db   = sqlite3.connect(path, check_same_thread=False)
+    self._db.execute('PRAGMA journal_mode=WAL')
+    self._db.execute('PRAGMA synchronous=NORMAL')
+    with self._db:
+      for statement in SCHEMA:
+        self._db.execute(statement)
+    self._entities = {}
+    self._columns  = {}
+
+  def close(self):
+    self._db.close()
+
+  def _entityId(self, entityType, tableName, name):
+    key = (entityType, tableName, name)
+    if key not in self._entities:
+      self._db.execute('INSERT OR IGNORE INTO entities (entityType, tableName, name) VALUES (?, ?, ?)', key)
+      self._entities[key] = self._db.execute('SELECT id FROM entities WHERE entityType = ? AND tableName = ? AND name = ?', key).fetchone()[0]
+    return self._entities[key]
+
+  def _columnId(self, name):
+    if name not in self._columns:
+      self._db.execute('INSERT OR IGNORE INTO columns (name) VALUES (?)', (name,))
+      self._columns[name] = self._db.execute('SELECT id FROM columns WHERE name = ?', (name,)).fetchone()[0]
+    return self._columns[name]
+
+  def _runId(self, runName, testGroup, controller):
+    """
+    Returns the id of run _runName_, creates the run if it does not exist yet.
+    """
+    row = self._db.execute('SELECT id FROM runs WHERE name = ?', (runName,)).fetchone()
+    if row is None:
+      return self._db.execute('INSERT INTO runs (name, testGroup, controller, ingested) VALUES (?, ?, ?, ?)',
+                              (runName, testGroup, controller, time.time())).lastrowid
+    self._db.execute("UPDATE runs SET testGroup = COALESCE(NULLIF(?, ''), testGroup), controller = COALESCE(NULLIF(?, ''), controller), ingested = ? WHERE id = ?",
+                     (testGroup, controller, time.time(), row[0]))
+    return row[0]
+
+  def _clear(self, runId, condition, args):
+    """
+    Deletes the values of a run of the entities matching _condition_, so a file can be ingested again.
+    """
+    self._db.execute('DELETE FROM samples WHERE run = ? AND entity IN (SELECT id FROM entities WHERE %s)' % condition, [runId] + list(args))
+
+  def _insertCsv(self, runId, entityType, tableName, csvFile):
+    """
+    Inserts the numeric cells of a statistics or summary csv file, returns the number of values inserted.
+    """
+    reader = csv.reader(csvFile)
+    try:
+      header = reader.next()
+    except StopIteration:
+      return 0
+
+    timeIndex = header.index(ShenickTables.TIME_COLUMN) if ShenickTables.TIME_COLUMN in header else None
+    nameIndex = header.index('Entity Name') if 'Entity Name' in header else None
+    columns   = [(index, self._columnId(name)) for index, name in enumerate(header) if name not in KEY_COLUMNS]
+
+    count = 0
+    batch = []
+    for row in reader:
+      if not row:
+        continue
+      rowTime  = row[timeIndex] if timeIndex is not None and timeIndex < len(row) else ''
+      entityId = self._entityId(entityType, tableName, row[nameIndex] if nameIndex is not None and nameIndex < len(row) else tableName)
+      for index, columnId in columns:
+        if index >= len(row):
+          break
+        value = _number(row[index])
+        if value is not None:
+          batch.append((runId, entityId, columnId, rowTime, value))
+      if len(batch) >= BATCH_SIZE:
+        self._db.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)', batch)
+        count += len(batch)
+        batch  = []
+
+    if batch:
+      self._db.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)', batch)
+      count += len(batch)
+    return count
+
+  def ingestArchive(self, archive, runName, testGroup='', controller=''):
+    """
+    Loads all tables of a statistics zip file (zipfile.ZipFile, see ShenickTables.openStatsArchive) as run _runName_
+    in one transaction, returns the number of values stored. Meta files are skipped. Statistics ingested before
+    for the same run are replaced.
+    """
+    count = 0
+    with self._lock:
+      with self._db:
+        runId = self._runId(runName, testGroup, controller)
+        self._clear(runId, 'entityType != ?', ['summary'])
+        for entityType, root, member in ShenickTables.statsMembers(archive):
+          if root == 'Meta':
+            continue
+          tableName = root.replace('.Normal', '').replace('.Fine', '').replace(' cu', '')
+          with archive.open(member) as csvFile:
+            count += self._insertCsv(runId, entityType.lower(), tableName, csvFile)
+    return count
+
+  def ingestZip(self, zipPath, runName, testGroup='', controller=''):
+    """
+    Loads a statistics zip file downloaded with statisticsSave/saveStats, see ingestArchive.
+    """
+    with ShenickTables.openStatsArchive(zipPath) as archive:
+      return self.ingestArchive(archive, runName, testGroup, controller)
+
+  def ingestSummary(self, csvPath, runName, testGroup='', controller=''):
+    """
+    Adds a summary csv file (e.g. Summary_Multicast_Client.csv, one row per entity) to run _runName_ as entity
+    type 'summary', the table is named after the file. Returns the number of values stored.
+    """
+    tableName = os.path.splitext(os.path.basename(csvPath))[0]
+    with self._lock:
+      with self._db:
+        runId = self._runId(runName, testGroup, controller)
+        self._clear(runId, 'entityType = ? AND tableName = ?', ['summary', tableName])
+        with open(csvPath, 'rb') as csvFile:
+          return self._insertCsv(runId, 'summary', tableName, csvFile)
+
+  def runs(self, testGroup='', last=0):
+    """
+    Returns the runs (oldest first) as list of dictionaries with the keys name, testGroup, controller and ingested.
+    """
+    query = 'SELECT name, testGroup, controller, ingested FROM runs'
+    args  = []
+    if testGroup:
+      query += ' WHERE testGroup = ?'
+      args.append(testGroup)
+    query += ' ORDER BY id DESC'
+    if int(last) > 0:
+      query += ' LIMIT %d' % int(last)
+    with self._lock:
+      rows = self._db.execute(query, args).fetchall()
+    return [dict(zip(['name', 'testGroup', 'controller', 'ingested'], row)) for row in reversed(rows)]
+
+  def _filter(self, column, entityName, entityType, testGroup, lastRuns):
+    """
+    Returns the FROM/WHERE clause and arguments selecting the values of _column_ of the entities matching
+    the LIKE pattern _entityName_, restricted to the _lastRuns_ latest runs (all if 0).
+    """
+    # the entities are selected first and the values are looked up through the samplesByEntity index,
+    # whatever the planner would guess without statistics
+    entities = 'SELECT id FROM entities WHERE name LIKE ?'
+    args     = [entityName]
+    if entityType:
+      entities += ' AND entityType = ?'
+      args.append(entityType.lower())
+    clause = (' FROM samples INDEXED BY samplesByEntity JOIN entities ON entities.id = samples.entity JOIN runs ON runs.id = samples.run'
+              ' WHERE samples.entity IN (%s) AND samples.stat = (SELECT id FROM columns WHERE name = ?)' % entities)
+    args.append(column)
+    if testGroup:
+      clause += ' AND runs.testGroup = ?'
+      args.append(testGroup)
+    if int(lastRuns) > 0:
+      clause += ' AND samples.run IN (SELECT id FROM runs%s ORDER BY id DESC LIMIT %d)' % (' WHERE testGroup = ?' if testGroup else '', int(lastRuns))
+      if testGroup:
+        args.append(testGroup)
+    return clause, args
+
+  def series(self, column, entityName, entityType='', testGroup='', lastRuns=0):
+    """
+    Returns the values of _column_ as list of (run, entity, time, value), ordered by run and time.
+    _entityName_ is an SQL LIKE pattern ('%' matches anything).
+    """
+    clause, args = self._filter(column, entityName, entityType, testGroup, lastRuns)
+    with self._lock:
+      return self._db.execute('SELECT runs.name, entities.name, samples.time, samples.value' + clause +
+                              ' ORDER BY samples.run, samples.time, entities.name', args).fetchall()
+
+  def trend(self, column, entityName='%', aggregate='avg', entityType='', testGroup='', lastRuns=0):
+    """
+    Returns one aggregate (avg|min|max|sum|count) of _column_ over all matching entities and intervals per run,
+    as list of (run, value) ordered by run.
+    """
+    aggregate = aggregate.lower()
+    if aggregate not in AGGREGATES:
+      raise AssertionError('unknown aggregate "%s", use one of %s' % (aggregate, ', '.join(AGGREGATES)))
+    clause, args = self._filter(column, entityName, entityType, testGroup, lastRuns)
+    with self._lock:
+      return self._db.execute('SELECT runs.name, %s(samples.value)' % aggregate + clause +
+                              ' GROUP BY samples.run ORDER BY samples.run', args).fetchall()
+
+_warehouses = {}
+
+def getWarehouse(path):
+  """
+  Returns the Warehouse of the database file _path_, shared by all libraries of the process.
+  """
+  path = os.path.abspath(path)
+  if path not in _warehouses:
+    _warehouses[path] = Warehouse(path)
+  return _warehouses[path]
@@ -4,11 +4,9 @@ import os
 import re
 import scp
 import csv
-import glob
-import shutil
-import zipfile
 import tempfile
 import paramiko
+import ShenickTables
 
 class Shenick():
   """
@@ -200,109 +198,127 @@ class Shenick():
 
   ### tvm-c cli stuff
 
-  def downloadCvsFile(self, localPath):
+  def downloadCvsFile(self, localPath, entityTypes=None, columns=None, entityNamePattern=''):
     """
     Creates a zip file containing cvs result files on the TVM-C and downloads it to the local pc. This keyword
     ist not required for _getStatisticsFromZipFile_ (it will get its own copy)
     - localPath: string, path where the zip file should be saved. Default file name is "csvStatistics.zip"
       if no file name in localPath is given.
+    - entityTypes: list or comma-separated string (optional), only these entity types, e.g. Aggregate,Host
+    - columns: list or comma-separated string (optional), only these column labels, e.g. QmVideo MOS,Dropped Packets
+    - entityNamePattern: regular expression (optional), only entities whose name is fully matched, e.g. VQA.*
 
     | downloadCvsFile | /home/sff00009 | Comment | creates /home/sff00009/csvStatistics.zip |
     | downloadCvsFile | /home/sff00009/ | Comment | creates /home/sff00009/csvStatistics.zip |
     | downloadCvsFile | /home/sff00009/myCvsFile.zip | Comment | creates /home/sff00009/myCvsFile.zip |
+    | downloadCvsFile | /home/sff00009/myCvsFile.zip | Host | In KiloBits/s,Out KiloBits/s | Comment | only host throughput |
     """
     remotePath = '/tmp/csvStatistics.zip'
+    selection  = ShenickTables.StatsSelection(entityTypes, columns, entityNamePattern)
+    optionList = ''.join([' %s="%s"' % (option[0].upper() + option[1:], value) for option, value in sorted(selection.saveStatsOptions().items())])
 
-    self._execSshCommand('cli -u %s saveStats %s' % (self._tvmcUser, remotePath) )
+    self._execSshCommand('cli -u %s saveStats%s %s' % (self._tvmcUser, optionList, remotePath) )
     self._scpGetFile(remotePath, localPath)
     self._execSshCommand('rm %s' % remotePath)
 
-  def getStatisticsFromZipFile(self, returnType='cumulative'):
+  def getStatisticsFromZipFile(self, returnType='cumulative', entityTypes=None, columns=None, entityNamePattern='', inServiceOnly='true'):
     """
-    TODO: As default, only the cumulative values are returned because otherwise it's A LOT of data,
-          especially if it's a long running test. Fine statistics don't seem to be included...
+    Returns the statistics of all intervals as {entity type: {table: ...}}. As default, only the cumulative values
+    are returned because otherwise it's A LOT of data, especially if it's a long running test. Fine statistics
+    don't seem to be included...
 
-          What to do if entity is "Out of service"? Right now it will always be used in calculations.
-          Might be a problem for "rate" stats?
+    - returnType:
+      - cumulative: {column: value}, sum over all intervals of per-interval columns, mean of rate (/s) columns
+      - aggregate: {column: {statistic: value}} with the statistics count, sum, mean, min, max, std, p50, p95 and p99
+      - entity: {entity name: {column: {statistic: value}}}, the aggregate statistics per entity
+      - all: list of rows (dictionaries column: string)
+    - entityTypes, columns, entityNamePattern: only these statistics are exported and parsed, see downloadCvsFile.
+      Default entity types: Aggregate, Host, Interface, TestGroup
+    - inServiceOnly: intervals where the entity was out of service (In Service column) are not part of the
+      cumulative and aggregate values, default: true
+
+    | ${cu}  | getStatisticsFromZipFile |
+    | ${mos} | getStatisticsFromZipFile | entity | Application | QmVideo MOS | VQA.* | Comment | ${mos['application']['IGMP Client']['VQA-1']['QmVideo MOS']['p95']} |
     """
     stats   = {}
-    tempDir = tempfile.mkdtemp()
+    if not entityTypes:
+      entityTypes = ['Aggregate', 'Host', 'Interface', 'TestGroup'] # maybe add 'Meta', not sure if useful
+    selection = ShenickTables.StatsSelection(entityTypes, columns, entityNamePattern)
+    inServiceOnly = str(inServiceOnly).lower() == 'true'
+    fd, zipPath = tempfile.mkstemp(prefix='shenick_', suffix='.zip')
+    os.close(fd)
+
+    for entityType in selection.entityTypes:
+      stats[entityType.lower()] = {}
 
     try:
       # save stats on tvm-c and copy them to local machine
-      self.downloadCvsFile(tempDir)
-      # extract zip file
-      zip = zipfile.ZipFile(os.path.join(tempDir, 'csvStatistics.zip'))
-      zip.extractall(tempDir)
-
-      for entityType in ['Aggregate', 'Host', 'Interface', 'TestGroup']: # maybe add 'Meta', not sure if useful
-
-        stats[entityType.lower()] = {}
-
-        # process all csv files
-        for statsFile in glob.glob(os.path.join(tempDir, entityType, '') + '*.csv'): # empty element in join for leading '/'
-          # get file/path elements
-          head, tail = os.path.split(statsFile) # path + filename (w/ extension)
-          root, ext  = os.path.splitext(tail)   # filename (w/o ext) + extension
-          # skip meta files
-          if root == 'Meta':
+      self.downloadCvsFile(zipPath, selection.entityTypes, selection.columns, selection.entityNamePattern)
+      # read the csv files straight from the zip file, nothing is extracted
+      with ShenickTables.openStatsArchive(zipPath) as archive:
+        for entityType, root, member in ShenickTables.statsMembers(archive):
+          # skip other folders and meta files without decompressing them
+          if not selection.wantsFolder(entityType) or root == 'Meta':
             continue
           # for lowercase keys in return dict
           entityType = entityType.lower()
           # there are only normal statistics...?
           root = root.replace('.Normal', '')
 
-          stats[entityType][root] = []
-
-          csvReader = csv.DictReader(open(statsFile))
-
-          # this will append all rows from the csv to our dict
-          for row in csvReader:
-            stats[entityType][root].append(row)
-
-          # sum up all rows so that we get a result over all intervals
-          cuRow = {}
-          for columnName in csvReader.fieldnames:
-            totalVal = 0
-
-            # we don't care for these ones
-            if   columnName in ['Time', 'In Service']:
-              cuRow[columnName] = 'n/a'
-
-            # rates, need to convert to float if possible
-            elif columnName.endswith('/s'):
-              for row in stats[entityType][root]:
-                val = row[columnName]
-                if not re.match('^\d+\.*\d*$', val):
-                  continue
-                else:
-                  totalVal += float(val)
-              cuRow[columnName] = totalVal/len(stats[entityType][root])
-
-            # per-interval value, can be int or float
-            else:
-              for row in stats[entityType][root]:
-                val = row[columnName]
-                if not re.match('^\d+\.*\d*$', val):
-                  continue
-                else:
-                  if re.match('^\d+$', val):
-                    totalVal += int(val)
-                  else:
-                    totalVal += float(val)
-              cuRow[columnName] = totalVal
-
-          # in most cases we only want the cumulative values
-          if 'cu' in returnType:
-            stats[entityType][root] = cuRow
+          csvFile = archive.open(member)
+
+          if returnType == 'all':
+            stats[entityType][root] = []
+            csvReader  = csv.DictReader(csvFile)
+            fieldnames = [columnName for columnName in csvReader.fieldnames or [] if selection.wantsColumn(columnName)]
+
+            # this will append all rows from the csv to our dict
+            for row in csvReader:
+              if 'Entity Name' in row and not selection.wantsEntity(row['Entity Name']):
+                continue
+              stats[entityType][root].append(dict((columnName, row[columnName]) for columnName in fieldnames))
+            continue
+
+          # aggregate all intervals column by column
+          table = ShenickTables.readColumnar(csvFile, selection=selection)
+
+          if returnType == 'entity':
+            stats[entityType][root] = ShenickTables.aggregate(table, byEntity=True, inServiceOnly=inServiceOnly)
+          elif returnType == 'aggregate':
+            stats[entityType][root] = ShenickTables.aggregate(table, inServiceOnly=inServiceOnly)
+          elif 'cu' in returnType:
+            stats[entityType][root] = self._cumulativeRow(table, inServiceOnly)
+          else:
+            raise AssertionError('unknown returnType "%s", use cumulative, aggregate, entity or all' % returnType)
 
     except Exception as e:
       raise AssertionError('error proceesing csv: %s' % e.message)
     finally:
-      shutil.rmtree(tempDir)
+      os.remove(zipPath)
 
     return stats
 
+  def _cumulativeRow(self, table, inServiceOnly=True):
+    """
+    Sums up all intervals: sum of per-interval columns, mean of rate (/s) columns, 'n/a' for Time and In Service
+    and 0 for other text columns.
+    """
+    aggregates = ShenickTables.aggregate(table, inServiceOnly=inServiceOnly)
+    cuRow = {}
+    for columnName in table.columnNames():
+      # we don't care for these ones
+      if   columnName in ['Time', 'In Service']:
+        cuRow[columnName] = 'n/a'
+      elif columnName not in aggregates:
+        cuRow[columnName] = 0
+      # rates, mean over the intervals
+      elif columnName.endswith('/s'):
+        cuRow[columnName] = aggregates[columnName]['mean'] or 0
+      # per-interval value, can be int or float
+      else:
+        cuRow[columnName] = aggregates[columnName]['sum']
+    return cuRow
+
   def startTestGroup(self):
     """
     Starts the test group on the controller.
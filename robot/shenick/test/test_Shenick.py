@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import re
+import sys
+import time
+import unittest
+from distutils.spawn import find_executable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Shenick
+import ShenickTables
+import ShenickFakeServer
+
+class ExecuteBatchTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.server  = ShenickFakeServer.FakeTvmc(apps=4, sampleInterval=3600).start()
+    cls.shenick = Shenick.Shenick('127.0.0.1:%d' % cls.server.port)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.stop()
+
+  def testOutputIsSplitPerCommand(self):
+    commands = ['cli -u cli listTestGroups', 'cli -u cli getStat VQA-1 "QmVideo MOS"', 'cli -u cli nope', 'echo done; echo twice', 'true']
+    results  = self.shenick.executeBatch(commands, failOnError='false')
+    self.assertEqual([result['command'] for result in results], commands)
+    self.assertEqual(results[0]['output'], '//GPON/\n//GPON/GPON_Triple_Play_LoadTest')
+    self.assertEqual(float(results[1]['output']), float(self.shenick.statisticsGet('normal', 'application', 'VQA-1', 'QmVideo MOS', 'int')))
+    # a failing command does not stop the following ones
+    self.assertEqual(results[2]['error'], 'cli>ERROR: unknown command: nope')
+    self.assertEqual(results[3]['output'], 'done\ntwice')
+    self.assertEqual(results[4]['output'], '')
+    self.assertEqual([result['error'] is None for result in results], [True, True, False, True, True])
+
+  def testFailOnError(self):
+    self.assertRaises(AssertionError, self.shenick.executeBatch, ['echo one', 'cli -u cli nope'])
+    self.assertEqual(self.shenick.executeBatch(['echo one'])[0]['output'], 'one')
+
+class TestGroupUploadTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server  = ShenickFakeServer.FakeTvmc(apps=3).start()
+    self.shenick = Shenick.Shenick('127.0.0.1:%d' % self.server.port)
+    self.server.testGroups['GPON/GPON_Triple_Play_LoadTest']['running'] = True
+    self.shenick.testGroupCreate('GPON/GPON_Triple_Play_LoadTest')
+
+  def tearDown(self):
+    self.server.stop()
+
+  def testUpload(self):
+    self.shenick.testGroupUpload()
+    # the running test group was stopped, deleted and imported again
+    self.assertEqual(self.server.testGroups.keys(), ['GPON/GPON_Triple_Play_LoadTest'])
+    self.assertFalse(self.server.testGroups['GPON/GPON_Triple_Play_LoadTest']['running'])
+
+  def testFailingPerlLeavesTheControllerUntouched(self):
+    self.server.errorCommands = [re.compile('^perl /tmp/robot.pl$')]
+    self.server.files['/tmp/robot.xml'] = '<previous/>'
+    self.assertRaises(AssertionError, self.shenick.testGroupUpload)
+    self.assertTrue(self.server.testGroups['GPON/GPON_Triple_Play_LoadTest']['running'])
+    self.assertEqual(self.server.files['/tmp/robot.xml'], '<previous/>')
+
+  def testFailingImport(self):
+    self.server.errorCommands = [re.compile('^importTestGroup')]
+    self.assertRaises(AssertionError, self.shenick.testGroupUpload)
+
+class StatisticsTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # intervals of an hour, the latest sample does not change during the tests
+    cls.server  = ShenickFakeServer.FakeTvmc(apps=30, intervals=40, sampleInterval=3600).start()
+    cls.server.testGroups.values()[0]['apps'][0]['service'] = 'Out of Service'
+    cls.shenick = Shenick.Shenick('127.0.0.1:%d' % cls.server.port)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.stop()
+
+  @unittest.skipUnless(find_executable('perl'), 'perl is not installed')
+  def testAggregateMatchesLocalAggregation(self):
+    summary  = self.shenick.statisticsGetAll(aggregate='true')
+    tables   = self.shenick.statisticsGetAll(columnar='true')
+    compared = 0
+    for entityType in tables:
+      for name, table in tables[entityType].items():
+        local = ShenickTables.aggregate(table, byEntity=True)
+        for entity in local:
+          for column in local[entity]:
+            for statistic, expected in local[entity][column].items():
+              value = summary[entityType][name][entity][column][statistic]
+              if expected is None:
+                self.assertIsNone(value)
+                continue
+              self.assertEqual(type(value), type(expected), (entity, column, statistic))
+              self.assertAlmostEqual(value, expected, delta=1e-9 * max(1, abs(expected)))
+              compared += 1
+    self.assertTrue(compared > 1000)
+    # VQA-1 is out of service in every interval
+    self.assertEqual(summary['application']['IGMP Client']['VQA-1']['QmVideo MOS']['count'], 0)
+
+  def testGetManyMethodsAgree(self):
+    names      = ['VQA-1', 'STB_Client-2', 'VQA-4']
+    columns    = ['QmVideo MOS', 'Dropped Packets']
+    viaGetStat = self.shenick.statisticsGetMany('application', names, columns, method='getStat')
+    viaSave    = self.shenick.statisticsGetMany('application', names, columns, method='saveStats')
+    self.assertEqual(viaSave, viaGetStat)
+    self.assertEqual(viaGetStat['VQA-4']['QmVideo MOS'], float(self.shenick.statisticsGet('normal', 'application', 'VQA-4', 'QmVideo MOS', 'int')))
+    self.assertTrue(isinstance(viaSave['VQA-1']['Dropped Packets'], (int, long)))
+    # an HTTP client has no QmVideo MOS
+    self.assertIsNone(self.shenick.statisticsGetMany('application', ['Client_HTTP-3'], columns, method='saveStats')['Client_HTTP-3']['QmVideo MOS'])
+    self.assertRaises(AssertionError, self.shenick.statisticsGetMany, 'application', names, columns, method='getAll')
+
+  def testGetManyUnknownEntity(self):
+    self.assertRaises(AssertionError, self.shenick.statisticsGetMany, 'application', ['VQA-1', 'VQA-999'], 'QmVideo MOS', method='saveStats')
+    self.assertRaises(AssertionError, self.shenick.statisticsGetMany, 'host', ['VQA-1'], 'QmVideo MOS', method='saveStats')
+
+  def testColumnSelectionKeepsKeyColumns(self):
+    full     = self.shenick.statisticsGetAll(columnar='true', entityTypes='Application')['application']['IGMP Client']
+    selected = self.shenick.statisticsGetAll(columnar='true', entityTypes='Application', columns='QmVideo MOS')['application']['IGMP Client']
+    self.assertEqual(sorted(selected.columnNames()), sorted(ShenickTables.KEY_COLUMNS + ['QmVideo MOS']))
+    self.assertEqual(selected.rowCount(), full.rowCount())
+
+    # the selection is filtered by In Service and grouped by Entity Name like the full table
+    local = ShenickTables.aggregate(selected, byEntity=True)
+    self.assertEqual(local, ShenickTables.aggregate(full, columns=['QmVideo MOS'], byEntity=True))
+    self.assertEqual(local['VQA-1']['QmVideo MOS']['count'], 0)
+    self.assertEqual(local['VQA-4']['QmVideo MOS']['count'], 40)
+
+class StatisticsPollTest(unittest.TestCase):
+
+  def testPollReturnsNewIntervalsOnly(self):
+    server = ShenickFakeServer.FakeTvmc(apps=6, intervals=5, sampleInterval=1).start()
+    try:
+      shenick = Shenick.Shenick('127.0.0.1:%d' % server.port)
+      first   = shenick.statisticsPoll({'entityType': 'application'})['application']['IGMP Client']['Time']
+      time.sleep(1.2)
+      second  = shenick.statisticsPoll({'entityType': 'application'})['application']['IGMP Client']['Time']
+      shenick.statisticsPollReset()
+      again   = shenick.statisticsPoll({'entityType': 'application'})['application']['IGMP Client']['Time']
+    finally:
+      server.stop()
+
+    # 4 IGMP clients per interval
+    self.assertTrue(len(first) >= 20)
+    self.assertTrue(len(second) >= 4)
+    self.assertTrue(min(map(ShenickTables.timeKey, second)) > max(map(ShenickTables.timeKey, first)))
+    # after the reset every interval is returned again
+    self.assertTrue(set(first + second) <= set(again))
+
+if __name__ == '__main__':
+  unittest.main()
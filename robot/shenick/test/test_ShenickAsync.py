@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import time
+import socket
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ShenickAsync
+import ShenickFakeServer
+
+TEST_GROUP = '//GPON/GPON_Triple_Play_LoadTest'
+
+def freePort():
+  sock = socket.socket()
+  sock.bind(('127.0.0.1', 0))
+  port = sock.getsockname()[1]
+  sock.close()
+  return port
+
+class GatherTest(unittest.TestCase):
+
+  def testResultsInOrder(self):
+    futures  = [ShenickAsync.Future() for index in range(3)]
+    combined = ShenickAsync.gather(futures)
+    for index in [2, 0, 1]:
+      self.assertFalse(combined.done())
+      futures[index].setResult(index * 10)
+    self.assertEqual(combined.result(), [0, 10, 20])
+    self.assertEqual(ShenickAsync.gather([]).result(), [])
+
+  def testFirstException(self):
+    futures  = [ShenickAsync.Future() for index in range(3)]
+    combined = ShenickAsync.gather(futures)
+    futures[2].setException(AssertionError('third'))
+    futures[1].setException(AssertionError('second'))
+    self.assertFalse(combined.done())
+    futures[0].setResult(0)
+    self.assertRaises(AssertionError, combined.result)
+    self.assertEqual(str(combined.exception()), 'second')
+
+class EventLoopTest(unittest.TestCase):
+
+  def setUp(self):
+    self.servers = [ShenickFakeServer.FakeTvmc(apps=6).start() for index in range(2)]
+    self.loop    = ShenickAsync.EventLoop()
+    self.clients = [ShenickAsync.AsyncShenickClient(self.loop, '127.0.0.1:%d' % server.port, TEST_GROUP, channels=2, commandTimeout=1)
+                    for server in self.servers]
+
+  def tearDown(self):
+    for client in self.clients:
+      client.close()
+    for server in self.servers:
+      server.stop()
+
+  def connect(self):
+    self.loop.runUntilComplete(ShenickAsync.gather([client.connect() for client in self.clients]), timeout=30)
+
+  def testCommandsRunConcurrently(self):
+    self.connect()
+    for server in self.servers:
+      server.latency = 0.2
+
+    names   = ['VQA-1', 'STB_Client-2', 'VQA-4', 'STB_Client-5']
+    start   = time.time()
+    futures = [client.getShenickCliStatistic(name, 'Dropped Packets') for client in self.clients for name in names]
+    values  = self.loop.runUntilComplete(ShenickAsync.gather(futures), timeout=10)
+    # 8 commands of 0.2 s on 2 controllers with 2 channels each
+    self.assertTrue(time.time() - start < 1.2)
+
+    expected = [server.execute('cli getStat %s "Dropped Packets"' % name, {})[:-2] for server in self.servers for name in names]
+    self.assertEqual(values, expected)
+
+  def testCommandTimeout(self):
+    self.connect()
+    self.servers[0].latency = 1.5
+    future = self.clients[0].execSshCommand('cli listTestGroups')
+    self.assertRaises(AssertionError, self.loop.runUntilComplete, future, 10)
+    self.assertTrue('timeout waiting for prompt' in str(future.exception()))
+
+  def testRunUntilCompleteTimeout(self):
+    self.connect()
+    self.servers[0].latency = 0.5
+    future = self.clients[0].execSshCommand('cli listTestGroups')
+    self.assertRaises(AssertionError, self.loop.runUntilComplete, future, 0.1)
+    self.assertFalse(future.done())
+    # the command is still running and completes later
+    self.assertEqual(self.loop.runUntilComplete(future, 10), '//GPON/\n' + TEST_GROUP)
+
+  def testConnectionErrors(self):
+    client = ShenickAsync.AsyncShenickClient(self.loop, '127.0.0.1:%d' % freePort(), TEST_GROUP)
+    try:
+      futures = [client.execSshCommand('cli listTestGroups') for index in range(2)]
+      self.assertRaises(AssertionError, self.loop.runUntilComplete, ShenickAsync.gather(futures), 30)
+      self.assertTrue(all(str(future.exception()) == 'could not open ssh connection.' for future in futures))
+    finally:
+      client.close()
+
+  def testReconnectAfterDrop(self):
+    self.connect()
+    self.servers[0].dropAfter = 0
+    self.assertRaises(AssertionError, self.loop.runUntilComplete, self.clients[0].execSshCommand('cli listTestGroups'), 10)
+
+    self.servers[0].dropAfter = None
+    self.assertEqual(self.loop.runUntilComplete(self.clients[0].execSshCommand('cli listTestGroups'), 30), '//GPON/\n' + TEST_GROUP)
+    self.assertEqual(self.servers[0].connections, 2)
+
+class ShenickCliConcurrentTest(unittest.TestCase):
+
+  def testStartAndStop(self):
+    server = ShenickFakeServer.FakeTvmc(apps=3).start()
+    try:
+      cli = ShenickAsync.ShenickCliConcurrent('127.0.0.1:%d' % server.port, TEST_GROUP)
+      cli.startTestGroup()
+      self.assertTrue(server.testGroups[TEST_GROUP.lstrip('/')]['running'])
+      self.assertEqual(cli.stopTestGroup(), 'pass')
+      self.assertFalse(server.testGroups[TEST_GROUP.lstrip('/')]['running'])
+      # nothing running
+      self.assertEqual(cli.stopTestGroup(), 'pass')
+      self.assertEqual(cli.execSshCommands(['echo one', 'echo two']), ['one', 'two'])
+    finally:
+      server.stop()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Shenick
+import ShenickCache
+import ShenickFakeServer
+
+class Clock():
+  """
+  Replaces the time module of ShenickCache.
+  """
+
+  def __init__(self, now):
+    self.now = now
+
+  def time(self):
+    return self.now
+
+class CacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.clock = Clock(1000.0)
+    ShenickCache.time, self.time = self.clock, ShenickCache.time
+    self.cache = ShenickCache.StatisticsCache(normalInterval=30)
+    self.key   = ('10.0.3.33', 'robot', 'normal', 'application', 'VQA-1', 'QmVideo MOS')
+
+  def tearDown(self):
+    ShenickCache.time = self.time
+
+  def testNothingCachedBeforeStart(self):
+    self.cache.put(self.key, '4.2')
+    self.assertIsNone(self.cache.get(self.key))
+
+  def testExpiryFollowsTestGroupStart(self):
+    # started 20 s into an interval of the wall clock, the controller samples at 1007, 1037, 1067, ...
+    self.cache.started('10.0.3.33', 1007.0)
+    self.clock.now = 1036.0
+    self.cache.put(self.key, '4.2')
+    self.clock.now = 1036.9
+    self.assertEqual(self.cache.get(self.key), '4.2')
+    self.clock.now = 1037.0
+    self.assertIsNone(self.cache.get(self.key))
+
+    self.cache.put(self.key, '4.3')
+    self.clock.now = 1066.0
+    self.assertEqual(self.cache.get(self.key), '4.3')
+    self.assertEqual(self.cache.counters()['hits'], 2)
+
+  def testStopped(self):
+    self.cache.started('10.0.3.33', 1000.0)
+    self.cache.put(self.key, '4.2')
+    self.cache.stopped('10.0.3.33')
+    self.assertIsNone(self.cache.get(self.key))
+    self.cache.put(self.key, '4.2')
+    self.assertIsNone(self.cache.get(self.key))
+
+  def testIntervalZeroDisablesCaching(self):
+    self.cache.started('10.0.3.33', 1000.0)
+    self.cache.setInterval('10.0.3.33', 0)
+    self.cache.put(self.key, '4.2')
+    self.assertIsNone(self.cache.get(self.key))
+
+  def testIntervalSeconds(self):
+    self.assertEqual(ShenickCache.intervalSeconds('1min'), 60)
+    self.assertEqual(ShenickCache.intervalSeconds('Five Minutes'), 300)
+    self.assertRaises(AssertionError, ShenickCache.intervalSeconds, 'hourly')
+
+class StatisticsGetTest(unittest.TestCase):
+
+  def testHits(self):
+    server = ShenickFakeServer.FakeTvmc(sampleInterval=3600).start()
+    try:
+      shenick = Shenick.Shenick('127.0.0.1:%d' % server.port)
+      shenick.testGroupStart('GPON/GPON_Triple_Play_LoadTest')
+      shenick.statisticsCacheIntervalSet(3600)
+      shenick.statisticsCacheClear()
+      ShenickCache.getCache().resetCounters()
+
+      first = shenick.statisticsGet('normal', 'application', 'VQA-1', 'Dropped Packets', 'cu')
+      self.assertEqual(shenick.statisticsGet('normal', 'application', 'VQA-1', 'Dropped Packets', 'cu'), first)
+      counters = shenick.statisticsCacheCountersGet()
+      self.assertEqual((counters['hits'], counters['misses']), (1, 1))
+
+      # a stopped test group is not cached
+      shenick.testGroupStop('GPON/GPON_Triple_Play_LoadTest')
+      shenick.statisticsGet('normal', 'application', 'VQA-1', 'Dropped Packets', 'cu')
+      shenick.statisticsGet('normal', 'application', 'VQA-1', 'Dropped Packets', 'cu')
+      self.assertEqual(shenick.statisticsCacheCountersGet()['misses'], 3)
+    finally:
+      server.stop()
+
+if __name__ == '__main__':
+  unittest.main()
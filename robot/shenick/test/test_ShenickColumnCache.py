@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Shenick
+import ShenickTransfer
+import ShenickColumnCache
+import ShenickFakeServer
+
+class ColumnCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.cache     = ShenickColumnCache.ColumnCache(os.path.join(self.directory, 'cache'))
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def summary(self, name, text):
+    path = os.path.join(self.directory, name)
+    with open(path, 'wb') as csvFile:
+      csvFile.write(text)
+    return path
+
+  def testCsvTable(self):
+    path  = self.summary('Summary.csv', 'Entity Name,Mean QmVideo MOS\nVQA-1,4.1\nVQA-4,3.9\n')
+    first = self.cache.csvTable(path)
+    again = self.cache.csvTable(path)
+    self.assertEqual(list(again['Mean QmVideo MOS']), [4.1, 3.9])
+    self.assertEqual(again.decode('Entity Name'), first.decode('Entity Name'))
+    self.assertTrue(isinstance(again['Mean QmVideo MOS'], numpy.memmap))
+    counters = self.cache.counters()
+    self.assertEqual((counters['hits'], counters['misses'], counters['entries']), (1, 1, 1))
+    # entries are keyed by the content of the file
+    self.assertEqual(self.cache.entries()[0][2], ShenickTransfer.fileDigest(path, 'sha1'))
+
+  def testEviction(self):
+    self.cache.csvTable(self.summary('a.csv', 'A\n1\n'))
+    self.cache.maxBytes = 1
+    self.cache.csvTable(self.summary('b.csv', 'B\n2\n'))
+    self.assertEqual([key for lastUse, size, key in self.cache.entries()], [ShenickTransfer.fileDigest(os.path.join(self.directory, 'b.csv'), 'sha1')])
+
+  def testStatisticsLoad(self):
+    server = ShenickFakeServer.FakeTvmc(apps=12, intervals=5).start()
+    try:
+      shenick = Shenick.Shenick('127.0.0.1:%d' % server.port)
+      zipPath = os.path.join(self.directory, 'csvStatistics.zip')
+      shenick.statisticsSave(zipPath)
+      parsed = shenick.statisticsLoad(zipPath, os.path.join(self.directory, 'load'))
+      cached = shenick.statisticsLoad(zipPath, os.path.join(self.directory, 'load'))
+    finally:
+      server.stop()
+    table = cached['application']['IGMP Client']
+    self.assertEqual(table.rowCount(), parsed['application']['IGMP Client'].rowCount())
+    self.assertTrue(numpy.array_equal(table['Dropped Packets'], parsed['application']['IGMP Client']['Dropped Packets']))
+    self.assertEqual(ShenickColumnCache.getColumnCache(os.path.join(self.directory, 'load')).counters()['hits'], 1)
+
+if __name__ == '__main__':
+  unittest.main()
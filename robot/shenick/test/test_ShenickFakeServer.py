@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import io
+import os
+import sys
+import csv
+import time
+import zipfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+import ShenickCli
+import ShenickFakeServer
+
+TEST_GROUP = 'GPON/GPON_Triple_Play_LoadTest'
+
+def execute(server, line):
+  return server.execute(line, {'echo': False, 'commands': 0}).splitlines()
+
+def saveStats(server, options=''):
+  """
+  Runs saveStats on the fake, returns {csv file: list of rows (dictionaries)}.
+  """
+  execute(server, 'cli -u cli saveStats %s /tmp/stats.zip' % options)
+  tables = {}
+  with zipfile.ZipFile(io.BytesIO(server.files['/tmp/stats.zip'])) as archive:
+    for name in archive.namelist():
+      if not name.endswith('Meta.csv'):
+        tables[name] = list(csv.DictReader(io.BytesIO(archive.read(name))))
+  return tables
+
+class StatisticsTest(unittest.TestCase):
+
+  def testValuesAreTheSameOnEveryRun(self):
+    first, second = [ShenickFakeServer.FakeTvmc(apps=6, intervals=5, sampleInterval=60) for run in range(2)]
+    second.startTime -= 7
+    self.assertEqual(execute(first, 'cli -u cli getStat VQA-1 "QmVideo MOS"'), execute(second, 'cli -u cli getStat VQA-1 "QmVideo MOS"'))
+
+    tables = saveStats(first), saveStats(second)
+    self.assertEqual(sorted(tables[0]), ['Application/HTTP Client.Normal.csv', 'Application/IGMP Client.Normal.csv', 'Host/Host.Normal.csv'])
+    for name in tables[0]:
+      self.assertEqual([dict(row, Time=None) for row in tables[0][name]], [dict(row, Time=None) for row in tables[1][name]])
+
+  def testLatestIntervalMatchesGetStat(self):
+    server = ShenickFakeServer.FakeTvmc(apps=6, intervals=5, sampleInterval=3600)
+    rows   = saveStats(server, 'EntityType=Application Samples=1')['Application/IGMP Client.Normal.csv']
+    self.assertEqual([row['Entity Name'] for row in rows], ['VQA-1', 'STB_Client-2', 'VQA-4', 'STB_Client-5'])
+    self.assertEqual(execute(server, 'cli -u cli getStat VQA-4 "Dropped Packets"'), [rows[2]['Dropped Packets']])
+
+  def testSaveStatsOptions(self):
+    server = ShenickFakeServer.FakeTvmc(apps=9, intervals=5, sampleInterval=60)
+    tables = saveStats(server, 'EntityType=Application EntityName="VQA-4|STB_Client-2" Samples=2')
+    self.assertEqual(sorted(tables), ['Application/IGMP Client.Normal.csv'])
+    self.assertEqual([row['Entity Name'] for row in tables['Application/IGMP Client.Normal.csv']], ['STB_Client-2'] * 2 + ['VQA-4'] * 2)
+
+    times = [row['Time'] for row in saveStats(server, 'EntityType=Host')['Host/Host.Normal.csv'] if row['Entity Name'] == 'Host_VQA-1']
+    self.assertEqual(len(times), 5)
+    after = int(time.mktime(time.strptime(times[2], '%Y-%m-%d %H:%M:%S'))) * 1000
+    rows  = saveStats(server, 'EntityType=Host After=%d' % after)['Host/Host.Normal.csv']
+    self.assertEqual(sorted(set(row['Time'] for row in rows)), times[3:])
+
+  def testOnlyListedColumnsAreSaved(self):
+    server = ShenickFakeServer.FakeTvmc(apps=3, intervals=2, sampleInterval=60)
+    rows   = saveStats(server, 'EntityType=Application Columns="QmVideo MOS"')['Application/IGMP Client.Normal.csv']
+    self.assertEqual(rows[0].keys(), ['QmVideo MOS'])
+    rows   = saveStats(server, 'EntityType=Application Columns="Entity Name,QmVideo MOS"')['Application/IGMP Client.Normal.csv']
+    self.assertEqual(sorted(rows[0]), ['Entity Name', 'QmVideo MOS'])
+
+class CommandTest(unittest.TestCase):
+
+  def setUp(self):
+    self.server = ShenickFakeServer.FakeTvmc(apps=3, errorCommands=['getStat STB'])
+
+  def testTestGroups(self):
+    self.assertEqual(execute(self.server, 'cli -u cli listTestGroups'), ['//GPON/', '//' + TEST_GROUP])
+    self.assertEqual(execute(self.server, 'cli -u cli startTestGroup //%s; cli -u cli listTestGroups' % TEST_GROUP)[-1],
+                     '//%s <<<Running>>>' % TEST_GROUP)
+    self.assertEqual(execute(self.server, 'cli -u cli deleteTestGroup //%s' % TEST_GROUP), ['cli>ERROR: Test group is running'])
+    execute(self.server, 'cli -u cli stopTestGroup //%s; cli -u cli deleteTestGroup //%s' % (TEST_GROUP, TEST_GROUP))
+    self.assertEqual(self.server.testGroups, {})
+
+    self.server.files['/tmp/robot.pl'] = 'my $Tg = TestGroup->new(name=>"IPTV");\n'
+    execute(self.server, 'perl /tmp/robot.pl > /tmp/robot.xml; cli -u cli importTestGroup "//" /tmp/robot.xml')
+    self.assertEqual(sorted(self.server.testGroups), ['IPTV'])
+    self.assertEqual(execute(self.server, 'cli -u cli listApplications //IPTV'),
+                     ['  IP/VQA-1 In Service Enabled', '  IP/STB_Client-2 In Service Enabled', '  IP/Client_HTTP-3 In Service Enabled'])
+
+  def testErrors(self):
+    self.assertEqual(execute(self.server, 'cli -u cli getStat STB_Client-2 "QmVideo MOS"'), ['cli>ERROR: injected error'])
+    self.assertEqual(execute(self.server, 'cli -u cli nope'), ['cli>ERROR: unknown command: nope'])
+    self.assertEqual(execute(self.server, 'ls'), ['sh: ls: command not found'])
+
+class SshTest(unittest.TestCase):
+
+  def testShell(self):
+    server = ShenickFakeServer.FakeTvmc(apps=6, latency=0.01).start()
+    try:
+      cli = ShenickCli.ShenickCli('127.0.0.1:%d' % server.port, '//' + TEST_GROUP)
+      self.assertEqual(cli.getListApplications(), ['VQA-1', 'STB_Client-2', 'Client_HTTP-3', 'VQA-4', 'STB_Client-5', 'Client_HTTP-6'])
+      self.assertTrue(server.connections >= 1)
+    finally:
+      server.stop()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ShenickTables
+import ShenickRules
+
+SUMMARY = '''Entity Name,IP Address,Joins Completed,Joins Initiated,Mean QmVideo MOS
+Zap-1,10.0.0.1,99,100,
+Zap-2,10.0.0.2,5,0,
+Zap-3,10.0.0.3,0,0,
+VQA-1,10.0.0.4,,,4.2
+VQA-2,0.0.0.0,,,1.0
+'''
+
+def evaluate(rules, skip=''):
+  return ShenickRules.RuleSet(rules, skip).evaluate(ShenickTables.readColumnar(StringIO(SUMMARY)))
+
+class RuleTest(unittest.TestCase):
+
+  def testDivisionByZeroNeverPasses(self):
+    verdicts = evaluate(['Joins Completed / Joins Initiated >= 0.95 where Entity Name ~ Zap'])
+    self.assertEqual(list(verdicts.verdicts()), ['PASS', 'FAIL', 'FAIL', 'NONE', 'NONE'])
+    # 5 / 0 and 0 / 0 are NaN, not inf
+    self.assertTrue(all(value != value for value in verdicts.values[0, 1:3]))
+    self.assertEqual([failure['entity'] for failure in verdicts.failures()], ['Zap-2', 'Zap-3'])
+
+  def testDivisionByZeroInConditions(self):
+    verdicts = evaluate(['Joins Completed >= 0 where Joins Completed / Joins Initiated > 0'])
+    self.assertEqual(list(verdicts.applies[0]), [True, False, False, False, False])
+
+  def testEmptyCellsNeverPass(self):
+    verdicts = evaluate(['Mean QmVideo MOS != 3', 'Mean QmVideo MOS >= 4'])
+    self.assertEqual(list(verdicts.passed[0]), [False, False, False, True, True])
+    self.assertEqual(list(verdicts.verdicts()), ['FAIL', 'FAIL', 'FAIL', 'PASS', 'FAIL'])
+
+  def testSkip(self):
+    verdicts = evaluate(['Mean QmVideo MOS >= 4 where Entity Name ~ VQA'], r'IP Address ~ ^0\.0\.0\.0(/|$)')
+    self.assertEqual(list(verdicts.verdicts()), ['NONE', 'NONE', 'NONE', 'PASS', 'SKIP'])
+    self.assertTrue(verdicts.allPassed())
+
+  def testInvalidRule(self):
+    self.assertRaises(AssertionError, ShenickRules.Rule, 'Mean QmVideo MOS>=4')
+
+if __name__ == '__main__':
+  unittest.main()
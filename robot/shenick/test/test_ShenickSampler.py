@@ -0,0 +1,74 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+import ShenickCli
+import ShenickSampler
+import ShenickFakeServer
+
+TEST_GROUP = '//GPON/GPON_Triple_Play_LoadTest'
+
+def waitFor(condition, timeout=5):
+  deadline = time.time() + timeout
+  while not condition() and time.time() < deadline:
+    time.sleep(0.05)
+  return condition()
+
+class SamplerTest(unittest.TestCase):
+
+  def testStoppedOnErrors(self):
+    def fetch(appNames, stats):
+      raise AssertionError('connection lost')
+    sampler = ShenickSampler.StatsSampler(fetch, ['VQA-1'], ['QmVideo MOS'], interval=0.01, maxErrors=3).start()
+    self.assertTrue(waitFor(lambda: not sampler.isRunning()))
+    status = sampler.status()
+    self.assertTrue(status['stoppedOnErrors'])
+    self.assertEqual(status['errors'], 3)
+    self.assertEqual(status['lastError'], 'connection lost')
+
+  def testMissingValuesAreNoBreach(self):
+    values  = {'VQA-1': {'QmVideo MOS': None}, 'VQA-4': {'QmVideo MOS': 4.2}}
+    sampler = ShenickSampler.StatsSampler(lambda appNames, stats: values, ['VQA-1', 'VQA-4'], ['QmVideo MOS'], {'QmVideo MOS': '>=4'},
+                                          interval=0.01).start()
+    self.assertTrue(waitFor(lambda: sampler.status()['samples'] >= 3))
+    sampler.stop()
+    status = sampler.status()
+    self.assertFalse(status['aborted'] or status['stoppedOnErrors'])
+    self.assertEqual(status['missing'], status['samples'])
+
+class SamplerCliTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # the statistics of VQA-4 cannot be read, as of an application which is out of service
+    cls.server = ShenickFakeServer.FakeTvmc(apps=12, intervals=5, sampleInterval=1, errorCommands=['getStat VQA-4 ']).start()
+    cls.cli    = ShenickCli.ShenickCli('127.0.0.1:%d' % cls.server.port, TEST_GROUP)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.stop()
+
+  def testGetManyFailOnError(self):
+    self.assertRaises(AssertionError, self.cli.statisticsGetMany, 'Application', ['VQA-1', 'VQA-4'], ['Dropped Packets'])
+    table = self.cli.statisticsGetMany('Application', ['VQA-1', 'VQA-4'], ['Dropped Packets', 'QmVideo MOS'], failOnError=False)
+    self.assertEqual(table['VQA-4'], {'Dropped Packets': None, 'QmVideo MOS': None})
+    self.assertTrue(isinstance(table['VQA-1']['Dropped Packets'], (int, long)))
+
+  def testSamplerSurvivesFailingApplication(self):
+    self.cli.startStatsSampler({'Dropped Packets': '<= 1000000'}, 'VQA.*', interval=0.1)
+    self.assertTrue(waitFor(lambda: self.cli.getStatsSamplerStatus()['samples'] >= 3))
+    status = self.cli.stopStatsSampler()
+    self.assertFalse(status['stoppedOnErrors'])
+    self.assertEqual(status['errors'], 0)
+    self.assertTrue(status['missing'] >= status['samples'])
+    self.assertIsNone(self.cli.getStatsSamples(1)[0]['values']['VQA-4']['Dropped Packets'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Shenick
+import ShenickMetrics
+import ShenickFakeServer
+
+class TransferTest(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.server = ShenickFakeServer.FakeTvmc().start()
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.stop()
+
+  def setUp(self):
+    self.server.sftpDropAfter = None
+    self.shenick   = Shenick.Shenick('127.0.0.1:%d' % self.server.port)
+    self.directory = tempfile.mkdtemp()
+    self.data      = os.urandom(1 << 20)
+    self.server.files['/tmp/stats.zip'] = self.data
+    ShenickMetrics.getMetrics().reset()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def local(self, name, data=None):
+    path = os.path.join(self.directory, name)
+    if data is not None:
+      with open(path, 'wb') as localFile:
+        localFile.write(data)
+    return path
+
+  def read(self, name):
+    with open(self.local(name), 'rb') as localFile:
+      return localFile.read()
+
+  def testDroppedDownloadIsResumedInTheSameCall(self):
+    self.server.sftpDropAfter = 400000
+    self.shenick._getFile('/tmp/stats.zip', self.local('stats.zip'))
+    self.assertEqual(self.read('stats.zip'), self.data)
+    self.assertFalse(os.path.exists(self.local('stats.zip.part')))
+
+    sftpGet = ShenickMetrics.getMetrics().snapshot()['operations']['sftpGet']
+    self.assertEqual(sftpGet['errors'], 2)
+    # the last attempt only fetched the rest of the file
+    self.assertTrue(0 < sftpGet['bytesReceived'] < len(self.data) / 2)
+
+  def testRetriesAreLimited(self):
+    self.server.sftpDropAfter = 100000
+    self.shenick.transferOptionsSet(retries=1)
+    self.assertRaises(AssertionError, self.shenick._getFile, '/tmp/stats.zip', self.local('stats.zip'))
+    self.assertTrue(os.path.getsize(self.local('stats.zip.part')) > 0)
+
+    # the next transfer continues the .part file
+    self.server.sftpDropAfter = None
+    self.shenick._getFile('/tmp/stats.zip', self.local('stats.zip'))
+    self.assertEqual(self.read('stats.zip'), self.data)
+    self.assertTrue(ShenickMetrics.getMetrics().snapshot()['operations']['sftpGet']['bytesReceived'] < len(self.data))
+
+  def testPartOfAnotherDownloadIsNotContinued(self):
+    self.local('stats.zip.part', 'x' * 1000)
+    self.shenick._getFile('/tmp/stats.zip', self.local('stats.zip'))
+    self.assertEqual(self.read('stats.zip'), self.data)
+    self.assertEqual(ShenickMetrics.getMetrics().snapshot()['operations']['sftpGet']['bytesReceived'], len(self.data))
+
+  def testPartOfAnotherUploadIsNotContinued(self):
+    for verify in ['true', 'false']:
+      self.shenick.transferOptionsSet(verify=verify)
+      self.server.files['/tmp/robot.pl.part'] = 'print "old script";\n'
+      self.shenick._putFile(self.local('robot.pl', 'print "new script";\n'), '/tmp/robot.pl')
+      self.assertEqual(self.server.files['/tmp/robot.pl'], 'print "new script";\n')
+      self.assertNotIn('/tmp/robot.pl.part', self.server.files)
+
+  def testPartOfTheSameUploadIsContinued(self):
+    self.server.files['/tmp/up.zip.part'] = self.data[:300000]
+    self.shenick._putFile(self.local('up.zip', self.data), '/tmp/up.zip')
+    self.assertEqual(self.server.files['/tmp/up.zip'], self.data)
+    self.assertEqual(ShenickMetrics.getMetrics().snapshot()['operations']['sftpPut']['bytesSent'], len(self.data) - 300000)
+
+if __name__ == '__main__':
+  unittest.main()
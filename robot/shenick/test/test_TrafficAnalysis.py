@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# coding: utf-8
+
+import os
+import re
+import sys
+import csv
+import random
+import shutil
+import zipfile
+import tempfile
+import unittest
+from StringIO import StringIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+import Shenick
+import ShenickFakeServer
+import TrafficAnalysis
+
+IGMP_HEADER = ['Entity Name', 'IP Address', 'Mean QmVideo MOS', 'Dropped Packets', 'QmVideo Impaired B-Frames', 'QmVideo Impaired I-Frames',
+               'QmVideo Impaired P-Frames', 'Mean Join Time ms', 'Joins Initiated', 'Joins Completed', 'Leaves Initiated', 'Leaves Completed']
+HTTP_HEADER = ['Entity Name', 'IP Address', 'Mean In KiloBits/s']
+
+# limits of the checks when they are not given
+IGMP_DEFAULTS = {'qmVideoMOSLimit': 4, 'imparedFramesLimit': 3, 'droppedPacketsLimit': 20, 'joinTimeAvgLimit': 125,
+                 'joinPercLimit': 0.95, 'leavePerLimit': 0.95, 'zapPerLimit': 0.95}
+HTTP_DEFAULTS = {'minGoodput': 0.85}
+
+def igmpBaseline(row, limits):
+  """
+  The checks of evaluateIgmpApplications before it used the rule engine, {check: PASS|FAIL} of one summary row.
+  """
+  limits = dict(IGMP_DEFAULTS, **limits)
+  checks = {}
+  def check(name, passed):
+    checks[name] = 'PASS' if passed else 'FAIL'
+  if re.match('.*' + limits['mosAppType'] + '.*', row['Entity Name'], re.IGNORECASE):
+    check('MOS', float(row['Mean QmVideo MOS']) >= float(limits['qmVideoMOSLimit']))
+    check('Total packet loss', int(row['Dropped Packets']) <= int(limits['droppedPacketsLimit']))
+    check('Impared frame count', int(row['QmVideo Impaired B-Frames']) + int(row['QmVideo Impaired I-Frames']) +
+                                 int(row['QmVideo Impaired P-Frames']) <= int(limits['imparedFramesLimit']))
+  if re.match('.*' + limits['zapAppType'] + '.*', row['Entity Name'], re.IGNORECASE):
+    check('JoinTimeAvg', float(row['Mean Join Time ms']) <= float(limits['joinTimeAvgLimit']))
+    check('Zap total packet loss', int(row['Dropped Packets']) <= int(limits['droppedPacketsLimit']))
+    check('Ratio Joins completed', float(row['Joins Completed']) / float(row['Joins Initiated']) >= float(limits['joinPercLimit']))
+    check('Ratio Leaves completed', float(row['Leaves Completed']) / float(row['Leaves Initiated']) >= float(limits['leavePerLimit']))
+    check('Ratio Leaves completed against joins', float(row['Leaves Completed']) / float(row['Joins Completed']) >= float(limits['zapPerLimit']))
+  return checks
+
+def httpBaseline(row, limits):
+  """
+  The check of evaluateHttpApplications before it used the rule engine.
+  """
+  limits = dict(HTTP_DEFAULTS, **limits)
+  if not re.match('.*' + limits['appType'] + '.*', row['Entity Name'], re.IGNORECASE):
+    return {}
+  minGoodput = float(float(limits['goodput']) * float(limits['minGoodput']))
+  return {'Goodput value': 'PASS' if float(row['Mean In KiloBits/s']) >= minGoodput else 'FAIL'}
+
+class RuleParityTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.random    = random.Random(5)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def summary(self, name, header, rows):
+    path = os.path.join(self.directory, name)
+    with open(path, 'wb') as csvFile:
+      writer = csv.writer(csvFile)
+      writer.writerow(header)
+      writer.writerows(rows)
+    with open(path, 'rb') as csvFile:
+      return path, list(csv.DictReader(csvFile))
+
+  def address(self, index):
+    return '0.0.0.0/24' if index % 17 == 0 else '10.0.%d.%d/24' % (index // 250, index % 250 + 1)
+
+  def assertParity(self, keyword, path, rows, baseline, limits):
+    # the keyword logs every check
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+      verdicts = keyword(dict(limits, csvFilePath=path))
+    finally:
+      sys.stdout = stdout
+
+    self.assertEqual(len(verdicts), len(rows))
+    for row, verdict in zip(rows, verdicts):
+      self.assertEqual(verdict['Entity Name'], row['Entity Name'])
+      if row['IP Address'].startswith('0.0.0.0'):
+        self.assertEqual(verdict['verdict'], 'SKIP')
+        continue
+      expected = baseline(row, limits)
+      checks   = dict((check, value) for check, value in verdict.items() if value and check not in ['Entity Name', 'verdict'])
+      self.assertEqual(checks, expected, row['Entity Name'])
+      self.assertEqual(verdict['verdict'], 'NONE' if not expected else 'FAIL' if 'FAIL' in expected.values() else 'PASS')
+
+  def testIgmpParity(self):
+    rows = []
+    for index in range(400):
+      name = ['VQA-%d', 'Zap-%d', 'vqa_zap-%d', 'Other-%d'][index % 4] % index
+      rows.append([name, self.address(index), '%.2f' % self.random.uniform(3.7, 5), self.random.randint(0, 25), self.random.randint(0, 2),
+                   self.random.randint(0, 1), self.random.randint(0, 1), '%.1f' % self.random.uniform(50, 150), 100,
+                   self.random.randint(93, 100), self.random.choice([100, 95]), self.random.randint(90, 100)])
+    path, rows = self.summary('Summary_Multicast_Client.csv', IGMP_HEADER, rows)
+
+    for limits in [{}, {'qmVideoMOSLimit': '4.5', 'droppedPacketsLimit': '10', 'imparedFramesLimit': '1', 'joinTimeAvgLimit': '100.5',
+                        'joinPercLimit': '0.97', 'leavePerLimit': '0.99', 'zapPerLimit': '0.9'}]:
+      limits.update({'mosAppType': 'VQA', 'zapAppType': 'Zap'})
+      self.assertParity(TrafficAnalysis.TrafficAnalysis().evaluateIgmpApplications, path, rows, igmpBaseline, limits)
+
+  def testHttpParity(self):
+    rows = [['Client_HTTP-%d' % index if index % 5 else 'Ftp-%d' % index, self.address(index), '%.1f' % self.random.uniform(3000, 6000)]
+            for index in range(200)]
+    path, rows = self.summary('Summary_HTTP_Client.csv', HTTP_HEADER, rows)
+
+    for limits in [{'appType': 'HTTP', 'goodput': '5000'}, {'appType': 'http', 'goodput': '4000', 'minGoodput': '0.99'}]:
+      self.assertParity(TrafficAnalysis.TrafficAnalysis().evaluateHttpApplications, path, rows, httpBaseline, limits)
+
+class ReanalyseTest(unittest.TestCase):
+
+  THRESHOLDS = {'mosAppType': 'VQA', 'zapAppType': 'STB', 'appType': 'HTTP', 'goodput': '5000'}
+
+  @classmethod
+  def setUpClass(cls):
+    server = ShenickFakeServer.FakeTvmc(apps=9, intervals=10, sampleInterval=3600).start()
+    try:
+      cls.archive = tempfile.mktemp(suffix='.zip')
+      Shenick.Shenick('127.0.0.1:%d' % server.port).statisticsSave(cls.archive)
+    finally:
+      server.stop()
+
+  @classmethod
+  def tearDownClass(cls):
+    os.remove(cls.archive)
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.archives  = [os.path.join(self.directory, 'run%d' % index, 'csvStatistics.zip') for index in range(3)]
+    for archive in self.archives:
+      os.mkdir(os.path.dirname(archive))
+      shutil.copy(self.archive, archive)
+    self.output = os.path.join(self.directory, 'verdicts.csv')
+    self.cache  = os.path.join(self.directory, 'cache.json')
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def reanalyse(self, thresholds=None, workers=1):
+    outcome = TrafficAnalysis.reanalyse([self.directory], thresholds or self.THRESHOLDS, self.output, self.cache, workers)
+    with open(self.output, 'rb') as outputFile:
+      return outcome, outputFile.read()
+
+  def testUnchangedArchivesAreCached(self):
+    outcome, verdicts = self.reanalyse(workers=2)
+    self.assertEqual(sorted(outcome), self.archives)
+    self.assertEqual(outcome[self.archives[0]], ({'PASS': 6, 'FAIL': 3, 'SKIP': 0, 'NONE': 0}, False, None))
+
+    cachedOutcome, cachedVerdicts = self.reanalyse()
+    self.assertEqual(cachedVerdicts, verdicts)
+    self.assertTrue(all(cached for counts, cached, error in cachedOutcome.values()))
+
+    # a changed zip file is evaluated again
+    with zipfile.ZipFile(self.archives[1], 'a') as archive:
+      archive.writestr('Readme.txt', 'rerun')
+    outcome, verdicts = self.reanalyse()
+    self.assertEqual([outcome[archive][1] for archive in self.archives], [True, False, True])
+
+  def testOtherThresholdsAreNotCached(self):
+    before, verdicts  = self.reanalyse()
+    outcome, verdicts = self.reanalyse(dict(self.THRESHOLDS, imparedFramesLimit='100'))
+    counts, cached, error = outcome[self.archives[0]]
+    self.assertFalse(cached)
+    self.assertTrue(counts['PASS'] > before[self.archives[0]][0]['PASS'])
+
+  def testBrokenArchive(self):
+    with open(self.archives[2], 'wb') as archive:
+      archive.write('not a zip file')
+    outcome, verdicts = self.reanalyse()
+    self.assertTrue(outcome[self.archives[2]][2].startswith('BadZipfile'))
+    self.assertEqual(outcome[self.archives[0]][2], None)
+
+if __name__ == '__main__':
+  unittest.main()